@@ -0,0 +1,8 @@
+"""
+nonebot-plugin-maimaidx 基准测试
+
+使用接口回放后端和合成玩家数据驱动插件的真实入口函数，不访问网络。
+
+    python -m benchmark --static /path/to/static --output result.json
+    python -m benchmark.compare old.json new.json
+"""
@@ -0,0 +1,57 @@
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import nonebot
+
+
+def load_plugin(
+    static: Path,
+    workdir: Optional[Path] = None,
+    *,
+    token: Optional[str] = None,
+    latency: float = 0,
+    error_rate: float = 0,
+    **config
+) -> Path:
+    """
+    以回放模式初始化 nonebot 并加载插件，返回工作目录
+
+    工作目录下 `fixture` 为回放文件，`player_record.db` 为成绩暂存，均与 `static` 隔离
+
+    - `static`: 静态资源文件夹
+    - `workdir`: 工作目录，默认创建临时目录
+    - `token`: 开发者 `token`，设置后使用开发者接口
+    - `latency`: 回放注入的延迟（秒）
+    - `error_rate`: 回放返回 `503` 的概率
+    """
+    workdir = Path(workdir or tempfile.mkdtemp(prefix='maimaidx-bench-'))
+    (workdir / 'fixture').mkdir(parents=True, exist_ok=True)
+    nonebot.init(
+        driver='~none',
+        log_level='WARNING',
+        maimaidxpath=str(static),
+        maimaidxtoken=token,
+        maimaidxapimode='replay',
+        maimaidxfixturepath=str(workdir / 'fixture'),
+        maimaidxreplaylatency=latency,
+        maimaidxreplayerrorrate=error_rate,
+        **config
+    )
+    if nonebot.load_plugin('nonebot_plugin_maimaidx') is None:
+        raise SystemExit('插件加载失败')
+
+    from nonebot_plugin_maimaidx.libraries.maimaidx_player_record import playerRecord
+    playerRecord._file = workdir / 'player_record.db'
+    return workdir
+
+
+async def load_data() -> None:
+    """代替 `on_startup` 获取曲目、别名以及猜歌数据"""
+    from nonebot_plugin_maimaidx.libraries.maimaidx_api_data import maiApi
+    from nonebot_plugin_maimaidx.libraries.maimaidx_music import mai
+
+    maiApi.load_token()
+    await mai.get_music()
+    await mai.get_music_alias()
+    mai.guess()
@@ -0,0 +1,39 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+def load(file: str) -> Dict[Tuple[str, Optional[str]], Dict[str, Any]]:
+    data = json.loads(Path(file).read_text(encoding='utf-8'))
+    return {(r['case'], r['profile']): r for r in data['results']}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmark.compare', description='比较两次基准测试结果')
+    parser.add_argument('base', help='基准结果')
+    parser.add_argument('head', help='对比结果')
+    parser.add_argument('--threshold', type=float, default=10, help='超过该百分比的变慢视为退化')
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    regressions = 0
+    print(f'{"case":<28} {"profile":<8} {"base":>10} {"head":>10} {"change":>8}')
+    for key in sorted(base.keys() & head.keys(), key=lambda k: (k[0], k[1] or '')):
+        old, new = base[key]['wall_ms']['mean'], head[key]['wall_ms']['mean']
+        change = (new - old) / old * 100 if old else 0
+        mark = ''
+        if change > args.threshold:
+            regressions += 1
+            mark = ' !'
+        print(f'{key[0]:<28} {key[1] or "-":<8} {old:>10.1f} {new:>10.1f} {change:>+7.1f}%{mark}')
+    for key in base.keys() - head.keys():
+        print(f'{key[0]:<28} {key[1] or "-":<8} 仅存在于基准结果')
+    for key in head.keys() - base.keys():
+        print(f'{key[0]:<28} {key[1] or "-":<8} 仅存在于对比结果')
+    if regressions:
+        raise SystemExit(f'{regressions} 个用例变慢超过 {args.threshold}%')
+
+
+if __name__ == '__main__':
+    main()
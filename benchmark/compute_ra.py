@@ -0,0 +1,56 @@
+"""
+底分计算耗时，对比逐个调用 `computeRa` 与 `computeRaBatch`，结果一致性由 `tests/test_compute_ra.py` 校验
+
+    python -m benchmark.compute_ra --static /path/to/static
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from .bootstrap import load_plugin
+
+
+def samples(seed: int) -> List[Tuple[float, float]]:
+    """所有定数 × (每 0.01 的达成率、评价边界及阈值附近 ±0.0001、随机四位小数达成率)"""
+    from nonebot_plugin_maimaidx.config import achievementList
+    from nonebot_plugin_maimaidx.libraries.maimaidx_rating_threshold import ratingThreshold
+
+    rand = random.Random(seed)
+    data = []
+    for index in range(10, 151):
+        ds = index / 10
+        accs = [i / 100 for i in range(0, 10101)]
+        for acc in achievementList + ratingThreshold.achievements(ds):
+            accs.extend((acc - 0.0001, acc, acc + 0.0001))
+        accs.extend(round(rand.uniform(0, 101), 4) for _ in range(2000))
+        data.extend((ds, acc) for acc in accs)
+    return data
+
+
+def main(args: argparse.Namespace) -> None:
+    load_plugin(args.static)
+
+    from nonebot_plugin_maimaidx.libraries.maimaidx_best_50 import computeRa, computeRaBatch
+
+    data = samples(args.seed)
+    ds, accs = [_d for _d, _ in data], [_a for _, _a in data]
+
+    start = time.perf_counter()
+    for _d, _a in data:
+        computeRa(_d, _a, israte=True)
+    scalar_time = time.perf_counter() - start
+    start = time.perf_counter()
+    computeRaBatch(ds, accs)
+    batch_time = time.perf_counter() - start
+
+    print(f'{len(data)} 组数据')
+    print(f'computeRa  {scalar_time * 1000:>8.1f} ms')
+    print(f'批量计算   {batch_time * 1000:>8.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m benchmark.compute_ra', description='底分计算耗时')
+    parser.add_argument('--static', required=True, help='静态资源文件夹')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    main(parser.parse_args())
@@ -0,0 +1,413 @@
+"""
+并发压测
+
+使用假的 OneBot 适配器将消息交给插件真实的事件响应器处理，模拟多个群同时使用
+
+    python -m benchmark.load --static /path/to/static --groups 50 --duration 60 -o load.json
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import random
+import re
+import statistics
+import time
+import types
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .bootstrap import load_data, load_plugin
+from .players import PROFILES, Player, make_player, write_catalogue, write_player
+
+Template = Callable[[random.Random, str, Player], str]
+
+_hint = re.compile(r'^([1-7])/7 ')
+_guess_start = '我将从热门乐曲中选择一首歌'
+_guess_end = ('答案是', '猜对了', '已重置该群猜歌')
+
+
+def _music(player: Player):
+    from nonebot_plugin_maimaidx.libraries.maimaidx_music import mai
+    return mai.total_list.by_id(player.song_id)
+
+
+def _guess_answer(rand: random.Random, gid: str, player: Player) -> str:
+    from nonebot_plugin_maimaidx.libraries.maimaidx_music import guess
+
+    if gid in guess.Group and rand.random() < 0.3:
+        return rand.choice(guess.Group[gid].answer)
+    return _music(player).title
+
+
+TEMPLATES: Dict[str, Template] = {
+    'best50': lambda r, g, p: 'b50',
+    'minfo': lambda r, g, p: f'minfo {p.song_id}',
+    'query_chart': lambda r, g, p: f'id{p.song_id}',
+    'search_music': lambda r, g, p: f'查歌 {_music(p).title[:3]}',
+    'search_base': lambda r, g, p: f'定数查歌 {r.choice(["12.5", "13.0", "13.7", "14.2"])}',
+    'search_alias_song': lambda r, g, p: f'{_music(p).title}是什么歌',
+    'alias_song': lambda r, g, p: f'{_music(p).title}有什么别名',
+    'guess_music_start': lambda r, g, p: '猜歌',
+    'guess_music_pic': lambda r, g, p: '猜曲绘',
+    'guess_music_solve': _guess_answer,
+    'level_process': lambda r, g, p: f'{r.choice(["13", "13+", "14"])} sss进度',
+    'level_achievement_list': lambda r, g, p: f'{r.choice(["13", "13+", "14"])}分数列表',
+    'rise_score': lambda r, g, p: f'我要在{r.choice(["13", "13+", "14"])}上{r.randint(1, 5)}分',
+    'plate_process': lambda r, g, p: f'{r.choice(["舞", "霸", "祭"])}将进度',
+    'rating_table_pfm': lambda r, g, p: f'{r.choice(["13", "13+", "14"])}完成表',
+    'mai_what': lambda r, g, p: '今日mai打什么',
+    'random_song': lambda r, g, p: f'随个{r.choice(["13", "13+", "14"])}',
+}
+
+DEFAULT_MIX: Dict[str, float] = {
+    'best50': 3,
+    'minfo': 3,
+    'query_chart': 2,
+    'search_music': 2,
+    'search_base': 1,
+    'search_alias_song': 2,
+    'alias_song': 1,
+    'guess_music_start': 1,
+    'guess_music_pic': 0.5,
+    'guess_music_solve': 4,
+    'level_process': 1,
+    'level_achievement_list': 1,
+    'rise_score': 1,
+    'plate_process': 1,
+    'rating_table_pfm': 1,
+    'mai_what': 1,
+    'random_song': 1,
+}
+
+
+@dataclass
+class EventRecord:
+    """一条模拟消息的处理情况"""
+    kind: str
+    group: str
+    sent: float
+    first_reply: Optional[float] = None
+    done: Optional[float] = None
+    replies: int = 0
+    error: bool = False
+
+
+@dataclass
+class GuessGame:
+    """一局猜歌的提示发送情况，`hints` 为第几条提示: 实际发送时间"""
+    started: float
+    ended: Optional[float] = None
+    hints: Dict[int, float] = field(default_factory=dict)
+
+
+_current: 'contextvars.ContextVar[Optional[EventRecord]]' = contextvars.ContextVar('current_event', default=None)
+
+
+class LoadStats:
+
+    def __init__(self, scale: float) -> None:
+        """
+        统计回复延迟和猜歌提示
+
+        - `scale`: 猜歌等待时间的缩放比例
+        """
+        self.scale = scale
+        self.events: List[EventRecord] = []
+        self.games: Dict[str, List[GuessGame]] = {}
+        self.lag: List[float] = []
+
+    def reply(self, group: str, message: str) -> None:
+        now = time.perf_counter()
+        if record := _current.get():
+            record.replies += 1
+            if record.first_reply is None:
+                record.first_reply = now
+            if message.startswith('未知错误'):
+                record.error = True
+        games = self.games.setdefault(group, [])
+        if _guess_start in message:
+            games.append(GuessGame(now))
+        elif games and games[-1].ended is None:
+            if match := _hint.match(message):
+                games[-1].hints[int(match.group(1))] = now
+            elif message.startswith(_guess_end):
+                games[-1].ended = now
+
+    def hint_report(self, end: float, tolerance: float) -> Dict[str, Any]:
+        """
+        猜歌提示统计，第 `n` 条提示应在开始后 `4 + 8 * (n - 1)` 秒发送
+
+        - `end`: 压测结束时间
+        - `tolerance`: 超过该秒数视为延迟
+        """
+        expected = late = dropped = 0
+        delays: List[float] = []
+        for games in self.games.values():
+            for game in games:
+                stop = game.ended or end
+                for n in range(1, 8):
+                    due = game.started + (4 + 8 * (n - 1)) * self.scale
+                    if due > stop:
+                        break
+                    expected += 1
+                    if n not in game.hints:
+                        # 答对或重置后不再提示，只统计截止前应发送的提示
+                        if due + tolerance < stop:
+                            dropped += 1
+                        continue
+                    delay = game.hints[n] - due
+                    delays.append(delay * 1000)
+                    if delay > tolerance:
+                        late += 1
+        return {
+            'games': sum(len(_g) for _g in self.games.values()),
+            'expected': expected,
+            'late': late,
+            'dropped': dropped,
+            'delay_ms': summary(delays)
+        }
+
+
+def percentile(data: List[float], p: float) -> float:
+    data = sorted(data)
+    index = (len(data) - 1) * p / 100
+    low = int(index)
+    high = min(low + 1, len(data) - 1)
+    return data[low] + (data[high] - data[low]) * (index - low)
+
+
+def summary(data: List[float]) -> Optional[Dict[str, float]]:
+    if not data:
+        return None
+    return {
+        'count': len(data),
+        'mean': statistics.mean(data),
+        'p50': percentile(data, 50),
+        'p90': percentile(data, 90),
+        'p99': percentile(data, 99),
+        'max': max(data)
+    }
+
+
+def fake_bot(stats: LoadStats):
+    """回复不经过网络，交给 `stats` 记录的 OneBot v11 机器人"""
+    import nonebot
+    from nonebot.adapters.onebot.v11 import Adapter, Bot, Message
+
+    class LoadAdapter(Adapter):
+
+        async def _call_api(self, bot: Bot, api: str, **data: Any) -> Any:
+            if api in ('send_msg', 'send_group_msg', 'send_private_msg'):
+                message = Message(data.get('message'))
+                text = ''.join(str(_s) for _s in message if _s.type == 'text')
+                stats.reply(str(data.get('group_id') or data.get('user_id')), text)
+                return {'message_id': 0}
+            if api == 'get_stranger_info':
+                return {'user_id': data.get('user_id'), 'nickname': 'bench'}
+            if api == 'get_group_list':
+                return []
+            return {}
+
+    adapter = LoadAdapter(nonebot.get_driver())
+    return Bot(adapter, '10000')
+
+
+def group_event(message_id: int, group: int, user: int, text: str):
+    from nonebot.adapters.onebot.v11 import Adapter
+
+    return Adapter.json_to_event({
+        'time': int(time.time()),
+        'self_id': 10000,
+        'post_type': 'message',
+        'message_type': 'group',
+        'sub_type': 'normal',
+        'message_id': message_id,
+        'group_id': group,
+        'user_id': user,
+        'anonymous': None,
+        'message': [{'type': 'text', 'data': {'text': text}}],
+        'raw_message': text,
+        'font': 0,
+        'sender': {'user_id': user, 'nickname': 'bench', 'role': 'member'}
+    })
+
+
+async def lag_monitor(lag: List[float], interval: float = 0.05) -> None:
+    """事件循环延迟，记录每次 `sleep` 超出预期的毫秒数"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    load_plugin(
+        Path(args.static),
+        args.workdir,
+        token='benchmark' if args.token else None,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        maimaidxrecordttl=args.ttl,
+        command_start={'/', ''}
+    )
+    write_catalogue()
+    await load_data()
+
+    from nonebot_plugin_maimaidx.command import mai_guess
+    from nonebot_plugin_maimaidx.libraries.maimaidx_music import guess
+
+    stats = LoadStats(args.guess_scale)
+    if args.guess_scale != 1:
+        mai_guess.asyncio = types.SimpleNamespace(sleep=lambda delay: asyncio.sleep(delay * args.guess_scale))
+
+    profiles = list(PROFILES)
+    players: List[Player] = []
+    for n in range(args.players):
+        player = make_player(profiles[n % len(profiles)], 200000 + n, args.seed)
+        write_player(player)
+        players.append(player)
+
+    mix = dict(DEFAULT_MIX)
+    if args.mix:
+        mix = {}
+        for item in args.mix.split(','):
+            kind, _, weight = item.partition('=')
+            if kind not in TEMPLATES:
+                raise SystemExit(f'未知的消息类型：{kind}')
+            mix[kind] = float(weight or 1)
+    kinds, weights = list(mix), list(mix.values())
+
+    bot = fake_bot(stats)
+    groups = [300000 + n for n in range(args.groups)]
+    guess.config['enable'] = list(set(guess.config.get('enable', [])) | {str(_g) for _g in groups})
+    rand = random.Random(args.seed)
+    tasks: List[asyncio.Task] = []
+    message_id = 0
+
+    async def dispatch(record: EventRecord, event) -> None:
+        _current.set(record)
+        try:
+            await bot.handle_event(event)
+        finally:
+            record.done = time.perf_counter()
+
+    async def group_loop(group: int) -> None:
+        nonlocal message_id
+        gid = str(group)
+        users = rand.sample(players, min(len(players), args.users))
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(rand.expovariate(args.rate))
+            if time.perf_counter() >= deadline:
+                break
+            player = rand.choice(users)
+            kind = rand.choices(kinds, weights)[0]
+            message_id += 1
+            event = group_event(message_id, group, player.qqid, TEMPLATES[kind](rand, gid, player))
+            record = EventRecord(kind, gid, time.perf_counter())
+            stats.events.append(record)
+            tasks.append(asyncio.create_task(dispatch(record, event)))
+
+    monitor = asyncio.create_task(lag_monitor(stats.lag))
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*[group_loop(_g) for _g in groups])
+    pending = [_t for _t in tasks if not _t.done()]
+    if pending:
+        await asyncio.wait(pending, timeout=args.drain)
+    end = time.perf_counter()
+    for task in tasks:
+        task.cancel()
+    monitor.cancel()
+    for gid in list(guess.Group):
+        guess.end(gid)
+
+    elapsed = end - start
+    completed = [_e for _e in stats.events if _e.done is not None]
+    by_kind: Dict[str, Dict[str, Any]] = {}
+    for kind in kinds:
+        records = [_e for _e in stats.events if _e.kind == kind]
+        by_kind[kind] = {
+            'sent': len(records),
+            'replied': sum(1 for _e in records if _e.first_reply),
+            'errors': sum(1 for _e in records if _e.error),
+            'first_reply_ms': summary([(_e.first_reply - _e.sent) * 1000 for _e in records if _e.first_reply])
+        }
+    return {
+        'meta': {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'groups': args.groups,
+            'users': args.users,
+            'players': args.players,
+            'rate': args.rate,
+            'duration': args.duration,
+            'mix': mix,
+            'ttl': args.ttl,
+            'token': args.token,
+            'latency': args.latency,
+            'error_rate': args.error_rate,
+            'guess_scale': args.guess_scale,
+            'seed': args.seed
+        },
+        'elapsed': elapsed,
+        'sent': len(stats.events),
+        'completed': len(completed),
+        'unfinished': len(stats.events) - len(completed),
+        'throughput': len(completed) / elapsed,
+        'first_reply_ms': summary([(_e.first_reply - _e.sent) * 1000 for _e in stats.events if _e.first_reply]),
+        'event_loop_lag_ms': summary(stats.lag),
+        'guess_hints': stats.hint_report(end, args.hint_tolerance * args.guess_scale),
+        'kinds': by_kind
+    }
+
+
+def print_report(data: Dict[str, Any]) -> None:
+    def fmt(s: Optional[Dict[str, float]]) -> str:
+        if not s:
+            return '-'
+        return f'p50 {s["p50"]:.0f} / p90 {s["p90"]:.0f} / p99 {s["p99"]:.0f} / max {s["max"]:.0f} ms'
+
+    print(f'发送 {data["sent"]} 条，完成 {data["completed"]} 条，吞吐 {data["throughput"]:.2f} 条/秒')
+    print(f'首次回复  {fmt(data["first_reply_ms"])}')
+    print(f'循环延迟  {fmt(data["event_loop_lag_ms"])}')
+    hints = data['guess_hints']
+    print(f'猜歌提示  {hints["games"]} 局，应发送 {hints["expected"]} 条，延迟 {hints["late"]} 条，丢失 {hints["dropped"]} 条')
+    for kind, s in data['kinds'].items():
+        print(f'  {kind:<24} {s["sent"]:>5} {s["replied"]:>5} {s["errors"]:>3}  {fmt(s["first_reply_ms"])}')
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmark.load', description='nonebot-plugin-maimaidx 并发压测')
+    parser.add_argument('--static', required=True, help='静态资源文件夹')
+    parser.add_argument('--output', '-o', help='结果保存路径')
+    parser.add_argument('--workdir', help='回放文件及成绩暂存目录，默认使用临时目录')
+    parser.add_argument('--groups', '-g', type=int, default=20, help='群数量')
+    parser.add_argument('--users', type=int, default=5, help='每个群发言的用户数量')
+    parser.add_argument('--players', type=int, default=20, help='合成玩家数量，按 PROFILES 轮流生成')
+    parser.add_argument('--rate', type=float, default=0.2, help='每个群每秒的消息数')
+    parser.add_argument('--duration', '-d', type=float, default=60, help='发送消息的时长（秒）')
+    parser.add_argument('--drain', type=float, default=30, help='停止发送后等待处理完成的时长（秒）')
+    parser.add_argument('--mix', help='消息比例，例如 best50=3,minfo=2,guess_music_start=1')
+    parser.add_argument('--ttl', type=int, default=300, help='成绩暂存有效期')
+    parser.add_argument('--token', action='store_true', help='使用开发者接口')
+    parser.add_argument('--latency', type=float, default=0, help='回放注入的接口延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='回放返回 503 的概率')
+    parser.add_argument('--guess-scale', type=float, default=1, help='猜歌等待时间缩放，例如 0.1 时 8 秒提示间隔变为 0.8 秒')
+    parser.add_argument('--hint-tolerance', type=float, default=1, help='猜歌提示超过预定时间该秒数视为延迟')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    return parser.parse_args(argv)
+
+
+def run(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    data = asyncio.run(main(args))
+    print_report(data)
+    if args.output:
+        Path(args.output).write_text(json.dumps(data, ensure_ascii=False, indent=4), encoding='utf-8')
+        print(f'结果已保存至 {args.output}')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,161 @@
+import json
+import random
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Dict, List, Tuple
+
+import httpx
+from PIL import Image
+
+PROFILES: Dict[str, Tuple[float, float, float]] = {
+    # 名称: (游玩谱面比例, 达成率下限, 达成率上限)
+    'new': (0.01, 60.0, 97.0),
+    'casual': (0.15, 80.0, 99.5),
+    'regular': (0.4, 94.0, 100.5),
+    'heavy': (0.8, 97.0, 101.0),
+    'full': (1.0, 100.5, 101.0),
+}
+
+_fc = ['', '', 'fc', 'fcp', 'ap', 'app']
+_fs = ['', '', 'fs', 'fsp', 'fsd', 'fsdp']
+
+
+@dataclass
+class Player:
+    """合成玩家"""
+    profile: str
+    qqid: int
+    nickname: str
+    records: List[Dict[str, Any]] = field(default_factory=list)
+    song_id: str = ''
+
+    def best50(self) -> Dict[str, List[Dict[str, Any]]]:
+        from nonebot_plugin_maimaidx.libraries.maimaidx_music import mai
+
+        sd, dx = [], []
+        for r in sorted(self.records, key=lambda x: (x['ra'], x['achievements']), reverse=True):
+            music = mai.total_list.by_id(r['song_id'])
+            (dx if music.basic_info.is_new else sd).append(r)
+        return {'sd': sd[:35], 'dx': dx[:15]}
+
+
+def make_player(profile: str, qqid: int, seed: int = 0) -> Player:
+    """
+    按游玩程度生成玩家成绩
+
+    - `profile`: `PROFILES` 中的名称
+    - `qqid`: 用户QQ
+    - `seed`: 随机种子
+    """
+    from nonebot_plugin_maimaidx.libraries.maimaidx_best_50 import computeRa
+    from nonebot_plugin_maimaidx.libraries.maimaidx_music import mai
+    from nonebot_plugin_maimaidx.config import diffs
+
+    ratio, low, high = PROFILES[profile]
+    rand = random.Random(f'{profile}-{seed}')
+    player = Player(profile, qqid, f'bench-{profile}')
+    for music in mai.total_list:
+        for level_index, ds in enumerate(music.ds):
+            if rand.random() >= ratio:
+                continue
+            achievements = round(rand.uniform(low, high), 4)
+            if profile == 'full':
+                fc, fs = 'app', 'fsdp'
+            else:
+                fc, fs = rand.choice(_fc), rand.choice(_fs)
+            ra, rate = computeRa(ds, achievements, israte=True)
+            notes = sum(music.charts[level_index].notes) if level_index < len(music.charts) else 0
+            player.records.append({
+                'achievements': achievements,
+                'ds': ds,
+                'dxScore': int(notes * 3 * min(achievements, 100) / 100),
+                'fc': fc,
+                'fs': fs,
+                'level': music.level[level_index],
+                'level_index': level_index,
+                'level_label': diffs[level_index],
+                'ra': ra,
+                'rate': rate.lower(),
+                'song_id': int(music.id),
+                'title': music.title,
+                'type': music.type
+            })
+    if player.records:
+        player.song_id = str(rand.choice(player.records)['song_id'])
+    else:
+        player.song_id = mai.total_list.random().id
+    return player
+
+
+def _plate(record: Dict[str, Any]) -> Dict[str, Any]:
+    """`query/plate` 格式的成绩"""
+    keys = ('achievements', 'fc', 'fs', 'level', 'level_index', 'title', 'type')
+    return dict({k: record[k] for k in keys}, id=record['song_id'])
+
+
+def _qqlogo() -> bytes:
+    by = BytesIO()
+    Image.new('RGB', (100, 100), (200, 200, 200)).save(by, 'PNG')
+    return by.getvalue()
+
+
+def write_catalogue() -> None:
+    """使用静态文件夹中的曲目、谱面以及别名数据生成回放文件"""
+    from nonebot_plugin_maimaidx.config import alias_file, chart_file, music_file
+    from nonebot_plugin_maimaidx.libraries.maimaidx_api_data import maiApi
+
+    store = maiApi.transport.store
+    for file, url in (
+        (music_file, maiApi.MaiAPI + '/music_data'),
+        (chart_file, maiApi.MaiAPI + '/chart_stats'),
+        (alias_file, maiApi.MaiAliasAPI + '/maimaidxalias'),
+    ):
+        if not file.exists():
+            continue
+        data = json.loads(file.read_text(encoding='utf-8'))
+        if url.startswith(maiApi.MaiAliasAPI):
+            data = {'content': data}
+        store.save_json('GET', url, data)
+
+
+def write_player(player: Player) -> None:
+    """生成玩家相关接口的回放文件"""
+    from nonebot_plugin_maimaidx.config import plate_to_version
+    from nonebot_plugin_maimaidx.libraries.maimaidx_api_data import maiApi
+    from nonebot_plugin_maimaidx.libraries.maimaidx_music import mai
+
+    store = maiApi.transport.store
+    qqid = player.qqid
+    best = player.best50()
+    rating = sum(r['ra'] for r in best['sd'] + best['dx'])
+    profile = {
+        'additional_rating': 0,
+        'nickname': player.nickname,
+        'plate': None,
+        'rating': rating,
+        'username': player.nickname
+    }
+    store.save_json('POST', maiApi.MaiAPI + '/query/player', dict(profile, charts=best), json_body={'qq': qqid, 'b50': True})
+
+    versions = list(set(plate_to_version.values()))
+    store.save_json(
+        'POST', maiApi.MaiAPI + '/query/plate',
+        {'verlist': [_plate(r) for r in player.records]},
+        json_body={'qq': qqid, 'version': versions}
+    )
+    by_version: Dict[str, List[Dict[str, Any]]] = {v: [] for v in versions}
+    for r in player.records:
+        by_version.setdefault(mai.total_list.by_id(r['song_id']).basic_info.version, []).append(_plate(r))
+    for version, verlist in by_version.items():
+        store.save_json('POST', maiApi.MaiAPI + '/query/plate', {'verlist': verlist}, json_body={'qq': qqid, 'version': [version]})
+
+    store.save_json('GET', maiApi.MaiAPI + '/dev/player/records', dict(profile, records=player.records), params={'qq': qqid})
+    songs = [r for r in player.records if str(r['song_id']) == player.song_id]
+    store.save_json(
+        'POST', maiApi.MaiAPI + '/dev/player/record',
+        {player.song_id: songs} if songs else {},
+        json_body={'qq': qqid, 'music_id': [player.song_id]}
+    )
+
+    request = httpx.Request('GET', maiApi.QQAPI, params={'b': 'qq', 'nk': qqid, 's': 100})
+    store.save(store.from_request(request), 200, 'image/png', _qqlogo())
@@ -0,0 +1,102 @@
+import functools
+import inspect
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+from PIL import Image, ImageDraw, ImageFont
+
+PHASES = ('fetch', 'compute', 'render', 'encode')
+
+
+class PhaseTimer:
+
+    def __init__(self) -> None:
+        """
+        分阶段计时
+
+        阶段可以嵌套，只统计最内层阶段的独占时间，未进入任何阶段的时间计入 `compute`
+        """
+        self.totals: Dict[str, float] = {}
+        self._stack: List[str] = []
+        self._start = 0.0
+
+    def reset(self) -> None:
+        self.totals = {_p: 0.0 for _p in PHASES}
+        self._stack = []
+        self._start = time.perf_counter()
+
+    def _switch(self) -> None:
+        now = time.perf_counter()
+        self.totals[self._stack[-1] if self._stack else 'compute'] += now - self._start
+        self._start = now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.totals:
+            self.reset()
+        self._switch()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stack.pop()
+
+    def result(self) -> Dict[str, float]:
+        """结束计时并返回各阶段毫秒数"""
+        self._switch()
+        return {k: v * 1000 for k, v in self.totals.items()}
+
+
+def _wrap(timer: PhaseTimer, name: str, func: Callable) -> Callable:
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # 协程挂起期间其他任务的耗时也会计入，基准测试逐个执行用例
+            with timer.phase(name):
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer.phase(name):
+                return func(*args, **kwargs)
+    wrapper.__wrapped_phase__ = func
+    return wrapper
+
+
+def _patch(timer: PhaseTimer, owner: object, attr: str, name: str) -> None:
+    func = getattr(owner, attr, None)
+    if func is None or hasattr(func, '__wrapped_phase__'):
+        return
+    setattr(owner, attr, _wrap(timer, name, func))
+
+
+def instrument(timer: PhaseTimer) -> None:
+    """
+    为插件和 Pillow 的关键函数挂载计时，需在插件加载后调用
+
+    - `fetch`: 接口请求
+    - `render`: Pillow 解码、合成、缩放以及文字绘制
+    - `encode`: 图片保存以及 `base64` 编码
+    """
+    from nonebot_plugin_maimaidx.libraries import image
+    from nonebot_plugin_maimaidx.libraries.maimaidx_api_data import MaimaiAPI
+
+    _patch(timer, MaimaiAPI, '_request', 'fetch')
+
+    for attr in ('open', 'new'):
+        _patch(timer, Image, attr, 'render')
+    for attr in ('alpha_composite', 'paste', 'resize', 'crop', 'convert', 'copy', 'rotate', 'filter'):
+        _patch(timer, Image.Image, attr, 'render')
+    for attr in ('text', 'multiline_text', 'rectangle', 'rounded_rectangle', 'ellipse', 'pieslice', 'polygon', 'line'):
+        _patch(timer, ImageDraw.ImageDraw, attr, 'render')
+    _patch(timer, ImageFont, 'truetype', 'render')
+    _patch(timer, Image.Image, 'save', 'encode')
+
+    original = image.image_to_base64
+    wrapped = _wrap(timer, 'encode', original)
+    for name, module in list(sys.modules.items()):
+        if name.startswith('nonebot_plugin_maimaidx') and getattr(module, 'image_to_base64', None) is original:
+            module.image_to_base64 = wrapped
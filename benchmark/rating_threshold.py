@@ -0,0 +1,66 @@
+"""
+底分阈值表基准测试，校验与 `generateAchievementList` 以及 `computeRa` 一致，并对比生成耗时和内存
+
+    python -m benchmark.rating_threshold --static /path/to/static
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Tuple
+
+from .bootstrap import load_plugin
+
+
+def measure(func: Callable[[], Any]) -> Tuple[Any, float, float]:
+    """返回 `(结果, 耗时 ms, 结果占用内存 KB)`"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - start) * 1000
+    size = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def main(args: argparse.Namespace) -> None:
+    load_plugin(args.static)
+
+    from nonebot_plugin_maimaidx.libraries.maimaidx_best_50 import generateAchievementList
+    from nonebot_plugin_maimaidx.libraries.maimaidx_rating_threshold import RatingThreshold
+
+    def legacy():
+        return {f'{acc:.1f}': generateAchievementList(acc) for acc in [i / 10 for i in range(10, 151)]}
+
+    file = Path(tempfile.mkdtemp()) / 'rating_threshold.bin'
+
+    def build():
+        table = RatingThreshold(file)
+        table.load()
+        return table
+
+    def load():
+        table = RatingThreshold(file)
+        table.load()
+        return table
+
+    old, old_time, old_size = measure(legacy)
+    table, build_time, _ = measure(build)
+    table, load_time, size = measure(load)
+    print(f'generateAchievementList  {old_time:>8.1f} ms {old_size:>8.1f} KB')
+    print(f'直接求解并保存           {build_time:>8.1f} ms')
+    print(f'读取文件                 {load_time:>8.1f} ms {size:>8.1f} KB  ({file.stat().st_size} bytes)')
+
+    mismatches = [ds for ds, values in old.items() if table.achievements(float(ds)) != values]
+    errors = table.verify()
+    print(f'与 generateAchievementList 不一致 {len(mismatches)} 个定数，computeRa 校验失败 {len(errors)} 项')
+    if mismatches or errors:
+        print(mismatches[:10], errors[:10])
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m benchmark.rating_threshold', description='底分阈值表基准测试')
+    parser.add_argument('--static', required=True, help='静态资源文件夹')
+    main(parser.parse_args())
@@ -0,0 +1,61 @@
+"""
+成绩解析与构造基准测试，对比逐条构造 `PlayInfoDev` 与 `PlayRecord` 的耗时，并校验两者内容一致
+
+    python -m benchmark.records --static /path/to/static
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, Tuple, TypeVar
+
+from .bootstrap import load_data, load_plugin
+from .players import PROFILES, _plate, make_player, write_catalogue
+
+T = TypeVar('T')
+
+
+def timed(func: Callable[[], T], repeat: int) -> Tuple[T, float]:
+    """执行 `repeat` 次，返回最后一次的结果和平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main(args: argparse.Namespace) -> None:
+    load_plugin(args.static)
+    write_catalogue()
+    asyncio.run(load_data())
+
+    from nonebot_plugin_maimaidx.libraries.maimaidx_model import PlayInfoDev
+    from nonebot_plugin_maimaidx.libraries.maimaidx_player_record import playerRecord
+
+    print(f'{"玩家":<8} {"成绩数":>6} {"解析":>9} {"写入":>9} {"字典+模型":>10} {"PlayRecord":>10} {"加速":>6}')
+    mismatches = 0
+    for profile in args.profiles:
+        player = make_player(profile, 100000, args.seed)
+        user = f'qq:{player.qqid}'
+        payload = json.dumps({'verlist': [_plate(r) for r in player.records]}, ensure_ascii=False)
+
+        data, parse_time = timed(lambda: json.loads(payload)['verlist'], args.repeat)
+        _, save_time = timed(lambda: playerRecord.save(user, data, {}, 'plate'), 1)
+        models, model_time = timed(lambda: [PlayInfoDev(**_d) for _d in playerRecord.records(user)], args.repeat)
+        rows, row_time = timed(lambda: playerRecord.rows(user), args.repeat)
+
+        if [_m.dict() for _m in models] != [_r.model().dict() for _r in rows]:
+            mismatches += 1
+            print(f'结果不一致：{profile}')
+        speedup = model_time / row_time if row_time else 0
+        print(f'{profile:<8} {len(rows):>6} {parse_time:>7.2f}ms {save_time:>7.2f}ms {model_time:>8.2f}ms {row_time:>8.2f}ms {speedup:>5.1f}x')
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m benchmark.records', description='成绩解析与构造基准测试')
+    parser.add_argument('--static', required=True, help='静态资源文件夹')
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES), help='合成玩家')
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复次数')
+    parser.add_argument('--seed', type=int, default=0, help='合成玩家随机种子')
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+"""
+按输出尺寸直接绘制与按模板尺寸绘制后缩放的对比，每种方式在独立进程中执行，记录耗时、CPU 时间和进程峰值内存
+
+    python -m benchmark.render_scale --static /path/to/static
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from .bootstrap import load_data, load_plugin
+from .players import PROFILES, make_player, write_catalogue, write_player
+from .run import peak_rss
+
+MODES = ['resize', 'direct']
+
+
+async def worker(args: argparse.Namespace) -> Dict[str, Any]:
+    """在当前进程中以 `args.mode` 执行所有用例"""
+    load_plugin(args.static, maimaidxrecordttl=3600, maimaidximagescale=args.scale)
+    write_catalogue()
+    await load_data()
+
+    from nonebot_plugin_maimaidx.libraries import maimaidx_player_score
+    from nonebot_plugin_maimaidx.libraries.image import image_to_base64
+    from nonebot_plugin_maimaidx.libraries.maimaidx_best_50 import Draw, DrawBest
+    from nonebot_plugin_maimaidx.libraries.maimaidx_local_best import player_best
+
+    def resize(im, scale: float):
+        return im.resize((round(im.width * scale), round(im.height * scale)))
+
+    if args.mode == 'resize':
+        # 原有方式：按模板尺寸绘制，编码前整张缩放至输出尺寸
+        Draw.render_scale = classmethod(lambda cls: 1)
+        plan_scale = Draw.output_width / Draw.design_width * args.scale
+        maimaidx_player_score.image_to_base64 = lambda im: image_to_base64(resize(im, plan_scale))
+
+    player = make_player(args.profile, 100000, args.seed)
+    write_player(player)
+    best = await player_best(player.qqid)
+
+    async def b50() -> str:
+        im = await DrawBest(best.user_info(), player.qqid).draw()
+        if args.mode == 'resize':
+            im = resize(im, DrawBest.output_width / DrawBest.design_width * args.scale)
+        return image_to_base64(im)
+
+    cases: Dict[str, Callable[[], Awaitable[Any]]] = {
+        'b50': b50,
+        'level_process_data': lambda: maimaidx_player_score.level_process_data(player.qqid, None, '13+', 'sss'),
+        'level_achievement_list_data': lambda: maimaidx_player_score.level_achievement_list_data(player.qqid, None, '13', 1),
+    }
+    results: Dict[str, Any] = {}
+    for name, case in cases.items():
+        await case()
+        wall: List[float] = []
+        cpu: List[float] = []
+        for _ in range(args.repeat):
+            w, c = time.perf_counter(), time.process_time()
+            await case()
+            wall.append((time.perf_counter() - w) * 1000)
+            cpu.append((time.process_time() - c) * 1000)
+        results[name] = {'wall_ms': sum(wall) / len(wall), 'cpu_ms': sum(cpu) / len(cpu)}
+    return {'mode': args.mode, 'peak_rss_mb': peak_rss(), 'cases': results}
+
+
+def main(args: argparse.Namespace) -> None:
+    reports = {}
+    for mode in MODES:
+        command = [
+            sys.executable, '-m', 'benchmark.render_scale', '--static', args.static, '--mode', mode,
+            '--profile', args.profile, '--repeat', str(args.repeat), '--scale', str(args.scale), '--seed', str(args.seed)
+        ]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        reports[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f'{"用例":<28} {"缩放 CPU":>10} {"直接 CPU":>10} {"缩放耗时":>10} {"直接耗时":>10}')
+    for name in reports['resize']['cases']:
+        old, new = reports['resize']['cases'][name], reports['direct']['cases'][name]
+        print(f'{name:<28} {old["cpu_ms"]:>8.1f}ms {new["cpu_ms"]:>8.1f}ms {old["wall_ms"]:>8.1f}ms {new["wall_ms"]:>8.1f}ms')
+    print(f'{"峰值内存":<28} {reports["resize"]["peak_rss_mb"]:>8.1f}MB {reports["direct"]["peak_rss_mb"]:>8.1f}MB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m benchmark.render_scale', description='直接按输出尺寸绘制的对比')
+    parser.add_argument('--static', required=True, help='静态资源文件夹')
+    parser.add_argument('--profile', default='full', choices=list(PROFILES), help='合成玩家')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数')
+    parser.add_argument('--scale', type=float, default=1, help='输出缩放比例，即 maimaidximagescale')
+    parser.add_argument('--seed', type=int, default=0, help='合成玩家随机种子')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(asyncio.run(worker(args))))
+    else:
+        main(args)
@@ -0,0 +1,127 @@
+"""
+上分推荐基准测试，对比原有的逐谱面遍历实现并校验结果一致
+
+    python -m benchmark.rise_score --static /path/to/static
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .bootstrap import load_data, load_plugin
+from .players import PROFILES, make_player, write_catalogue
+
+LEVELS = [None, '12', '12+', '13', '13+', '14', '14+']
+SCORES = ['0', '1', '2', '5', '10', '20']
+
+
+def legacy_achievement_list() -> Dict[str, List[float]]:
+    from nonebot_plugin_maimaidx.libraries.maimaidx_best_50 import generateAchievementList
+
+    realAchievementList = {}
+    for acc in [i / 10 for i in range(10, 151)]:
+        realAchievementList[f'{acc:.1f}'] = generateAchievementList(acc)
+    return realAchievementList
+
+
+def legacy(realAchievementList: Dict[str, List[float]], player_data: Dict[str, Any], rating: Optional[str], score: str) -> Tuple[list, list]:
+    """原有 `rise_score_data` 的计算部分"""
+    from nonebot_plugin_maimaidx.config import achievementList, diffs, scoreRank
+    from nonebot_plugin_maimaidx.libraries.maimaidx_best_50 import computeRa
+    from nonebot_plugin_maimaidx.libraries.maimaidx_music import mai
+
+    dx_ra_lowest = 999
+    sd_ra_lowest = 999
+    player_dx_list = []
+    player_sd_list = []
+    music_dx_list = []
+    music_sd_list = []
+
+    for dx in player_data['charts']['dx']:
+        dx_ra_lowest = min(dx_ra_lowest, dx['ra'])
+        player_dx_list.append([int(dx['song_id']), int(dx["level_index"]), int(dx['ra'])])
+    for sd in player_data['charts']['sd']:
+        sd_ra_lowest = min(sd_ra_lowest, sd['ra'])
+        player_sd_list.append([int(sd['song_id']), int(sd["level_index"]), int(sd['ra'])])
+    player_dx_id_list = [[d[0], d[1]] for d in player_dx_list]
+    player_sd_id_list = [[s[0], s[1]] for s in player_sd_list]
+
+    for music in mai.total_list:
+        for i, ds in enumerate(music.ds):
+            for achievement in realAchievementList[f'{ds:.1f}']:
+                if rating and music.level[i] != rating: continue
+                if f'{achievement:.1f}' == '100.5':
+                    index_score = 12
+                else:
+                    index_score = [index for index, acc in enumerate(achievementList[:-1]) if acc <= achievement < achievementList[index + 1]][0]
+                if music.basic_info.is_new:
+                    music_ra = computeRa(ds, achievement)
+                    if music_ra < dx_ra_lowest: continue
+                    if [int(music.id), i] in player_dx_id_list:
+                        player_ra = player_dx_list[player_dx_id_list.index([int(music.id), i])][2]
+                        if music_ra - player_ra == int(score) and [int(music.id), i, music_ra] not in player_dx_list:
+                            music_dx_list.append([music, diffs[i], ds, achievement, scoreRank[index_score + 1].upper(), music_ra])
+                    else:
+                        if music_ra - dx_ra_lowest == int(score) and [int(music.id), i, music_ra] not in player_dx_list:
+                            music_dx_list.append([music, diffs[i], ds, achievement, scoreRank[index_score + 1].upper(), music_ra])
+                else:
+                    music_ra = computeRa(ds, achievement)
+                    if music_ra < sd_ra_lowest: continue
+                    if [int(music.id), i] in player_sd_id_list:
+                        player_ra = player_sd_list[player_sd_id_list.index([int(music.id), i])][2]
+                        if music_ra - player_ra == int(score) and [int(music.id), i, music_ra] not in player_sd_list:
+                            music_sd_list.append([music, diffs[i], ds, achievement, scoreRank[index_score + 1].upper(), music_ra])
+                    else:
+                        if music_ra - sd_ra_lowest == int(score) and [int(music.id), i, music_ra] not in player_sd_list:
+                            music_sd_list.append([music, diffs[i], ds, achievement, scoreRank[index_score + 1].upper(), music_ra])
+
+    return (
+        sorted(music_sd_list, key=lambda i: int(i[0].id)),
+        sorted(music_dx_list, key=lambda i: int(i[0].id))
+    )
+
+
+def main(args: argparse.Namespace) -> None:
+    load_plugin(args.static)
+    write_catalogue()
+    asyncio.run(load_data())
+
+    from nonebot_plugin_maimaidx.libraries.maimaidx_rise_score import riseScore
+
+    start = time.perf_counter()
+    realAchievementList = legacy_achievement_list()
+    print(f'原有达成率表生成 {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    old_total = new_total = 0.0
+    queries = mismatches = 0
+    for profile in args.profiles:
+        player = make_player(profile, 100000, args.seed)
+        player_data = {'charts': player.best50()}
+        old_time = new_time = 0.0
+        for level in LEVELS:
+            for score in SCORES:
+                start = time.perf_counter()
+                old = legacy(realAchievementList, player_data, level, score)
+                old_time += time.perf_counter() - start
+                start = time.perf_counter()
+                new = riseScore.recommend(player_data['charts'], level, int(score))
+                new_time += time.perf_counter() - start
+                queries += 1
+                if old != new:
+                    mismatches += 1
+                    print(f'结果不一致：{profile} {level} {score}')
+        n = len(LEVELS) * len(SCORES)
+        print(f'{profile:<8} 原有 {old_time / n * 1000:>9.2f} ms  新 {new_time / n * 1000:>7.3f} ms  {old_time / new_time:>7.1f}x')
+        old_total += old_time
+        new_total += new_time
+    print(f'共 {queries} 次查询，平均加速 {old_total / new_total:.1f}x，结果不一致 {mismatches} 次')
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m benchmark.rise_score', description='上分推荐基准测试')
+    parser.add_argument('--static', required=True, help='静态资源文件夹')
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES), help='合成玩家')
+    parser.add_argument('--seed', type=int, default=0, help='合成玩家随机种子')
+    main(parser.parse_args())
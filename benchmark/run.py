@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .bootstrap import load_data, load_plugin
+from .players import PROFILES, Player, make_player, write_catalogue, write_player
+from .profiler import PhaseTimer, instrument
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+Case = Callable[[Optional[Player]], Awaitable[Any]]
+
+
+def peak_rss() -> Optional[float]:
+    """进程峰值内存（MB），Linux 返回 KB，macOS 返回字节"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+def cases() -> Dict[str, Tuple[bool, Case]]:
+    """用例名称: (是否需要玩家, 用例)"""
+    from nonebot_plugin_maimaidx.config import plate_to_version
+    from nonebot_plugin_maimaidx.libraries.maimaidx_music import mai
+    from nonebot_plugin_maimaidx.libraries.maimaidx_music_info import (
+        draw_music_info,
+        draw_plate_table,
+        draw_rating_table,
+        generate,
+        music_play_data,
+    )
+    from nonebot_plugin_maimaidx.libraries.maimaidx_player_score import (
+        level_achievement_list_data,
+        level_process_data,
+        player_plate_data,
+        rise_score_data,
+    )
+    from nonebot_plugin_maimaidx.libraries.maimaidx_update_plate import update_rating_table
+
+    latest = list(plate_to_version.keys())[-1]
+    return {
+        'update_rating_table': (False, lambda p: update_rating_table()),
+        'generate': (True, lambda p: generate(p.qqid, [])),
+        'draw_music_info': (True, lambda p: draw_music_info(mai.total_list.by_id(p.song_id), p.qqid)),
+        'music_play_data': (True, lambda p: music_play_data(p.qqid, p.song_id)),
+        'draw_rating_table': (True, lambda p: draw_rating_table(p.qqid, '13+')),
+        'draw_plate_table': (True, lambda p: draw_plate_table(p.qqid, latest, '将')),
+        'level_process_data': (True, lambda p: level_process_data(p.qqid, None, '13+', 'sss')),
+        'level_achievement_list_data': (True, lambda p: level_achievement_list_data(p.qqid, None, '13+')),
+        'rise_score_data': (True, lambda p: rise_score_data(p.qqid, None, '13+', '5')),
+        'player_plate_data': (True, lambda p: player_plate_data(p.qqid, None, '舞', '将', None)),
+    }
+
+
+async def measure(timer: PhaseTimer, case: Case, player: Optional[Player], iterations: int, warmup: int, cold: bool = False) -> Dict[str, Any]:
+    """
+    执行用例并统计耗时
+
+    - `timer`: 分阶段计时
+    - `case`: 用例
+    - `player`: 合成玩家
+    - `iterations`: 计时次数
+    - `warmup`: 预热次数，不计入结果
+    - `cold`: 每次执行前清空绘图缓存
+    """
+    from nonebot_plugin_maimaidx.libraries.maimaidx_cache import caches
+
+    wall: List[float] = []
+    cpu: List[float] = []
+    phases: List[Dict[str, float]] = []
+    error = None
+    for n in range(warmup + iterations):
+        if cold:
+            for cache in caches.values():
+                cache.clear()
+        gc.collect()
+        timer.reset()
+        w, c = time.perf_counter(), time.process_time()
+        result = await case(player)
+        w, c = time.perf_counter() - w, time.process_time() - c
+        p = timer.result()
+        if isinstance(result, str) and result.startswith('未知错误'):
+            error = result
+        if n < warmup:
+            continue
+        wall.append(w * 1000)
+        cpu.append(c * 1000)
+        phases.append(p)
+    return {
+        'ok': error is None,
+        'error': error,
+        'iterations': iterations,
+        'wall_ms': {
+            'mean': statistics.mean(wall),
+            'median': statistics.median(wall),
+            'min': min(wall),
+            'max': max(wall)
+        },
+        'cpu_ms': statistics.mean(cpu),
+        'phases_ms': {k: statistics.mean(_p[k] for _p in phases) for k in phases[0]},
+        'peak_rss_mb': peak_rss()
+    }
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = load_plugin(
+        Path(args.static),
+        args.workdir,
+        token='benchmark' if args.token else None,
+        latency=args.latency,
+        maimaidxrecordttl=args.ttl
+    )
+    timer = PhaseTimer()
+    instrument(timer)
+    write_catalogue()
+    await load_data()
+
+    from nonebot_plugin_maimaidx.config import platedir, plate_to_version
+    from nonebot_plugin_maimaidx.libraries.maimaidx_update_plate import update_plate_table
+
+    if not (platedir / f'{list(plate_to_version.keys())[-1]}.png').exists():
+        await update_plate_table()
+
+    players: List[Player] = []
+    for n, profile in enumerate(args.profiles):
+        player = make_player(profile, 100000 + n, args.seed)
+        write_player(player)
+        players.append(player)
+
+    selected = cases()
+    if args.cases:
+        selected = {k: v for k, v in selected.items() if k in args.cases}
+
+    results = []
+    for name, (per_player, case) in selected.items():
+        for player in players if per_player else [None]:
+            result = await measure(timer, case, player, args.iterations, args.warmup, args.cold)
+            result = dict(case=name, profile=player.profile if player else None, records=len(player.records) if player else None, **result)
+            results.append(result)
+            status = 'ok' if result['ok'] else 'error'
+            print(f'{name:<28} {result["profile"] or "-":<8} {result["wall_ms"]["mean"]:>10.1f} ms  {status}')
+
+    return {
+        'meta': {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'workdir': str(workdir),
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'ttl': args.ttl,
+            'cold': args.cold,
+            'token': args.token,
+            'latency': args.latency,
+            'seed': args.seed
+        },
+        'results': results
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='nonebot-plugin-maimaidx 基准测试')
+    parser.add_argument('--static', required=True, help='静态资源文件夹')
+    parser.add_argument('--output', '-o', help='结果保存路径')
+    parser.add_argument('--workdir', help='回放文件及成绩暂存目录，默认使用临时目录')
+    parser.add_argument('--iterations', '-n', type=int, default=3, help='每个用例的计时次数')
+    parser.add_argument('--warmup', type=int, default=1, help='每个用例的预热次数')
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES), help='合成玩家')
+    parser.add_argument('--cases', nargs='+', help='只执行指定用例')
+    parser.add_argument('--ttl', type=int, default=0, help='成绩暂存有效期，默认每次重新同步')
+    parser.add_argument('--token', action='store_true', help='使用开发者接口')
+    parser.add_argument('--cold', action='store_true', help='每次执行前清空绘图缓存，测量完整绘图耗时')
+    parser.add_argument('--latency', type=float, default=0, help='回放注入的接口延迟（秒）')
+    parser.add_argument('--seed', type=int, default=0, help='合成玩家随机种子')
+    return parser.parse_args(argv)
+
+
+def run(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    data = asyncio.run(main(args))
+    if args.output:
+        Path(args.output).write_text(json.dumps(data, ensure_ascii=False, indent=4), encoding='utf-8')
+        print(f'结果已保存至 {args.output}')
@@ -33,6 +33,7 @@ async def get_music():
     log.info('正在初始化猜歌数据')
     mai.guess()
     log.success('maimai数据获取完成')
+    scheduler.add_job(song_card_prewarm)
 
 
 scheduler.add_job(alias_apply_status, 'interval', minutes=5)
@@ -15,14 +15,15 @@ from nonebot.adapters.onebot.v11 import (
 )
 from nonebot.params import CommandArg, RegexMatched
 from nonebot.permission import SUPERUSER
-from PIL import Image
 
 from ..config import *
 from ..libraries.image import image_to_base64, text_to_image
 from ..libraries.maimaidx_api_data import maiApi
 from ..libraries.maimaidx_error import *
+from ..libraries.maimaidx_job import Job, jobs
 from ..libraries.maimaidx_model import Alias
 from ..libraries.maimaidx_music import alias, mai, update_local_alias
+from ..libraries.maimaidx_static import staticImage
 
 update_alias        = on_command('更新别名库', priority=5, permission=SUPERUSER)
 alias_local_apply   = on_command('添加本地别名', aliases={'添加本地别称'}, priority=5)
@@ -34,15 +35,16 @@ alias_global_switch = on_regex(r'^全局([开启关闭]+)别名推送$', priorit
 alias_song          = on_regex(r'^(id)?\s?(.+)\s?有什么别[名称]$', re.IGNORECASE, priority=5)
 
 
-@update_alias.handle()
-async def _(event: PrivateMessageEvent):
-    try:
+async def alias_update_job(job: Job) -> str:
+    async with job.step('获取曲目别名'):
         await mai.get_music_alias()
-        log.info('手动更新别名库成功')
-        await update_alias.send('手动更新别名库成功')
-    except:
-        log.error('手动更新别名库失败')
-        await update_alias.send('手动更新别名库失败')
+    return '手动更新别名库成功'
+
+
+@update_alias.handle()
+async def _(bot: Bot, event: PrivateMessageEvent):
+    job, created = jobs.submit('更新别名库', alias_update_job, str(event.user_id), lambda msg: bot.send(event, msg))
+    await update_alias.send(jobs.accepted(job, created))
 
 
 @alias_local_apply.handle()
@@ -88,7 +90,7 @@ async def _(event: MessageEvent, arg: Message = CommandArg()):
             别名：{alias_name}
             现在可用使用唯一标签「{status['Tag']}」来进行投票，例如：同意别名 {status['Tag']}
             浏览{vote_url}查看详情
-            ''') + MessageSegment.image(image_to_base64(Image.open(await maiApi.download_music_pictrue(_id))))
+            ''') + MessageSegment.image(staticImage.base64(await maiApi.download_music_pictrue(_id)))
     except ServerError as e:
         log.error(e)
         msg = str(e)
@@ -196,9 +198,9 @@ async def _(event: PrivateMessageEvent, match = RegexMatched()):
         return
 
 
-async def alias_apply_status():
-    bot: Bot = get_bot()
-    try:
+async def alias_push_job(job: Job, bot: Bot) -> str:
+    """推送别名申请和已添加的别名，并更新别名库"""
+    async with job.step('推送别名申请'):
         if (status := await maiApi.get_alias_status()) and alias.config['global']:
             msg = ['检测到新的别名申请']
             for _s in status:
@@ -217,27 +219,36 @@ async def alias_apply_status():
                         await asyncio.sleep(5)
                     except:
                         continue
-        await asyncio.sleep(5)
-        if end := await maiApi.get_alias_end():
-            if alias.config['global']:
-                msg2 = ['以下是已成功添加别名的曲目']
-                for _e in end:
-                    song_id = str(_e['SongID'])
-                    alias_name = _e['ApplyAlias']
-                    music = mai.total_list.by_id(song_id)
-                    msg2.append(f'ID：{song_id}\n标题：{music.title}\n别名：{alias_name}')
-                if len(msg2) != 1:
-                    for group in await bot.get_group_list():
-                        gid = group['group_id']
-                        if gid in alias.config['disable'] or gid not in alias.config['enable']:
-                            continue
-                        try:
-                            await bot.send_group_msg(group_id=gid, message='\n======\n'.join(msg2))
-                            await asyncio.sleep(5)
-                        except:
-                            continue
+    await asyncio.sleep(5)
+    async with job.step('推送已添加的别名'):
+        end = await maiApi.get_alias_end()
+        if end and alias.config['global']:
+            msg2 = ['以下是已成功添加别名的曲目']
+            for _e in end:
+                song_id = str(_e['SongID'])
+                alias_name = _e['ApplyAlias']
+                music = mai.total_list.by_id(song_id)
+                msg2.append(f'ID：{song_id}\n标题：{music.title}\n别名：{alias_name}')
+            if len(msg2) != 1:
+                for group in await bot.get_group_list():
+                    gid = group['group_id']
+                    if gid in alias.config['disable'] or gid not in alias.config['enable']:
+                        continue
+                    try:
+                        await bot.send_group_msg(group_id=gid, message='\n======\n'.join(msg2))
+                        await asyncio.sleep(5)
+                    except:
+                        continue
+    if end:
+        async with job.step('更新别名库'):
             await mai.get_music_alias()
-    except ServerError as e:
-        log.error(str(e))
+    return '别名推送完成'
+
+
+async def alias_apply_status():
+    try:
+        bot: Bot = get_bot()
     except ValueError as e:
-        log.error(str(e))
\ No newline at end of file
+        log.error(str(e))
+        return
+    await jobs.run('别名推送', lambda job: alias_push_job(job, bot))
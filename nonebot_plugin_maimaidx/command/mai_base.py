@@ -1,18 +1,25 @@
 import random
+import re
 
 from nonebot import on_command, on_regex
-from nonebot.adapters.onebot.v11 import Message, MessageEvent, PrivateMessageEvent
+from nonebot.adapters.onebot.v11 import Bot, Message, MessageEvent, PrivateMessageEvent
 from nonebot.params import CommandArg, RegexMatched
 from nonebot.permission import SUPERUSER
 
+from ..libraries.maimaidx_cache import cache_summary
+from ..libraries.maimaidx_job import Job, jobs
 from ..libraries.maimaidx_music_info import *
 from ..libraries.maimaidx_player_score import *
+from ..libraries.maimaidx_static import staticImage
 from ..libraries.maimaidx_update_plate import *
 from ..libraries.tool import hash
 
 maimaidxhelp    = on_command('帮助maimaiDX', aliases={'帮助maimaidx'}, priority=5)
 maimaidxrepo    = on_command('项目地址maimaiDX', aliases={'项目地址maimaidx'}, priority=5)
 update_data     = on_command('更新maimai数据', permission=SUPERUSER, priority=5)
+cache_stats     = on_command('缓存统计', permission=SUPERUSER, priority=5)
+job_status      = on_command('任务状态', permission=SUPERUSER, priority=5)
+job_cancel      = on_command('取消任务', permission=SUPERUSER, priority=5)
 mai_today       = on_command('今日mai', aliases={'今日舞萌', '今日运势'}, priority=5)
 mai_what        = on_regex(r'.*mai.*什么(.+)?', priority=5)
 random_song     = on_regex(r'^[随来给]个((?:dx|sd|标准))?([绿黄红紫白]?)([0-9]+\+?)$', priority=5)
@@ -21,7 +28,7 @@ rating_ranking  = on_command('查看排名', aliases={'查看排行'}, priority=
 
 @maimaidxhelp.handle()
 async def _():
-    await maimaidxhelp.finish(MessageSegment.image(image_to_base64(Image.open(Root / 'maimaidxhelp.png'))), reply_message=True)
+    await maimaidxhelp.finish(MessageSegment.image(staticImage.base64(Root / 'maimaidxhelp.png')), reply_message=True)
 
 
 @maimaidxrepo.handle()
@@ -29,11 +36,41 @@ async def _():
     await maimaidxrepo.finish('项目地址：https://github.com/Yuri-YuzuChaN/nonebot-plugin-maimaidx\n求star，求宣传~', reply_message=True)
 
 
+async def data_update_job(job: Job) -> str:
+    async with job.step('获取曲目数据'):
+        await mai.get_music()
+    async with job.step('获取曲目别名'):
+        await mai.get_music_alias()
+    async with job.step('初始化猜歌数据'):
+        mai.guess()
+    async with job.step('绘制热门曲目'):
+        await song_card_prewarm()
+    return 'maimai数据更新完成'
+
+
 @update_data.handle()
-async def _(event: PrivateMessageEvent):
-    await mai.get_music()
-    await mai.get_music_alias()
-    await update_data.send('maimai数据更新完成')
+async def _(bot: Bot, event: PrivateMessageEvent):
+    job, created = jobs.submit('更新maimai数据', data_update_job, str(event.user_id), lambda msg: bot.send(event, msg))
+    await update_data.send(jobs.accepted(job, created))
+
+
+@cache_stats.handle()
+async def _():
+    await cache_stats.finish('\n'.join(cache_summary()) or '暂无缓存', reply_message=True)
+
+
+@job_status.handle()
+async def _(arg: Message = CommandArg()):
+    await job_status.finish(jobs.status(arg.extract_plain_text().strip() or None), reply_message=True)
+
+
+@job_cancel.handle()
+async def _(arg: Message = CommandArg()):
+    if not (name := arg.extract_plain_text().strip()):
+        await job_cancel.finish('请输入任务名称，例如：取消任务 更新定数表', reply_message=True)
+    if jobs.cancel(name) is None:
+        await job_cancel.finish(f'任务「{name}」没有在执行或排队', reply_message=True)
+    await job_cancel.finish(f'已取消任务「{name}」', reply_message=True)
 
 
 @mai_today.handle()
@@ -56,7 +93,7 @@ async def _(event: MessageEvent):
     ds = '/'.join([str(_) for _ in music.ds])
     msg += f'{maiconfig.botName} Bot提醒您：打机时不要大力拍打或滑动哦\n今日推荐歌曲：\n'
     msg += f'ID.{music.id} - {music.title}'
-    msg += MessageSegment.image(image_to_base64(Image.open(await maiApi.download_music_pictrue(music.id))))
+    msg += MessageSegment.image(staticImage.base64(await maiApi.download_music_pictrue(music.id)))
     msg += ds
     await mai_today.finish(msg, reply_message=True)
 
@@ -67,8 +104,7 @@ async def _(event: MessageEvent, match = RegexMatched()):
     user = None
     if (point := match.group(1)) and ('推分' in point or '上分' in point or '加分' in point):
         try:
-            obj = await maiApi.query_user('player', qqid=event.user_id)
-            user = UserInfo(**obj)
+            user = (await player_best(event.user_id)).user_info()
             r = random.randint(0, 1)
             _ra = 0
             ignore = []
@@ -123,16 +159,17 @@ async def _(arg: Message = CommandArg()):
     args = arg.extract_plain_text().strip()
     page = 1
     name = ''
+    percent = None
     if args.isdigit():
         page = int(args)
+    elif match := re.match(r'^(?:前|top)\s?([0-9]+(?:\.[0-9]+)?)%$', args, re.IGNORECASE):
+        percent = float(match.group(1))
     else:
         name = args.lower()
 
-    data = await rating_ranking_data(name, page)
+    data = await rating_ranking_data(name, page, percent)
     await rating_ranking.finish(data, reply_message=True)
 
 
 async def data_update_daily():
-    await mai.get_music()
-    mai.guess()
-    log.info('maimaiDX数据更新完毕')
+    await jobs.run('更新maimai数据', data_update_job)
@@ -15,6 +15,7 @@ best50  = on_command('b50', aliases={'B50'}, priority=5)
 minfo   = on_command('minfo', aliases={'minfo', 'Minfo', 'MINFO', 'info', 'Info', 'INFO'}, priority=5)
 ginfo   = on_command('ginfo', aliases={'ginfo', 'Ginfo', 'GINFO'}, priority=5)
 score   = on_command('分数线', priority=5)
+refresh = on_command('刷新成绩', aliases={'同步成绩'}, priority=5)
 
 
 def get_at_qq(message: Message) -> Optional[int]:
@@ -32,6 +33,18 @@ async def _(event: MessageEvent, matcher: Matcher, arg: Message = CommandArg()):
     await matcher.finish(await generate(qqid, username), reply_message=True)
 
 
+@refresh.handle()
+async def _(event: MessageEvent, arg: Message = CommandArg()):
+    qqid = get_at_qq(arg) or event.user_id
+    username = arg.extract_plain_text().strip() or None
+    try:
+        await playerRecord.sync(qqid, username, force=True)
+        msg = '成绩同步完成'
+    except (UserNotFoundError, UserDisabledQueryError) as e:
+        msg = str(e)
+    await refresh.finish(msg, reply_message=True)
+
+
 @minfo.handle()
 async def _(event: MessageEvent, arg: Message = CommandArg()):
     qqid = get_at_qq(arg) or event.user_id
@@ -113,6 +126,8 @@ async def _(arg: Message = CommandArg()):
             命令格式：分数线 <难度+歌曲id> <分数线>
             例如：分数线 紫799 100
             命令将返回分数线允许的 TAP GREAT 容错以及 BREAK 50落等价的 TAP GREAT 数。
+            省略难度或输入多个分数线时返回容错表，例如：分数线 799 100.5 100 99.5
+            只输入歌曲id时返回所有难度常用分数线的容错表。
             以下为 TAP GREAT 的对应表：
             GREAT/GOOD/MISS
             TAP\t1/2.5/5
@@ -123,30 +138,17 @@ async def _(arg: Message = CommandArg()):
         await score.finish(MessageSegment.image(to_bytes_io(msg)), reply_message=True)
     else:
         try:
-            result = re.search(r'([绿黄红紫白])\s?([0-9]+)', _args)
+            result = re.search(r'([绿黄红紫白])?\s?([0-9]+)', _args)
             level_labels = ['绿', '黄', '红', '紫', '白']
-            level_labels2 = ['Basic', 'Advanced', 'Expert', 'Master', 'Re:MASTER']
-            level_index = level_labels.index(result.group(1))
-            chart_id = result.group(2)
-            line = float(args[-1])
-            music = mai.total_list.by_id(chart_id)
-            chart = music.charts[level_index]
-            tap = int(chart.notes.tap)
-            slide = int(chart.notes.slide)
-            hold = int(chart.notes.hold)
-            touch = int(chart.notes.touch) if len(chart.notes) == 5 else 0
-            brk = int(chart.notes.brk)
-            total_score = tap * 500 + slide * 1500 + hold * 1000 + touch * 500 + brk * 2500
-            break_bonus = 0.01 / brk
-            break_50_reduce = total_score * break_bonus / 4
-            reduce = 101 - line
-            if reduce <= 0 or reduce >= 101:
-                raise ValueError
-            msg = dedent(f'''\
-                {music.title} {level_labels2[level_index]}
-                分数线 {line}% 允许的最多 TAP GREAT 数量为 {(total_score * reduce / 10000):.2f}(每个-{10000 / total_score:.4f}%),
-                BREAK 50落(一共{brk}个)等价于 {(break_50_reduce / 100):.3f} 个 TAP GREAT(-{break_50_reduce / total_score * 100:.4f}%)''')
+            level_index = level_labels.index(result.group(1)) if result.group(1) else None
+            music = mai.total_list.by_id(result.group(2))
+            lines = [float(_l) for _l in _args[result.end():].split()]
+            if not lines:
+                if level_index is not None:
+                    raise ValueError
+                lines = [100.5, 100, 99.5, 99, 98, 97]
+            msg = score_line_data(music, lines, level_index)
             await score.finish(MessageSegment.image(to_bytes_io(msg)), reply_message=True)
-        except (AttributeError, ValueError) as e:
+        except (AttributeError, ValueError, IndexError) as e:
             log.exception(e)
             await score.finish('格式错误，输入“分数线 帮助”以查看帮助信息', reply_message=True)
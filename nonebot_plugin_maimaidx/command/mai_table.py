@@ -5,12 +5,14 @@ from nonebot.adapters.onebot.v11 import Bot, Message, MessageEvent, PrivateMessa
 from nonebot.params import RegexMatched
 from nonebot.permission import SUPERUSER
 
+from ..libraries.maimaidx_job import Job, jobs
 from ..libraries.maimaidx_music_info import *
 from ..libraries.maimaidx_player_score import *
+from ..libraries.maimaidx_static import staticImage
 from ..libraries.maimaidx_update_plate import *
 
-update_table            = on_fullmatch('更新定数表', priority=5, permission=SUPERUSER)
-update_plate            = on_fullmatch('更新完成表', priority=5, permission=SUPERUSER)
+update_table            = on_fullmatch(('更新定数表', '强制更新定数表'), priority=5, permission=SUPERUSER)
+update_plate            = on_fullmatch(('更新完成表', '强制更新完成表'), priority=5, permission=SUPERUSER)
 rating_table_pfm        = on_regex(r'^([0-9]+\+?)([apfcp\++])?完成表$', re.IGNORECASE, priority=5)
 plate_table_pfm         = on_regex(r'^([真超檄橙暁晓桃櫻樱紫菫堇白雪輝辉熊華华爽煌舞霸星宙祭祝双])([極极将舞神者]舞?)完成表$', priority=5)
 rating_table            = on_regex(r'([0-9]+\+?)定数表', priority=5)
@@ -27,13 +29,23 @@ def get_at_qq(message: Message) -> Optional[int]:
 
 
 @update_table.handle()
-async def _(event: PrivateMessageEvent):
-    await update_table.send(await update_rating_table())
+async def _(bot: Bot, event: PrivateMessageEvent):
+    force = event.get_plaintext().startswith('强制')
+    async def run(job: Job) -> str:
+        async with job.step('绘制定数表'):
+            return await update_rating_table(force, job.report)
+    job, created = jobs.submit('更新定数表', run, str(event.user_id), lambda msg: bot.send(event, msg), '绘制表格')
+    await update_table.send(jobs.accepted(job, created))
     
 
 @update_plate.handle()
-async def _(event: PrivateMessageEvent):
-    await update_plate.send(await update_plate_table())
+async def _(bot: Bot, event: PrivateMessageEvent):
+    force = event.get_plaintext().startswith('强制')
+    async def run(job: Job) -> str:
+        async with job.step('绘制完成表'):
+            return await update_plate_table(force, job.report)
+    job, created = jobs.submit('更新完成表', run, str(event.user_id), lambda msg: bot.send(event, msg), '绘制表格')
+    await update_plate.send(jobs.accepted(job, created))
 
 
 @rating_table_pfm.handle()
@@ -73,7 +85,7 @@ async def _(match = RegexMatched()):
             img = ratingdir / '14.png'
         else:
             img = ratingdir / f'{args}.png'
-        await rating_table.send(MessageSegment.image(image_to_base64(Image.open(img))), reply_message=True)
+        await rating_table.send(MessageSegment.image(staticImage.base64(img)), reply_message=True)
     else:
         await rating_table.send('无法识别的定数', reply_message=True)
 
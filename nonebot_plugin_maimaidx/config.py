@@ -11,6 +11,12 @@ class Config(BaseModel):
     
     maimaidxtoken: Optional[str]
     maimaidxpath: str
+    maimaidxrecordttl: int = 300
+    maimaidximagescale: float = 1
+    maimaidxapimode: str = 'online'
+    maimaidxfixturepath: Optional[str] = None
+    maimaidxreplaylatency: float = 0
+    maimaidxreplayerrorrate: float = 0
     botName: str = list(driver.config.nickname)[0] if driver.config.nickname else 'Sakura'
 
 maiconfig = Config.parse_obj(driver.config)
@@ -28,6 +34,10 @@ alias_file: Path = static / 'music_alias.json'                  # 别名暂存
 local_alias_file: Path = static / 'local_music_alias.json'      # 本地别名文件
 music_file: Path = static / 'music_data.json'                   # 曲目暂存文件
 chart_file: Path = static / 'music_chart.json'                  # 谱面数据暂存文件
+record_file: Path = static / 'player_record.db'                 # 玩家成绩暂存数据库
+rating_threshold_file: Path = static / 'rating_threshold.bin'   # 底分达成率阈值表
+job_file: Path = static / 'job_status.json'                     # 后台任务上次执行结果
+fixture_dir: Path = Path(maiconfig.maimaidxfixturepath) if maiconfig.maimaidxfixturepath else static / 'fixture'   # 接口录制文件夹
 
 guess_file: Path = static / 'group_guess_switch.json'           # 猜歌开关群文件
 if not guess_file.exists():
@@ -66,6 +76,9 @@ diffs: List[str] = ['Basic', 'Advanced', 'Expert', 'Master', 'Re:Master']
 levelList: List[str] = ['1', '2', '3', '4', '5', '6', '7', '7+', '8', '8+', '9', '9+', '10', '10+', '11', '11+', '12', '12+', '13', '13+', '14', '14+', '15']
 achievementList: List[float] = [50.0, 60.0, 70.0, 75.0, 80.0, 90.0, 94.0, 97.0, 98.0, 99.0, 99.5, 100.0, 100.5]
 BaseRaSpp: List[float] = [7.0, 8.0, 9.6, 11.2, 12.0, 13.6, 15.2, 16.8, 20.0, 20.3, 20.8, 21.1, 21.6, 22.4]
+noteScore: Dict[str, int] = {'tap': 500, 'hold': 1000, 'slide': 1500, 'touch': 500, 'brk': 2500}
+noteLoss: Dict[str, List[float]] = {'tap': [1, 2.5, 5], 'hold': [2, 5, 10], 'slide': [3, 7.5, 15], 'touch': [1, 2.5, 5], 'brk': [5, 12.5, 25]}    # GREAT/GOOD/MISS 相当于 TAP GREAT 的数量
+breakBonusLoss: Dict[str, float] = {'50落': 0.25, '100落': 0.5, 'GREAT': 0.6, 'GOOD': 0.7, 'MISS': 1}                                                  # BREAK 额外奖励损失的比例
 fcl: Dict[str, str] = {'fc': 'FC', 'fcp': 'FCp', 'ap': 'AP', 'app': 'APp', 'sp': 'SP'}
 fsl: Dict[str, str] = {'fs': 'FS', 'fsp': 'FSp', 'fsd': 'FSD', 'fdx': 'FSD', 'fsdp': 'FSDp', 'fdxp': 'FSDp', 'sync': 'SP', 'sp': 'SP'}
 fsl2: Dict[str, str] = {'fs': 'FS', 'fsp': 'FSp', 'fsd': 'FSD', 'fdx': 'FSD', 'fsdp': 'FSDp', 'fdxp': 'FSDp', 'sync': 'Sync', 'sp': 'Sync'}
@@ -0,0 +1,171 @@
+import math
+from functools import lru_cache
+from typing import List, NamedTuple, Sequence, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFont
+
+from ..config import SIYUAN
+
+Color = Tuple[int, int, int]
+
+palette: List[Color] = [
+    (84, 112, 198), (145, 204, 117), (250, 200, 88), (238, 102, 102), (115, 192, 222),
+    (59, 162, 114), (252, 132, 82), (154, 96, 180), (234, 124, 204), (47, 69, 84),
+    (97, 160, 168), (212, 130, 101), (145, 199, 174), (116, 159, 131), (202, 134, 34),
+    (189, 162, 154), (110, 112, 116), (84, 101, 112), (196, 204, 211), (255, 159, 127),
+]
+"""扇区配色，多个系列连续取色，图例颜色唯一"""
+
+_scale = 2
+"""图形以两倍尺寸绘制后缩小，用于抗锯齿"""
+
+
+class PieSeries(NamedTuple):
+    name: str
+    data: Sequence[Tuple[str, Union[int, float]]]
+    """`(名称, 数值)`"""
+    radius: Tuple[float, float]
+    """内外半径，占画布短边一半的比例，内半径为 `0` 时为饼图，否则为环形图"""
+
+
+class _Slice(NamedTuple):
+    name: str
+    value: Union[int, float]
+    percent: float
+    start: float
+    end: float
+    color: Color
+
+
+@lru_cache(maxsize=16)
+def _font(size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(str(SIYUAN), size)
+
+
+def _value(value: Union[int, float]) -> str:
+    return str(int(value)) if value == int(value) else f'{value:.2f}'
+
+
+def _slices(series: PieSeries, offset: int) -> List[_Slice]:
+    total = sum(_v for _, _v in series.data)
+    slices: List[_Slice] = []
+    angle = -90.0
+    for index, (name, value) in enumerate(series.data):
+        color = palette[(offset + index) % len(palette)]
+        percent = value / total * 100 if total else 0
+        sweep = percent * 3.6
+        slices.append(_Slice(name, value, percent, angle, angle + sweep, color))
+        angle += sweep
+    return slices
+
+
+@lru_cache(maxsize=16)
+def _legend(items: Tuple[Tuple[str, Tuple[Tuple[str, Color], ...]], ...]) -> Image.Image:
+    """图例只与系列和扇区名称有关，绘制一次后复用"""
+    font = _font(16)
+    height = sum(26 + 24 * len(_n) + 8 for _, _n in items)
+    im = Image.new('RGBA', (200, height), (255, 255, 255, 0))
+    draw = ImageDraw.Draw(im)
+    y = 0
+    for title, names in items:
+        draw.text((0, y), title, (102, 102, 102), font, 'lt')
+        y += 26
+        for name, color in names:
+            draw.rounded_rectangle((0, y + 2, 24, y + 16), 3, fill=color)
+            draw.text((31, y), name, (51, 51, 51), font, 'lt')
+            y += 24
+        y += 8
+    return im
+
+
+def _spread(labels: List[List[float]], height: int, gap: int) -> None:
+    """同侧标签按纵坐标排列，互相重叠时依次下移，超出画布时整体上移"""
+    labels.sort(key=lambda x: x[1])
+    for n in range(1, len(labels)):
+        labels[n][1] = max(labels[n][1], labels[n - 1][1] + gap)
+    if labels and (overflow := labels[-1][1] - (height - gap)) > 0:
+        for label in labels:
+            label[1] -= overflow
+        for n in range(len(labels) - 2, -1, -1):
+            labels[n][1] = min(labels[n][1], labels[n + 1][1] - gap)
+
+
+def pie_chart(title: str, series: Sequence[PieSeries], size: Tuple[int, int] = (1000, 800)) -> Image.Image:
+    """
+    绘制饼图或环形图，左侧为图例，最外层系列在扇区外侧标注 `名称: 数值 百分比`，
+    内层系列标注在扇区中部，占比过小的扇区只在图例中显示
+
+    全程在内存中绘制，不依赖外部程序和临时文件
+
+    - `title`: 标题
+    - `series`: 系列，按半径从内到外排列
+    - `size`: 画布尺寸
+    """
+    width, height = size
+    cx, cy = width // 2, height // 2 + 30
+    base = min(width, height) / 2
+
+    groups: List[List[_Slice]] = []
+    offset = 0
+    for s in series:
+        groups.append(_slices(s, offset))
+        offset += len(s.data)
+
+    radius = math.ceil(max(_s.radius[1] for _s in series) * base) + 2
+    shapes = Image.new('RGB', (radius * 2 * _scale, radius * 2 * _scale), (255, 255, 255))
+    draw = ImageDraw.Draw(shapes)
+    center = radius * _scale
+    for s, slices in reversed(list(zip(series, groups))):
+        inner, outer = s.radius[0] * base * _scale, s.radius[1] * base * _scale
+        box = (center - outer, center - outer, center + outer, center + outer)
+        if not any(_s.percent for _s in slices):
+            draw.ellipse(box, fill=(220, 220, 220))
+        for _s in slices:
+            if _s.end > _s.start:
+                draw.pieslice(box, _s.start, _s.end, fill=_s.color)
+        if sum(1 for _s in slices if _s.end > _s.start) > 1:
+            for _s in slices:
+                rad = math.radians(_s.start)
+                draw.line((center, center, center + outer * math.cos(rad), center + outer * math.sin(rad)), (255, 255, 255), 2 * _scale)
+        if inner:
+            draw.ellipse((center - inner, center - inner, center + inner, center + inner), fill=(255, 255, 255))
+    im = Image.new('RGB', size, (255, 255, 255))
+    im.paste(shapes.reduce(_scale), (cx - radius, cy - radius))
+    draw = ImageDraw.Draw(im)
+
+    draw.text((width // 2, 30), title, (44, 52, 60), _font(26), 'mt')
+
+    legend = _legend(tuple((s.name, tuple((_s.name, _s.color) for _s in slices)) for s, slices in zip(series, groups)))
+    im.paste(legend, (15, 15), legend)
+
+    label = _font(16)
+    for index, (s, slices) in enumerate(zip(series, groups)):
+        outermost = index == len(series) - 1
+        if outermost:
+            sides: Tuple[List[List[float]], List[List[float]]] = ([], [])
+            edge = s.radius[1] * base
+            for _s in slices:
+                if _s.percent < 0.5:
+                    continue
+                rad = math.radians((_s.start + _s.end) / 2)
+                x0, y0 = cx + edge * math.cos(rad), cy + edge * math.sin(rad)
+                x1, y1 = cx + (edge + 20) * math.cos(rad), cy + (edge + 20) * math.sin(rad)
+                sides[x1 < cx].append([x1, y1, x0, y0, _s])
+            for right, labels in ((True, sides[0]), (False, sides[1])):
+                _spread(labels, height, 22)
+                for x1, y1, x0, y0, _s in labels:
+                    x2 = x1 + 15 if right else x1 - 15
+                    draw.line((x0, y0, x1, y1, x2, y1), _s.color, 1)
+                    text = f'{_s.name}: {_value(_s.value)}  {_s.percent:.2f}%'
+                    draw.text((x2 + 4 if right else x2 - 4, y1), text, (51, 51, 51), label, 'lm' if right else 'rm')
+        else:
+            middle = sum(s.radius) / 2 * base
+            for _s in slices:
+                if _s.percent < 8:
+                    continue
+                rad = math.radians((_s.start + _s.end) / 2)
+                draw.text(
+                    (cx + middle * math.cos(rad), cy + middle * math.sin(rad)),
+                    f'{_s.name}\n{_s.percent:.2f}%', (51, 51, 51), label, 'mm', align='center'
+                )
+    return im
@@ -10,9 +10,13 @@ from ..config import SIYUAN
 
 class DrawText:
 
-    def __init__(self, image: ImageDraw.ImageDraw, font: Path) -> None:
+    def __init__(self, image: ImageDraw.ImageDraw, font: Path, scale: float = 1) -> None:
+        """
+        - `scale`: 坐标、字号、描边宽度的缩放比例，用于直接按输出尺寸绘制
+        """
         self._img = image
         self._font = str(font)
+        self._scale = scale
 
     def get_box(self, text: str, size: int):
         return ImageFont.truetype(self._font, size).getbbox(text)
@@ -28,6 +32,9 @@ class DrawText:
             stroke_fill: Tuple[int, int, int, int] = (0, 0, 0, 0),
             multiline: bool = False):
 
+        if self._scale != 1:
+            pos_x, pos_y = round(pos_x * self._scale), round(pos_y * self._scale)
+            size, stroke_width = max(round(size * self._scale), 1), round(stroke_width * self._scale)
         font = ImageFont.truetype(self._font, size)
         if multiline:
             self._img.multiline_text((pos_x, pos_y), str(text), color, font, anchor, stroke_width=stroke_width, stroke_fill=stroke_fill)
@@ -1,10 +1,12 @@
+import asyncio
 from io import BytesIO
 from pathlib import Path
-from typing import Any, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import httpx
 
 from ..config import coverdir, maiconfig
+from .maimaidx_api_replay import api_transport
 from .maimaidx_error import *
 
 
@@ -19,13 +21,14 @@ class MaimaiAPI:
         """封装Api"""
         self.headers = None
         self.token = None
+        self.transport = api_transport()
 
     def load_token(self) -> None:
         self.token = maiconfig.maimaidxtoken
         self.headers = {'developer-token': self.token}
     
     async def _request(self, method: str, url: str, **kwargs) -> Any:
-        session = httpx.AsyncClient(timeout=30)
+        session = httpx.AsyncClient(timeout=30, transport=self.transport)
         res = await session.request(method, url, **kwargs)
 
         data = None
@@ -204,4 +207,58 @@ class MaimaiAPI:
         return await self._request('GET', self.QQAPI, params=params)
 
 
-maiApi = MaimaiAPI()
\ No newline at end of file
+maiApi = MaimaiAPI()
+
+
+class DevRecordBatcher:
+
+    def __init__(self, api: MaimaiAPI, window: float = 0.05) -> None:
+        """
+        合并 `query_user_dev2` 单曲请求
+
+        在 `window` 秒内到达的请求按用户合并为一次多曲目请求，结果再分发给各个等待者
+
+        - `api`: 接口
+        - `window`: 合并窗口（秒）
+        """
+        self.api = api
+        self.window = window
+        self._pending: Dict[Tuple[Optional[int], Optional[str]], Dict[str, List[asyncio.Future]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def query(self, *, qqid: Optional[int] = None, username: Optional[str] = None, music_id: Union[int, str]) -> List[Dict[str, Any]]:
+        """
+        获取用户指定曲目数据
+
+        - `qqid`: 用户QQ
+        - `username`: 查分器用户名
+        - `music_id`: 曲目id
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault((qqid, username), {}).setdefault(str(music_id), []).append(future)
+        if self._flush_task is None:
+            self._flush_task = loop.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        pending, self._pending, self._flush_task = self._pending, {}, None
+        await asyncio.gather(*[self._flush(*user, waiters) for user, waiters in pending.items()])
+
+    async def _flush(self, qqid: Optional[int], username: Optional[str], waiters: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            data = await self.api.query_user_dev2(qqid=qqid, username=username, music_id=list(waiters)) or {}
+        except Exception as e:
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for song_id, futures in waiters.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(data.get(song_id, []))
+
+
+devRecordBatcher = DevRecordBatcher(maiApi)
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger as log
+
+from ..config import fixture_dir, maiconfig
+
+_dropped_headers = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+def _sort_lists(data: Any) -> Any:
+    if isinstance(data, dict):
+        return {k: _sort_lists(v) for k, v in data.items()}
+    if isinstance(data, list):
+        if all(isinstance(_v, (str, int, float)) for _v in data):
+            return sorted(data, key=str)
+        return [_sort_lists(_v) for _v in data]
+    return data
+
+
+class FixtureStore:
+
+    def __init__(self, path: Path) -> None:
+        """
+        接口录制文件
+
+        每个请求以 `方法 + 地址 + 参数 + 请求体` 的哈希为名，保存 `{key}.json` 元数据和 `{key}.bin` 响应体
+        """
+        self.path = path
+
+    @staticmethod
+    def request_info(method: str, url: str, params: List[Tuple[str, str]], body: bytes) -> Dict[str, Any]:
+        """规范化请求，参数排序，`json` 请求体按键排序，`version`、`music_id` 等列表视为集合排序"""
+        try:
+            content = _sort_lists(json.loads(body)) if body else None
+        except ValueError:
+            content = body.decode('utf-8', 'replace')
+        return {
+            'method': method.upper(),
+            'url': url,
+            'params': sorted([list(_p) for _p in params]),
+            'body': content
+        }
+
+    @classmethod
+    def key(cls, info: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(info, ensure_ascii=False, sort_keys=True).encode()).hexdigest()
+
+    @classmethod
+    def from_request(cls, request: httpx.Request) -> Dict[str, Any]:
+        url = request.url
+        return cls.request_info(
+            request.method,
+            str(url.copy_with(query=None)),
+            list(url.params.multi_items()),
+            request.content
+        )
+
+    def save(self, info: Dict[str, Any], status: int, content_type: Optional[str], content: bytes) -> str:
+        """
+        保存一次响应，返回文件名
+
+        - `info`: 规范化的请求
+        - `status`: 状态码
+        - `content_type`: 响应类型
+        - `content`: 响应体
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        key = self.key(info)
+        (self.path / f'{key}.bin').write_bytes(content)
+        meta = dict(info, status=status, content_type=content_type)
+        (self.path / f'{key}.json').write_text(json.dumps(meta, ensure_ascii=False, indent=4), encoding='utf-8')
+        return key
+
+    def save_json(self, method: str, url: str, data: Any, *, params: Optional[Dict[str, Any]] = None, json_body: Any = None, status: int = 200) -> str:
+        """直接写入一个 `json` 响应，用于生成测试数据"""
+        body = json.dumps(json_body).encode() if json_body is not None else b''
+        request = httpx.Request(method, url, params=params, content=body)
+        return self.save(self.from_request(request), status, 'application/json', json.dumps(data, ensure_ascii=False).encode())
+
+    def load(self, info: Dict[str, Any]) -> Optional[Tuple[int, Optional[str], bytes]]:
+        key = self.key(info)
+        meta = self.path / f'{key}.json'
+        if not meta.exists():
+            return None
+        data = json.loads(meta.read_text(encoding='utf-8'))
+        return data['status'], data['content_type'], (self.path / f'{key}.bin').read_bytes()
+
+
+class RecordTransport(httpx.AsyncBaseTransport):
+
+    def __init__(self, store: FixtureStore) -> None:
+        """真实请求接口，并将响应写入录制文件"""
+        self.store = store
+        self._transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self._transport.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        self.store.save(self.store.from_request(request), response.status_code, response.headers.get('content-type'), content)
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _dropped_headers]
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+
+    def __init__(self, store: FixtureStore, latency: float = 0, error_rate: float = 0, seed: Optional[int] = None) -> None:
+        """
+        使用录制文件响应请求，不访问网络
+
+        - `store`: 录制文件
+        - `latency`: 每个请求注入的延迟（秒）
+        - `error_rate`: 返回 `503` 的概率
+        - `seed`: 随机种子
+        """
+        self.store = store
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.hits = 0
+        self.misses = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            return httpx.Response(503, request=request)
+        info = self.store.from_request(request)
+        if not (data := self.store.load(info)):
+            self.misses += 1
+            log.warning(f'未找到录制的响应：{info["method"]} {info["url"]}')
+            return httpx.Response(404, request=request)
+        self.hits += 1
+        status, content_type, content = data
+        headers = {'content-type': content_type} if content_type else {}
+        return httpx.Response(status, headers=headers, content=content, request=request)
+
+
+def api_transport() -> Optional[httpx.AsyncBaseTransport]:
+    """
+    根据 `maimaidxapimode` 选择接口后端，`online` 时返回 `None` 使用默认网络请求，
+    其他取值直接报错，避免拼写错误时本应回放的测试访问真实接口
+    """
+    mode = maiconfig.maimaidxapimode.lower()
+    if mode == 'record':
+        log.info(f'接口录制模式，响应将保存至 {fixture_dir}')
+        return RecordTransport(FixtureStore(fixture_dir))
+    if mode == 'replay':
+        log.info(f'接口回放模式，使用 {fixture_dir} 中的录制文件')
+        return ReplayTransport(FixtureStore(fixture_dir), maiconfig.maimaidxreplaylatency, maiconfig.maimaidxreplayerrorrate)
+    if mode != 'online':
+        raise ValueError(f'`maimaidxapimode` 仅支持 `online`、`record`、`replay`，当前为 `{maiconfig.maimaidxapimode}`')
+    return None
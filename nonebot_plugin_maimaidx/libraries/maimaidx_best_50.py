@@ -1,7 +1,11 @@
+import hashlib
+import json
 import math
+import time
 import traceback
+from bisect import bisect_right
 from io import BytesIO
-from typing import Tuple, Union, overload
+from typing import List, Optional, Sequence, Tuple, Union, overload
 
 from loguru import logger as log
 from nonebot.adapters.onebot.v11 import MessageSegment
@@ -10,8 +14,10 @@ from PIL import Image, ImageDraw
 from ..config import *
 from .image import DrawText, image_to_base64
 from .maimaidx_api_data import maiApi
+from .maimaidx_cache import LRUCache, image_bytes
 from .maimaidx_error import *
-from .maimaidx_model import ChartInfo, PlayInfoDefault, PlayInfoDev, UserInfo
+from .maimaidx_layer import layers
+from .maimaidx_model import ChartInfo, PlayInfoDefault, PlayInfoDev, PlayRecord, UserInfo
 from .maimaidx_music import mai
 
 
@@ -25,22 +31,64 @@ class Draw:
     title_bg = Image.open(maimaidir / 'title2.png').resize((600, 120))
     design_bg = Image.open(maimaidir / 'design.png').resize((1320, 120))
     _diff = [basic, advanced, expert, master, remaster]
-
-    def __init__(self, image: Image.Image = None) -> None:
+    text_color = [(255, 255, 255, 255), (255, 255, 255, 255), (255, 255, 255, 255), (255, 255, 255, 255), (138, 0, 226, 255)]
+    cell_size = (416, 170)
+    """单个成绩的画布大小，即成绩之间的横向、纵向间距"""
+    design_width = 2200
+    """模板坐标所基于的宽度"""
+    output_width = 1400
+    """默认输出宽度，实际输出宽度再乘以 `maimaidximagescale`"""
+
+    def __init__(self, image: Image.Image = None, scale: float = 1) -> None:
+        """
+        - `image`: 画布，尺寸为模板尺寸乘以 `scale`
+        - `scale`: 绘制比例，坐标、字号、素材尺寸均按模板尺寸书写，绘制时乘以该比例
+        """
         self._im = image
+        self.scale = scale
+        self.size = (round(image.size[0] / scale), round(image.size[1] / scale))
+        self.cacheable = True
+        """绘制过程中使用了占位曲绘时为 `False`，结果不应缓存"""
         dr = ImageDraw.Draw(self._im)
-        self._mr = DrawText(dr, MEIRYO)
-        self._sy = DrawText(dr, SIYUAN)
-        self._tb = DrawText(dr, TBFONT)
-
-    async def whiledraw(self, data: Union[List[ChartInfo], List[PlayInfoDefault], List[PlayInfoDev]], best: bool, height: int = 0) -> None:
+        self._mr = DrawText(dr, MEIRYO, scale)
+        self._sy = DrawText(dr, SIYUAN, scale)
+        self._tb = DrawText(dr, TBFONT, scale)
+
+    @classmethod
+    def render_scale(cls) -> float:
+        """直接绘制为输出尺寸所用的比例"""
+        return cls.output_width / cls.design_width * maiconfig.maimaidximagescale
+
+    def _xy(self, xy: Tuple[int, int]) -> Tuple[int, int]:
+        if self.scale == 1:
+            return xy
+        return round(xy[0] * self.scale), round(xy[1] * self.scale)
+
+    def sprite(self, image: Union[Image.Image, Path, BytesIO], size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """
+        打开素材并缩放至 `size` 乘以绘制比例
+
+        - `image`: 素材或素材路径
+        - `size`: 模板中的尺寸，为空时使用素材原尺寸
+        """
+        im = image if isinstance(image, Image.Image) else Image.open(image)
+        if size is None:
+            if self.scale == 1:
+                return im
+            size = im.size
+        return im.resize(self._xy(size))
+
+    def paste(self, image: Image.Image, xy: Tuple[int, int]) -> None:
+        """在模板坐标 `xy` 处叠加已按比例缩放的图片"""
+        self._im.alpha_composite(image, self._xy(xy))
+
+    async def whiledraw(self, data: Union[List[ChartInfo], List[PlayInfoDefault], List[PlayInfoDev], List[PlayRecord]], best: bool, height: int = 0) -> None:
         # y为第一排纵向坐标，dy为各排间距
         dy = 170
         if data and isinstance(data[0], ChartInfo):
             y = 430 if best else 1700
         else:
             y = height
-        TEXT_COLOR = [(255, 255, 255, 255), (255, 255, 255, 255), (255, 255, 255, 255), (255, 255, 255, 255), (138, 0, 226, 255)]
         x = 70
         for num, info in enumerate(data):
             if num % 5 == 0:
@@ -48,44 +96,85 @@ class Draw:
                 y += dy if num != 0 else 0
             else:
                 x += 416
-
-            cover = Image.open(await maiApi.download_music_pictrue(info.song_id)).resize((135, 135))
-            version = Image.open(maimaidir / f'{info.type.upper()}.png').resize((55, 19))
-            if info.rate.islower():
-                rate = Image.open(maimaidir / f'UI_TTR_Rank_{score_Rank_l[info.rate]}.png').resize((95, 44))
+            self.paste(await self.cell(info), (x, y))
+
+    async def cell(self, info: Union[ChartInfo, PlayInfoDefault, PlayInfoDev, PlayRecord]) -> Image.Image:
+        """
+        单个成绩的图片，相同谱面、相同成绩在所有玩家间复用，缓存于 `cellCache`，
+        曲目数据更新后重新绘制，曲绘获取失败时不缓存
+
+        - `info`: 成绩
+        """
+        key = (
+            self.scale, mai.data_version, int(info.song_id), info.level_index, info.achievements, info.fc, info.fs,
+            info.dxScore, info.ra, info.rate, info.ds, info.type, info.title
+        )
+        if (im := cellCache.get(key)) is None:
+            start = time.perf_counter()
+            im, cacheable = await self.draw_cell(info)
+            if cacheable:
+                cellCache.put(key, im, time.perf_counter() - start)
             else:
-                rate = Image.open(maimaidir / f'UI_TTR_Rank_{info.rate}.png').resize((95, 44))
-
-            self._im.alpha_composite(self._diff[info.level_index], (x, y))
-            self._im.alpha_composite(cover, (x + 5, y + 5))
-            self._im.alpha_composite(version, (x + 80, y + 141))
-            self._im.alpha_composite(rate, (x + 150, y + 98))
-            if info.fc:
-                fc = Image.open(maimaidir / f'UI_MSS_MBase_Icon_{fcl[info.fc]}.png').resize((45, 45))
-                self._im.alpha_composite(fc, (x + 246, y + 99))
-            if info.fs:
-                fs = Image.open(maimaidir / f'UI_MSS_MBase_Icon_{fsl[info.fs]}.png').resize((45, 45))
-                self._im.alpha_composite(fs, (x + 291, y + 99))
-
-            dxscore = sum(mai.total_list.by_id(str(info.song_id)).charts[info.level_index].notes) * 3
-            dxnum = dxScore(info.dxScore / dxscore * 100)
-            if dxnum:
-                self._im.alpha_composite(Image.open(maimaidir / f'UI_GAM_Gauge_DXScoreIcon_0{dxnum}.png'), (x + 335, y + 102))
-
-            self._tb.draw(x + 40, y + 148, 20, info.song_id, TEXT_COLOR[info.level_index], anchor='mm')
-            title = info.title
-            if coloumWidth(title) > 18:
-                title = changeColumnWidth(title, 17) + '...'
-            self._sy.draw(x + 155, y + 20, 20, title, TEXT_COLOR[info.level_index], anchor='lm')
-            self._tb.draw(x + 155, y + 50, 32, f'{info.achievements:.4f}%', TEXT_COLOR[info.level_index], anchor='lm')
-            self._tb.draw(x + 338, y + 82, 20, f'{info.dxScore}/{dxscore}', TEXT_COLOR[info.level_index], anchor='mm')
-            self._tb.draw(x + 155, y + 82, 22, f'{info.ds} -> {info.ra}', TEXT_COLOR[info.level_index], anchor='lm')
+                self.cacheable = False
+        return im
+
+    async def draw_cell(self, info: Union[ChartInfo, PlayInfoDefault, PlayInfoDev, PlayRecord]) -> Tuple[Image.Image, bool]:
+        """
+        绘制单个成绩，画布大小为 `cell_size`，背景透明
+
+        返回元组 `(图片, 是否可以缓存)`，使用占位曲绘时不可缓存
+        """
+        cell = Draw(Image.new('RGBA', self._xy(self.cell_size), (0, 0, 0, 0)), self.scale)
+        color = self.text_color[info.level_index]
+
+        file = await maiApi.download_music_pictrue(info.song_id)
+        cover = cell.sprite(file, (135, 135))
+        version = cell.sprite(maimaidir / f'{info.type.upper()}.png', (55, 19))
+        if info.rate.islower():
+            rate = cell.sprite(maimaidir / f'UI_TTR_Rank_{score_Rank_l[info.rate]}.png', (95, 44))
+        else:
+            rate = cell.sprite(maimaidir / f'UI_TTR_Rank_{info.rate}.png', (95, 44))
+
+        cell.paste(cell.sprite(self._diff[info.level_index]), (0, 0))
+        cell.paste(cover, (5, 5))
+        cell.paste(version, (80, 141))
+        cell.paste(rate, (150, 98))
+        if info.fc:
+            fc = cell.sprite(maimaidir / f'UI_MSS_MBase_Icon_{fcl[info.fc]}.png', (45, 45))
+            cell.paste(fc, (246, 99))
+        if info.fs:
+            fs = cell.sprite(maimaidir / f'UI_MSS_MBase_Icon_{fsl[info.fs]}.png', (45, 45))
+            cell.paste(fs, (291, 99))
+
+        dxscore = mai.total_list.by_id(info.song_id).charts[info.level_index].max_dx_score
+        dxnum = dxScore(info.dxScore / dxscore * 100)
+        if dxnum:
+            cell.paste(cell.sprite(maimaidir / f'UI_GAM_Gauge_DXScoreIcon_0{dxnum}.png'), (335, 102))
+
+        cell._tb.draw(40, 148, 20, info.song_id, color, anchor='mm')
+        title = info.title
+        if coloumWidth(title) > 18:
+            title = changeColumnWidth(title, 17) + '...'
+        cell._sy.draw(155, 20, 20, title, color, anchor='lm')
+        cell._tb.draw(155, 50, 32, f'{info.achievements:.4f}%', color, anchor='lm')
+        cell._tb.draw(338, 82, 20, f'{info.dxScore}/{dxscore}', color, anchor='mm')
+        cell._tb.draw(155, 82, 22, f'{info.ds} -> {info.ra}', color, anchor='lm')
+        return cell._im, not (isinstance(file, Path) and file.name == '11000.png' and int(info.song_id) != 11000)
 
 
 class DrawBest(Draw):
 
-    def __init__(self, UserInfo: UserInfo, qqId: Optional[Union[int, str]] = None) -> None:
-        super().__init__(Image.open(maimaidir / 'b50_bg.png').convert('RGBA'))
+    template_version = 2
+    """修改绘图内容后递增，使旧的缓存失效"""
+    design_width = 1800
+    output_width = 1760
+
+    def __init__(self, UserInfo: UserInfo, qqId: Optional[Union[int, str]] = None, scale: Optional[float] = None) -> None:
+        """
+        - `scale`: 绘制比例，默认按 `render_scale` 直接绘制为输出尺寸
+        """
+        scale = scale or self.render_scale()
+        super().__init__(layers.b50_base(scale), scale)
         self.userName = UserInfo.nickname
         self.plate = UserInfo.plate
         self.addRating = UserInfo.additional_rating
@@ -93,6 +182,7 @@ class DrawBest(Draw):
         self.sdBest = UserInfo.charts.sd
         self.dxBest = UserInfo.charts.dx
         self.qqId = qqId
+        self._avatar: Optional[bytes] = None
 
     def _findRaPic(self) -> str:
         if self.Rating < 1000:
@@ -126,48 +216,66 @@ class DrawBest(Draw):
             num = f'{self.addRating + 1:02d}'
         return f'UI_DNM_DaniPlate_{num}.png'
 
+    async def avatar(self) -> Optional[bytes]:
+        """QQ头像，获取失败时为 `None`"""
+        if self.qqId and self._avatar is None:
+            try:
+                self._avatar = await maiApi.qqlogo(self.qqId)
+            except Exception:
+                self._avatar = b''
+        return self._avatar or None
+
+    async def fingerprint(self) -> str:
+        """影响绘图结果的所有输入的哈希值，用作 `b50Cache` 的键"""
+        avatar = await self.avatar()
+        data = json.dumps([
+            self.template_version,
+            self.scale,
+            mai.data_version,
+            maiconfig.botName,
+            self.userName,
+            self.plate,
+            self.addRating,
+            self.Rating,
+            [_c.dict() for _c in self.sdBest],
+            [_c.dict() for _c in self.dxBest],
+            hashlib.sha1(avatar).hexdigest() if avatar else None
+        ], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(data.encode()).hexdigest()
+
     async def draw(self) -> Image.Image:
 
-        logo = Image.open(maimaidir / 'logo.png').resize((378, 172))
-        dx_rating = Image.open(maimaidir / self._findRaPic()).resize((300, 59))
-        Name = Image.open(maimaidir / 'Name.png')
-        MatchLevel = Image.open(maimaidir / self._findMatchLevel()).resize((134, 55))
-        ClassLevel = Image.open(maimaidir / 'UI_FBR_Class_00.png').resize((144, 87))
-        rating = Image.open(maimaidir / 'UI_CMN_Shougou_Rainbow.png').resize((454, 50))
+        dx_rating = self.sprite(maimaidir / self._findRaPic(), (300, 59))
+        MatchLevel = self.sprite(maimaidir / self._findMatchLevel(), (134, 55))
 
-        self._im.alpha_composite(logo, (5, 130))
-        if self.plate:
-            plate = Image.open(platedir / f'{self.plate}.png').resize((1420, 230))
-        else:
-            plate = Image.open(maimaidir / 'UI_Plate_300501.png').resize((1420, 230))
-        self._im.alpha_composite(plate, (390, 100))
-        icon = Image.open(maimaidir / 'UI_Icon_309503.png').resize((214, 214))
-        self._im.alpha_composite(icon, (398, 108))
-        if self.qqId:
+        self.paste(layers.b50_header(self.plate, self.scale), (390, 100))
+        if avatar := await self.avatar():
             try:
-                qqLogo = Image.open(BytesIO(await maiApi.qqlogo(self.qqId)))
-                self._im.alpha_composite(Image.new('RGBA', (203, 203), (255, 255, 255, 255)), (404, 114))
-                self._im.alpha_composite(qqLogo.convert('RGBA').resize((201, 201)), (405, 115))
+                qqLogo = Image.open(BytesIO(avatar))
+                self.paste(Image.new('RGBA', self._xy((203, 203)), (255, 255, 255, 255)), (404, 114))
+                self.paste(self.sprite(qqLogo.convert('RGBA'), (201, 201)), (405, 115))
             except Exception:
                 pass
-        self._im.alpha_composite(dx_rating, (620, 122))
+        self.paste(dx_rating, (620, 122))
         Rating = f'{self.Rating:05d}'
         for n, i in enumerate(Rating):
-            self._im.alpha_composite(Image.open(maimaidir / f'UI_NUM_Drating_{i}.png').resize((28, 34)), (760 + 23 * n, 137))
-        self._im.alpha_composite(Name, (620, 200))
-        self._im.alpha_composite(MatchLevel, (935, 205))
-        self._im.alpha_composite(ClassLevel, (926, 105))
-        self._im.alpha_composite(rating, (620, 275))
+            self.paste(self.sprite(maimaidir / f'UI_NUM_Drating_{i}.png', (28, 34)), (760 + 23 * n, 137))
+        self.paste(MatchLevel, (935, 205))
 
         self._sy.draw(635, 235, 40, self.userName, (0, 0, 0, 255), 'lm')
         sdrating, dxrating = sum([_.ra for _ in self.sdBest]), sum([_.ra for _ in self.dxBest])
         self._tb.draw(847, 295, 28, f'B35: {sdrating} + B15: {dxrating} = {self.Rating}', (0, 0, 0, 255), 'mm', 3, (255, 255, 255, 255))
-        self._mr.draw(900, 2465, 35, f'Designed by Yuri-YuzuChaN & BlueDeer233 | Generated by {maiconfig.botName} BOT', (0, 50, 100, 255), 'mm', 3, (255, 255, 255, 255))
 
         await self.whiledraw(self.sdBest, True)
         await self.whiledraw(self.dxBest, False)
 
-        return self._im.resize((1760, 2000))
+        return self._im
+
+
+cellCache: LRUCache[Image.Image] = LRUCache('cell', 128 * 1024 * 1024, image_bytes)
+"""单个成绩的图片，以绘制比例及影响绘制的成绩字段为键，容量为字节数"""
+b50Cache: LRUCache[str] = LRUCache('b50', 64 * 1024 * 1024, len)
+"""已编码的 `b50` 图片，以 `DrawBest.fingerprint` 为键，容量为字节数"""
 
 
 def dxScore(dx: int) -> int:
@@ -295,6 +403,21 @@ def computeRa(ds: float, achievement: float, *, onlyrate: bool = False, israte:
 
     return data
 
+
+def computeRaBatch(ds: Sequence[float], achievements: Sequence[float]) -> Tuple[List[int], List[int]]:
+    """
+    批量计算底分，返回 `(底分列表, 评价列表)`，评价为 `score_Rank` 的下标，结果与逐个调用 `computeRa` 一致
+
+    单个成绩的分支判断比二分查找更快，逐个计算时仍使用 `computeRa`
+
+    - `ds`: 定数列表
+    - `achievements`: 成绩列表
+    """
+    floor, base = math.floor, BaseRaSpp
+    rank = [bisect_right(achievementList, _acc) for _acc in achievements]
+    ra = [floor(_ds * (min(100.5, _acc) / 100) * base[_i]) for _ds, _acc, _i in zip(ds, achievements, rank)]
+    return ra, rank
+
 def generateAchievementList(ds: float):
     _achievementList = []
     for index, acc in enumerate(achievementList):
@@ -309,23 +432,3 @@ def generateAchievementList(ds: float):
             c_acc = math.ceil(c_acc * 10000) / 10000
     _achievementList.append(100.5)
     return _achievementList
-
-async def generate(qqid: Optional[int] = None, username: Optional[str] = None) -> str:
-    try:
-        if username:
-            qqid = None
-        obj = await maiApi.query_user('player', qqid=qqid, username=username)
-
-        mai_info = UserInfo(**obj)
-        draw_best = DrawBest(mai_info, qqid)
-        
-        pic = await draw_best.draw()
-        msg = MessageSegment.image(image_to_base64(pic))
-    except UserNotFoundError as e:
-        msg = str(e)
-    except UserDisabledQueryError as e:
-        msg = str(e)
-    except Exception as e:
-        log.error(traceback.format_exc())
-        msg = f'未知错误：{type(e)}\n请联系Bot管理员'
-    return msg
\ No newline at end of file
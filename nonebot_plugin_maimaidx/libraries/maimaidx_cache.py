@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, List, NamedTuple, Optional, TypeVar
+
+V = TypeVar('V')
+
+
+class CacheEntry(NamedTuple):
+    value: object
+    size: int
+    cost: float
+    """生成该值的耗时（秒），命中时计入节省的时间"""
+
+
+class LRUCache(Generic[V]):
+
+    def __init__(self, name: str, max_size: int, sizeof: Callable[[V], int] = lambda _: 1) -> None:
+        """
+        按最近使用淘汰的缓存，创建后自动登记到 `caches`，用于 `缓存统计`
+
+        - `name`: 缓存名称
+        - `max_size`: 容量，单位由 `sizeof` 决定，默认为条目数
+        - `sizeof`: 计算单个值占用的容量，例如图片字节数
+        """
+        self.name = name
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved = 0.0
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        caches[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """获取缓存，命中时移至队尾并累计节省的时间"""
+        if (entry := self._entries.get(key)) is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.saved += entry.cost
+        return entry.value
+
+    def put(self, key: Hashable, value: V, cost: float = 0) -> None:
+        """
+        写入缓存，超出容量时淘汰最久未使用的条目，单个值超过容量时不缓存
+
+        - `key`: 键
+        - `value`: 值
+        - `cost`: 生成该值的耗时（秒）
+        """
+        size = self.sizeof(value)
+        if size > self.max_size:
+            return
+        if (old := self._entries.pop(key, None)) is not None:
+            self.size -= old.size
+        self._entries[key] = CacheEntry(value, size, cost)
+        self.size += size
+        while self.size > self.max_size:
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry.size
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        if (entry := self._entries.pop(key, None)) is None:
+            return None
+        self.size -= entry.size
+        return entry.value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def summary(self) -> str:
+        return (
+            f'{self.name}：{len(self)}条，容量 {self.size}/{self.max_size}，'
+            f'命中 {self.hits}/{self.hits + self.misses}（{self.hit_rate:.1%}），'
+            f'淘汰 {self.evictions}条，节省 {self.saved:.2f}秒'
+        )
+
+
+caches: Dict[str, LRUCache] = {}
+
+
+def image_bytes(image) -> int:
+    """`PIL` 图片占用的内存，用作图片缓存的 `sizeof`"""
+    return image.width * image.height * len(image.getbands())
+
+
+def cache_summary() -> List[str]:
+    """所有缓存的统计信息"""
+    return [_c.summary() for _c in caches.values()]
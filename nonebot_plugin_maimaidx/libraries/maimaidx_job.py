@@ -0,0 +1,289 @@
+import asyncio
+import json
+import time
+import traceback
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from loguru import logger as log
+
+from ..config import *
+from .tool import writefile
+
+Notify = Callable[[str], Awaitable[Any]]
+
+
+class JobStep(NamedTuple):
+    name: str
+    elapsed: float
+    """耗时（秒）"""
+
+
+class Job:
+
+    def __init__(self, name: str, trigger: str, notify: Optional[Notify] = None, group: Optional[str] = None) -> None:
+        """
+        一次任务执行，由 `JobManager.submit` 创建
+
+        - `name`: 任务类型，同类型任务同一时间只有一个在执行
+        - `trigger`: 触发方式，例如 `定时` 或触发者的QQ号
+        - `notify`: 任务结束时发送结果
+        - `group`: 任务分组，同组的不同类型任务也依次执行，默认为任务类型
+        """
+        self.name = name
+        self.group = group or name
+        self.trigger = trigger
+        self.notify = notify
+        self.status = '排队中'
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: List[JobStep] = []
+        self.current: Optional[str] = None
+        """正在执行的步骤"""
+        self._step_start = 0.0
+        self.progress: Optional[str] = None
+        """最近一条进度"""
+        self.message = ''
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @asynccontextmanager
+    async def step(self, name: str) -> AsyncIterator[None]:
+        """
+        记录步骤耗时，`async with job.step('获取曲目数据'): ...`，步骤中断时由 `interrupt` 记录
+
+        - `name`: 步骤名称
+        """
+        self.current = name
+        self._step_start = time.perf_counter()
+        yield
+        self.steps.append(JobStep(name, time.perf_counter() - self._step_start))
+        self.current = None
+
+    def interrupt(self) -> None:
+        """任务失败或取消时记录未完成的步骤"""
+        if self.current is not None:
+            self.steps.append(JobStep(f'{self.current}（中断）', time.perf_counter() - self._step_start))
+
+    async def report(self, text: str) -> None:
+        """
+        更新进度，可在 `任务状态` 中查看，可直接作为 `update_rating_table` 等函数的进度回调
+
+        - `text`: 进度
+        """
+        self.progress = text
+        log.info(f'[{self.name}] {text}')
+
+    def dump(self) -> Dict[str, Any]:
+        return {
+            'status': self.status,
+            'trigger': self.trigger,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'elapsed': self.elapsed,
+            'steps': [list(_s) for _s in self.steps],
+            'message': self.message,
+        }
+
+
+def _datetime(timestamp: Optional[float]) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%m-%d %H:%M:%S') if timestamp else '-'
+
+
+class JobManager:
+
+    def __init__(self) -> None:
+        """
+        管理员操作和定时任务的后台执行
+
+        每种任务同一时间只有一个在执行，执行中再次提交时最多排队一个，重复提交返回已排队的任务，
+        指定相同 `group` 的不同类型任务共用一把锁，例如定数表和完成表不会同时绘制；
+        任务结束后记录状态、各步骤耗时和结果，保存至 `job_file`，排队中被取消的任务不覆盖上一次的记录
+        """
+        self.running: Dict[str, Job] = {}
+        self.queued: Dict[str, Job] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        try:
+            self.history: Dict[str, Dict[str, Any]] = json.loads(job_file.read_text(encoding='utf-8'))
+        except Exception:
+            self.history = {}
+
+    def submit(
+        self,
+        name: str,
+        func: Callable[[Job], Awaitable[Optional[str]]],
+        trigger: str = '定时',
+        notify: Optional[Notify] = None,
+        group: Optional[str] = None
+    ) -> Tuple[Job, bool]:
+        """
+        提交任务，立即返回
+
+        返回元组 `(任务, 是否新建)`，已有同类型任务排队时返回该任务
+
+        - `name`: 任务类型
+        - `func`: 任务内容，返回值作为任务结果
+        - `trigger`: 触发方式
+        - `notify`: 任务结束时发送结果
+        - `group`: 任务分组，默认为任务类型
+        """
+        if (job := self.queued.get(name)) is not None:
+            return job, False
+        job = Job(name, trigger, notify, group)
+        self.queued[name] = job
+        job.task = asyncio.create_task(self._run(job, func))
+        job.task.add_done_callback(lambda _: self._cancelled_before_start(job))
+        return job, True
+
+    async def run(self, name: str, func: Callable[[Job], Awaitable[Optional[str]]]) -> Job:
+        """
+        定时任务使用，同类型任务正在执行或排队时跳过，否则提交并等待结束
+
+        - `name`: 任务类型
+        - `func`: 任务内容
+        """
+        if name in self.running or name in self.queued:
+            log.info(f'[{name}] 上一次任务尚未结束，跳过本次定时任务')
+            return self.queued.get(name) or self.running[name]
+        job, _ = self.submit(name, func)
+        await asyncio.wait([job.task])
+        return job
+
+    async def _run(self, job: Job, func: Callable[[Job], Awaitable[Optional[str]]]) -> None:
+        lock = self._locks.setdefault(job.group, asyncio.Lock())
+        try:
+            async with lock:
+                self.queued.pop(job.name, None)
+                self.running[job.name] = job
+                job.status = '执行中'
+                job.started_at = time.time()
+                job.message = await func(job) or ''
+                job.status = '完成'
+        except asyncio.CancelledError:
+            job.status = '已取消'
+            job.message = f'取消时正在执行：{job.current}' if job.current else ''
+            job.interrupt()
+        except Exception as e:
+            log.error(traceback.format_exc())
+            job.status = '失败'
+            job.message = f'{type(e).__name__}: {e}'
+            job.interrupt()
+        finally:
+            job.finished_at = time.time()
+            if self.queued.get(job.name) is job:
+                del self.queued[job.name]
+            if self.running.get(job.name) is job:
+                del self.running[job.name]
+            log.info(f'[{job.name}] {job.status}，耗时{job.elapsed:.2f}s')
+            if job.started_at is not None:
+                await self._save(job)
+            await self._notify(job)
+
+    def _cancelled_before_start(self, job: Job) -> None:
+        """任务在 `_run` 开始执行前被取消时不会进入 `_run`，在此移出队列并发送结果"""
+        if job.status != '排队中':
+            return
+        job.status = '已取消'
+        job.finished_at = time.time()
+        if self.queued.get(job.name) is job:
+            del self.queued[job.name]
+        log.info(f'[{job.name}] 排队中的任务已取消')
+        asyncio.create_task(self._notify(job))
+
+    async def _notify(self, job: Job) -> None:
+        if job.notify:
+            try:
+                await job.notify(f'{job.name}{job.status}，耗时{job.elapsed:.2f}s\n{job.message}'.strip())
+            except Exception:
+                log.error(traceback.format_exc())
+
+    async def _save(self, job: Job) -> None:
+        self.history[job.name] = job.dump()
+        try:
+            await writefile(job_file, self.history)
+        except Exception:
+            log.error(traceback.format_exc())
+
+    def accepted(self, job: Job, created: bool) -> str:
+        """
+        提交任务后的回复
+
+        - `job`: `submit` 返回的任务
+        - `created`: 是否新建
+        """
+        if not created:
+            return f'{job.name}已在排队中，可使用「任务状态」查看进度'
+        if job.name in self.running:
+            return f'上一次{job.name}尚未结束，已加入队列，完成后将发送结果'
+        if (running := next((_j for _j in self.running.values() if _j.group == job.group), None)) is not None:
+            return f'{running.name}尚未结束，{job.name}已加入队列，完成后将发送结果'
+        return f'已开始{job.name}，完成后将发送结果，可使用「任务状态」查看进度'
+
+    def cancel(self, name: str) -> Optional[Job]:
+        """
+        取消任务，优先取消排队中的任务；线程池中正在绘制的图片会继续完成，但结果不会写入
+
+        - `name`: 任务类型
+        """
+        job = self.queued.get(name) or self.running.get(name)
+        if job is not None and job.task is not None:
+            job.task.cancel()
+        return job
+
+    def status(self, name: Optional[str] = None) -> str:
+        """
+        任务状态，不指定类型时列出所有任务的概况
+
+        - `name`: 任务类型
+        """
+        if name is None:
+            names = list(dict.fromkeys([*self.running, *self.queued, *self.history]))
+            if not names:
+                return '暂无任务记录'
+            lines = []
+            for _n in names:
+                if (job := self.running.get(_n)) is not None:
+                    line = f'{_n}：执行中 {job.elapsed:.0f}s'
+                    if job.current:
+                        line += f'，{job.current}'
+                    if job.progress:
+                        line += f'，{job.progress}'
+                elif (last := self.history.get(_n)) is not None:
+                    line = f'{_n}：上次{last["status"]}于 {_datetime(last["finished_at"])}，耗时{last["elapsed"]:.2f}s'
+                else:
+                    lines.append(f'{_n}：排队中')
+                    continue
+                if _n in self.queued:
+                    line += '（另有一个排队中）'
+                lines.append(line)
+            return '\n'.join(lines)
+
+        if (job := self.running.get(name)) is not None:
+            data = job.dump()
+            lines = [f'{name}：执行中，开始于 {_datetime(job.started_at)}，已执行{job.elapsed:.2f}s，触发：{job.trigger}']
+            if job.current:
+                lines.append(f'当前步骤：{job.current}')
+            if job.progress:
+                lines.append(f'进度：{job.progress}')
+        elif (data := self.history.get(name)) is not None:
+            lines = [f'{name}：上次{data["status"]}，开始于 {_datetime(data["started_at"])}，耗时{data["elapsed"]:.2f}s，触发：{data["trigger"]}']
+        elif (job := self.queued.get(name)) is not None:
+            return f'{name}：排队中，提交于 {_datetime(job.created_at)}，已等待{time.time() - job.created_at:.2f}s，触发：{job.trigger}'
+        else:
+            return f'没有任务「{name}」的记录'
+        lines.extend(f'- {_n}：{_t:.2f}s' for _n, _t in data['steps'])
+        if data['message']:
+            lines.append(data['message'])
+        if name in self.queued:
+            lines.append('另有一个任务排队中')
+        return '\n'.join(lines)
+
+
+jobs = JobManager()
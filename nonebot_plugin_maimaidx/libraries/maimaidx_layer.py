@@ -0,0 +1,144 @@
+import time
+from pathlib import Path
+from typing import Callable, Hashable, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from ..config import *
+from .image import DrawText
+from .maimaidx_cache import LRUCache, image_bytes
+
+AssetVersion = Tuple[Tuple[str, int, int], ...]
+
+
+class LayerCache:
+
+    def __init__(self) -> None:
+        """
+        各模板中与玩家无关的静态图层，首次使用时合成，之后每次绘图从缓存复制
+
+        缓存键包含素材文件的修改时间和大小，替换素材后自动重新合成
+        """
+        self._cache: LRUCache[Image.Image] = LRUCache('layer', 256 * 1024 * 1024, image_bytes)
+
+    @staticmethod
+    def version(*files: Path) -> AssetVersion:
+        """素材版本，文件不存在时记为 `0`"""
+        version = []
+        for file in files:
+            try:
+                stat = file.stat()
+                version.append((file.name, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                version.append((file.name, 0, 0))
+        return tuple(version)
+
+    def layer(self, key: Hashable, files: Tuple[Path, ...], build: Callable[[], Image.Image]) -> Image.Image:
+        """
+        获取图层，返回缓存中的对象，调用方不能修改
+
+        - `key`: 图层名称及参数
+        - `files`: 图层使用的素材
+        - `build`: 合成图层
+        """
+        key = (key, self.version(*files))
+        if (im := self._cache.get(key)) is None:
+            start = time.perf_counter()
+            im = build()
+            self._cache.put(key, im, time.perf_counter() - start)
+        return im
+
+    def scaled(self, key: Hashable, files: Tuple[Path, ...], build: Callable[[], Image.Image], scale: float) -> Image.Image:
+        """按模板尺寸合成后缩放至 `scale` 的图层，缩放结果同样缓存"""
+        if scale == 1:
+            return self.layer(key, files, build)
+        def resize() -> Image.Image:
+            im = self.layer(key, files, build)
+            return im.resize((round(im.width * scale), round(im.height * scale)))
+        return self.layer((key, scale), files, resize)
+
+    def b50_base(self, scale: float = 1) -> Image.Image:
+        """
+        `b50` 背景，包含 logo 和底部署名
+
+        - `scale`: 绘制比例
+        """
+        def build() -> Image.Image:
+            im = Image.open(maimaidir / 'b50_bg.png').convert('RGBA')
+            im.alpha_composite(Image.open(maimaidir / 'logo.png').resize((378, 172)), (5, 130))
+            DrawText(ImageDraw.Draw(im), MEIRYO).draw(
+                900, 2465, 35, f'Designed by Yuri-YuzuChaN & BlueDeer233 | Generated by {maiconfig.botName} BOT',
+                (0, 50, 100, 255), 'mm', 3, (255, 255, 255, 255)
+            )
+            return im
+        files = (maimaidir / 'b50_bg.png', maimaidir / 'logo.png', MEIRYO)
+        return self.scaled(('b50', maiconfig.botName), files, build, scale).copy()
+
+    def b50_header(self, plate: Optional[str], scale: float = 1) -> Image.Image:
+        """
+        `b50` 姓名框，包含牌子、默认头像、`Name`、段位框和称号框，左上角位于 `(390, 100)`
+
+        - `plate`: 牌子，为空时使用默认牌子
+        - `scale`: 绘制比例
+        """
+        file = platedir / f'{plate}.png' if plate else maimaidir / 'UI_Plate_300501.png'
+        parts = [
+            (maimaidir / 'UI_Icon_309503.png', (214, 214), (8, 8)),
+            (maimaidir / 'Name.png', None, (230, 100)),
+            (maimaidir / 'UI_FBR_Class_00.png', (144, 87), (536, 5)),
+            (maimaidir / 'UI_CMN_Shougou_Rainbow.png', (454, 50), (230, 175)),
+        ]
+        def build() -> Image.Image:
+            im = Image.open(file).resize((1420, 230)).convert('RGBA')
+            for part, size, pos in parts:
+                image = Image.open(part)
+                im.alpha_composite(image.resize(size) if size else image, pos)
+            return im
+        return self.scaled(('b50_header', plate), (file, *(_p[0] for _p in parts)), build, scale)
+
+    def image(self, file: Path) -> Image.Image:
+        """
+        整张作为底图的图片文件，例如定数表、完成表，解码结果缓存，返回副本
+
+        - `file`: 图片文件
+        """
+        return self.layer(('image', file), (file,), lambda: Image.open(file).convert('RGBA')).copy()
+
+    def song_base(self) -> Image.Image:
+        """`查看谱面` 背景，包含底部署名"""
+        def build() -> Image.Image:
+            im = Image.open(maimaidir / 'song_bg.png').convert('RGBA')
+            DrawText(ImageDraw.Draw(im), HANYI).draw(
+                900, 1900, 30, f'Designed by Yuri-YuzuChaN | Generated by {maiconfig.botName} BOT', anchor='mm'
+            )
+            return im
+        return self.layer(('song', maiconfig.botName), (maimaidir / 'song_bg.png', HANYI), build).copy()
+
+    def info_base(self) -> Image.Image:
+        """`info` 背景，包含底部署名"""
+        def build() -> Image.Image:
+            im = Image.open(maimaidir / 'info_bg.png').convert('RGBA')
+            DrawText(ImageDraw.Draw(im), HANYI).draw(
+                900, 1265, 30, f'Designed by Yuri-YuzuChaN & BlueDeer233 | Generated by {maiconfig.botName} Bot',
+                (0, 86, 162, 255), 'mm'
+            )
+            return im
+        return self.layer(('info', maiconfig.botName), (maimaidir / 'info_bg.png', HANYI), build).copy()
+
+    def strip(self, height: int, scale: float = 1) -> Image.Image:
+        """
+        `buddies_bg_2.png` 缩放至 `2200x3667` 后底部高度为 `height` 的部分，用于 `进度`、`分数列表`
+
+        缩放后的背景只生成一次，裁剪结果为新图片，可以直接修改
+
+        - `height`: 模板中的图片高度
+        - `scale`: 绘制比例
+        """
+        def build() -> Image.Image:
+            return Image.open(maimaidir / 'buddies_bg_2.png').convert('RGBA').resize((round(2200 * scale), round(3667 * scale)))
+        bg = self.layer(('buddies', scale), (maimaidir / 'buddies_bg_2.png',), build)
+        bg_w, bg_h = bg.size
+        return bg.crop((0, bg_h - round(height * scale), bg_w, bg_h))
+
+
+layers = LayerCache()
@@ -0,0 +1,182 @@
+import heapq
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from ..config import *
+from .maimaidx_api_data import maiApi
+from .maimaidx_best_50 import computeRa
+from .maimaidx_model import Music, UserInfo
+from .maimaidx_music import mai
+from .maimaidx_player_record import RecordRow, playerRecord
+
+BestEntry = Dict[str, Any]
+
+
+def _rank_key(entry: BestEntry) -> Tuple[int, float]:
+    return entry['ra'], entry['achievements']
+
+
+class WhatIf(NamedTuple):
+    total: int
+    """模拟后的底分合计"""
+    gain: int
+    """底分合计的变化"""
+    position: Optional[int]
+    """模拟成绩在列表中的名次，从 `0` 开始，未进入列表为 `None`"""
+    displaced: Optional[BestEntry]
+    """被挤出列表的成绩，同一谱面的旧成绩不算挤出"""
+
+
+class BestList:
+
+    def __init__(self, entries: Iterable[BestEntry], size: int) -> None:
+        """
+        固定容量的最佳成绩列表，即 `b35` 或 `b15`
+
+        使用堆选出底分最高的 `size` 个成绩，按 `(底分, 达成率)` 降序排列
+
+        - `entries`: 成绩，需包含 `song_id`、`level_index`、`achievements`、`ra`
+        - `size`: 容量
+        """
+        self.size = size
+        self.entries: List[BestEntry] = heapq.nlargest(size, entries, key=_rank_key)
+        self.total: int = sum(_e['ra'] for _e in self.entries)
+        self._index: Dict[Tuple[int, int], int] = {
+            (int(_e['song_id']), _e['level_index']): _n for _n, _e in enumerate(self.entries)
+        }
+        self._ra: List[int] = [-_e['ra'] for _e in self.entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def full(self) -> bool:
+        return len(self.entries) >= self.size
+
+    @property
+    def lowest(self) -> int:
+        """进入列表所需超过的底分，列表未满时为 `0`"""
+        return self.entries[-1]['ra'] if self.full else 0
+
+    def get(self, song_id: Union[int, str], level_index: int) -> Optional[BestEntry]:
+        """获取列表中该谱面的成绩"""
+        position = self._index.get((int(song_id), level_index))
+        return None if position is None else self.entries[position]
+
+    def what_if(self, song_id: Union[int, str], level_index: int, ra: int) -> WhatIf:
+        """
+        模拟该谱面取得底分 `ra` 后的列表变化，不修改列表
+
+        - `song_id`: 曲目id
+        - `level_index`: 难度
+        - `ra`: 模拟的底分
+        """
+        key = (int(song_id), level_index)
+        if (current := self._index.get(key)) is not None:
+            old = self.entries[current]['ra']
+            if ra <= old:
+                return WhatIf(self.total, 0, current, None)
+            return WhatIf(self.total + ra - old, ra - old, bisect_right(self._ra, -ra), None)
+        if not self.full:
+            return WhatIf(self.total + ra, ra, bisect_right(self._ra, -ra), None)
+        lowest = self.entries[-1]
+        if ra <= lowest['ra']:
+            return WhatIf(self.total, 0, None, None)
+        return WhatIf(self.total + ra - lowest['ra'], ra - lowest['ra'], bisect_right(self._ra, -ra), lowest)
+
+    def gain(self, song_id: Union[int, str], level_index: int, ra: int) -> int:
+        """该谱面取得底分 `ra` 后底分合计的增加量"""
+        return self.what_if(song_id, level_index, ra).gain
+
+
+class LocalBest:
+
+    def __init__(self, sd: BestList, dx: BestList, profile: Optional[Dict[str, Any]] = None) -> None:
+        """
+        玩家 `b50`，`sd` 为旧版本 `b35`，`dx` 为当前版本 `b15`
+
+        - `profile`: 玩家信息，包含 `nickname`、`plate`、`additional_rating`、`username`
+        """
+        self.sd = sd
+        self.dx = dx
+        self.profile = profile or {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[RecordRow], profile: Optional[Dict[str, Any]] = None) -> 'LocalBest':
+        """
+        从完整成绩计算 `b50`，缺少底分的成绩使用 `computeRa` 补全，宴会场谱面不计入
+
+        - `records`: 成绩，`playerRecord.records` 的返回值
+        - `profile`: 玩家信息
+        """
+        is_new = {int(_m.id): _m.basic_info.is_new for _m in mai.total_list if int(_m.id) < 100000}
+        sd: List[BestEntry] = []
+        dx: List[BestEntry] = []
+        for r in records:
+            if (new := is_new.get(int(r['song_id']))) is None:
+                continue
+            if r.get('ra') is None:
+                r = dict(r, ra=computeRa(r['ds'], r['achievements']))
+            (dx if new else sd).append(r)
+        return cls(BestList(sd, 35), BestList(dx, 15), profile)
+
+    @classmethod
+    def from_user(cls, user: UserInfo) -> 'LocalBest':
+        """使用 `query/player` 返回的 `b50`"""
+        charts = user.charts
+        return cls(
+            BestList([_c.dict() for _c in charts.sd or []], 35),
+            BestList([_c.dict() for _c in charts.dx or []], 15),
+            user.dict(exclude={'charts'})
+        )
+
+    @property
+    def rating(self) -> int:
+        return self.sd.total + self.dx.total
+
+    def table(self, music: Music) -> BestList:
+        """曲目所属的列表"""
+        return self.dx if music.basic_info.is_new else self.sd
+
+    def what_if(self, music: Music, level_index: int, achievement: float) -> WhatIf:
+        """
+        模拟该谱面取得达成率 `achievement` 后所属列表的变化
+
+        - `music`: 曲目
+        - `level_index`: 难度
+        - `achievement`: 模拟的达成率
+        """
+        ra = computeRa(music.ds[level_index], achievement)
+        return self.table(music).what_if(music.id, level_index, ra)
+
+    def charts(self) -> Dict[str, List[BestEntry]]:
+        """`query/player` 格式的 `charts`"""
+        return {'sd': self.sd.entries, 'dx': self.dx.entries}
+
+    def user_info(self) -> UserInfo:
+        """转换为 `query/player` 格式的玩家信息，`rating` 为本地计算的底分合计"""
+        return UserInfo(
+            additional_rating=self.profile.get('additional_rating') or 0,
+            charts=self.charts(),
+            nickname=self.profile.get('nickname') or self.profile.get('username'),
+            plate=self.profile.get('plate'),
+            rating=self.rating,
+            username=self.profile.get('username')
+        )
+
+
+async def player_best(qqid: Optional[int] = None, username: Optional[str] = None, *, force: bool = False) -> LocalBest:
+    """
+    获取玩家 `b50`
+
+    开发者模式从暂存的完整成绩本地计算，普通模式使用 `query/player`
+
+    - `qqid`: 用户QQ
+    - `username`: 查分器用户名
+    - `force`: 开发者模式下忽略暂存有效期重新同步，用于 `b50`、`上分` 等需要最新成绩的指令
+    """
+    if maiApi.token:
+        user = await playerRecord.sync(qqid, username, force=force)
+        return LocalBest.from_records(playerRecord.records(user), playerRecord.player(user))
+    obj = await maiApi.query_user('player', qqid=qqid, username=username)
+    return LocalBest.from_user(UserInfo(**obj))
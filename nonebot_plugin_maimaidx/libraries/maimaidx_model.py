@@ -1,7 +1,9 @@
 from collections import namedtuple
-from typing import List, Optional, Union
+from typing import Any, Dict, List, NamedTuple, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, root_validator
+
+from ..config import breakBonusLoss, noteLoss, noteScore
 
 
 ##### Music
@@ -23,6 +25,30 @@ Notes2 = namedtuple('Notes', ['tap', 'hold', 'slide', 'touch', 'brk'])
 class Chart(BaseModel):
     notes: Union[Notes1, Notes2]
     charter: str = None
+    max_dx_score: int = 0
+    """DX 分数上限，物量 × 3"""
+    total_score: int = 0
+    """按物量加权的基础分，`TAP GREAT` 损失 `100`"""
+    loss: Dict[str, List[float]] = {}
+    """各类音符 `GREAT/GOOD/MISS` 损失的达成率（%），不含 `BREAK` 额外奖励"""
+    break_bonus: float = 0
+    """每个 `BREAK` 的额外奖励占总分的比例，所有 `BREAK` 合计 `1%`"""
+    break_loss: Dict[str, float] = {}
+    """`BREAK` 各判定损失的额外奖励（%）"""
+
+    @root_validator(skip_on_failure=True)
+    def derive(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        """曲目数据加载时计算谱面常量"""
+        notes = values['notes']._asdict()
+        total_score = sum(noteScore[_n] * _c for _n, _c in notes.items())
+        unit = 10000 / total_score if total_score else 0
+        break_bonus = 0.01 / notes['brk'] if notes['brk'] else 0
+        values['max_dx_score'] = sum(notes.values()) * 3
+        values['total_score'] = total_score
+        values['loss'] = {_n: [_l * unit for _l in noteLoss[_n]] for _n in notes}
+        values['break_bonus'] = break_bonus
+        values['break_loss'] = {_j: _l * break_bonus * 100 for _j, _l in breakBonusLoss.items()}
+        return values
 
 
 class BasicInfo(BaseModel):
@@ -133,11 +159,38 @@ class PlayInfoDev(PlayInfo):
     song_id: int
 
 
+class PlayRecord(NamedTuple):
+    """
+    暂存成绩的轻量结构，字段与 `PlayInfoDev` 相同，不经过 `pydantic` 校验，
+    需要模型时调用 `model`
+    """
+    song_id: int
+    level_index: int
+    title: Optional[str]
+    type: Optional[str]
+    level: Optional[str]
+    level_label: str
+    version: Optional[str]
+    ds: float
+    achievements: float
+    dxScore: int
+    fc: str
+    fs: str
+    ra: int
+    rate: str
+
+    def dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+    def model(self) -> PlayInfoDev:
+        return PlayInfoDev(**self._asdict())
+
+
 class TableData(BaseModel):
     achievements: float
     fc: str = ''
 
 
 class PlanInfo(BaseModel):
-    completed: Union[PlayInfoDefault, PlayInfoDev] = None
-    unfinished: Union[PlayInfoDefault, PlayInfoDev] = None
\ No newline at end of file
+    completed: Union[PlayInfoDefault, PlayInfoDev, PlayRecord] = None
+    unfinished: Union[PlayInfoDefault, PlayInfoDev, PlayRecord] = None
\ No newline at end of file
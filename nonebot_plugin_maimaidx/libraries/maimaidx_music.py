@@ -4,7 +4,7 @@ import random
 import traceback
 from collections import Counter
 from copy import deepcopy
-from typing import Tuple, overload
+from typing import Callable, Tuple, overload
 
 from loguru import logger as log
 from PIL import Image
@@ -14,6 +14,7 @@ from .image import image_to_base64
 from .maimaidx_api_data import maiApi
 from .maimaidx_error import *
 from .maimaidx_model import *
+from .maimaidx_version import VersionRegistry
 from .tool import openfile, writefile
 
 
@@ -60,13 +61,26 @@ def in_or_equal(checker: Union[str, int], elem: Optional[Union[str, float, List[
         return checker == elem
 
 
+def _invalidate_index(method: Callable) -> Callable:
+    """修改列表的方法，调用后清除 `by_id` 的索引"""
+    def wrapper(self: 'MusicList', *args, **kwargs):
+        self.__dict__.pop('_id_index', None)
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
 class MusicList(List[Music]):
-    
+
     def by_id(self, music_id: Union[str, int]) -> Optional[Music]:
-        for music in self:
-            if music.id == str(music_id):
-                return music
-        return None
+        """按曲目id查找，索引在首次查找时建立，列表被修改后重新建立"""
+        index: Optional[Dict[str, Music]] = self.__dict__.get('_id_index')
+        if index is None:
+            index = {}
+            for music in self:
+                index.setdefault(music.id, music)
+            self._id_index = index
+        return index.get(str(music_id))
 
     def by_title(self, music_title: str) -> Optional[Music]:
         for music in self:
@@ -187,6 +201,13 @@ class MusicList(List[Music]):
         return new_list
 
 
+for _name in (
+    '__setitem__', '__delitem__', '__iadd__', '__imul__',
+    'append', 'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse'
+):
+    setattr(MusicList, _name, _invalidate_index(getattr(list, _name)))
+
+
 def search_charts(checker: List[Chart], elem: str, diff: List[int]):
     ret = False
     diff_ret = []
@@ -326,6 +347,9 @@ class MaiMusic:
     total_alias_list: AliasList
     hot_music_ids: List = []
     guess_data: List[Music]
+    versions: VersionRegistry
+    data_version: int = 0
+    """曲目数据版本，每次获取曲目数据后加一，用于使依赖曲目数据的缓存失效"""
 
     def __init__(self) -> None:
         """封装所有曲目信息以及猜歌数据，便于更新"""
@@ -333,6 +357,8 @@ class MaiMusic:
     async def get_music(self) -> None:
         """获取所有曲目数据"""
         self.total_list = await get_music_list()
+        self.versions = VersionRegistry(self.total_list)
+        self.data_version += 1
 
     async def get_music_alias(self) -> None:
         """获取所有曲目别名"""
@@ -350,6 +376,16 @@ class MaiMusic:
                     self.hot_music_ids.append(music.id)  # 游玩次数超过1w次加入猜歌库
         self.guess_data = list(filter(lambda x: x.id in self.hot_music_ids, self.total_list))
 
+    def popular(self, count: int) -> List[Music]:
+        """
+        所有难度游玩次数合计最多的曲目
+
+        - `count`: 曲目数量
+        """
+        def play_count(music: Music) -> float:
+            return sum(_s.cnt or 0 for _s in music.stats if _s) if music.stats else 0
+        return sorted(self.total_list, key=play_count, reverse=True)[:count]
+
 mai = MaiMusic()
 
 
@@ -1,59 +1,70 @@
-import copy
+import asyncio
+import time
+from textwrap import dedent
 
 from .image import image_to_base64
 from .maimaidx_best_50 import *
+from .maimaidx_cache import LRUCache, image_bytes
+from .maimaidx_layer import layers
+from .maimaidx_local_best import BestList, LocalBest, player_best
 from .maimaidx_model import *
 from .maimaidx_music import mai
+from .maimaidx_plate_progress import plate_predicate, plate_progress
+from .maimaidx_player_record import playerRecord
+from .maimaidx_table_layout import rating_image, tableLayouts
 
 
-def newbestscore(song_id: str, lv: int, value: int, bestlist: List[ChartInfo]) -> int:
-    for v in bestlist:
-        if song_id == str(v.song_id) and lv == v.level_index:
-            if value >= v.ra:
-                return value - v.ra
-            else:
-                return 0
-    return value - bestlist[-1].ra
+async def generate(qqid: Optional[int] = None, username: Optional[str] = None) -> str:
+    try:
+        if username:
+            qqid = None
+        best = await player_best(qqid, username, force=True)
+
+        mai_info = best.user_info()
+        draw_best = DrawBest(mai_info, qqid)
+
+        key = await draw_best.fingerprint()
+        if (pic := b50Cache.get(key)) is None:
+            start = time.perf_counter()
+            pic = image_to_base64(await draw_best.draw())
+            if draw_best.cacheable:
+                b50Cache.put(key, pic, time.perf_counter() - start)
+        msg = MessageSegment.image(pic)
+    except UserNotFoundError as e:
+        msg = str(e)
+    except UserDisabledQueryError as e:
+        msg = str(e)
+    except Exception as e:
+        log.error(traceback.format_exc())
+        msg = f'未知错误：{type(e)}\n请联系Bot管理员'
+    return msg
 
 
-async def draw_music_info(music: Music, qqid: Optional[int] = None, user: Optional[UserInfo] = None) -> MessageSegment:
-    """查看谱面"""
-    calc = True
-    isfull = True
-    bestlist: List[ChartInfo] = []
-    try:
-        if qqid:
-            if user == None:
-                obj = await maiApi.query_user('player', qqid=qqid)
-                player = UserInfo(**obj)
-            else:
-                player = user
-            if music.basic_info.version == list(plate_to_version.values())[-1]:
-                bestlist = player.charts.dx
-                isfull = bool(len(bestlist) == 15)
-            else:
-                bestlist = player.charts.sd
-                isfull = bool(len(bestlist) == 35)
-        else:
-            calc = False
-    except UserNotFoundError:
-        calc = False
-    except UserDisabledQueryError:
-        calc = False
-    except Exception:
-        calc = False
+songCardCache: LRUCache[Image.Image] = LRUCache('song_card', 256 * 1024 * 1024, image_bytes)
+songInfoCache: LRUCache[str] = LRUCache('song_info', 64 * 1024 * 1024, len)
+
+RatingRow = Tuple[Tuple[int, Union[int, str]], ...]
+
 
-    im = Image.open(maimaidir / 'song_bg.png').convert('RGBA')
+async def draw_song_card(music: Music) -> Tuple[Image.Image, bool]:
+    """
+    绘制谱面信息中与玩家无关的部分，不包含 `Master` 及以上难度的底分
+
+    返回图片以及是否可以缓存，曲绘获取失败时使用默认曲绘，此时不缓存
+
+    - `music`: 曲目
+    """
+    im = layers.song_base()
     dr = ImageDraw.Draw(im)
-    hy = DrawText(dr, HANYI)
     tb = DrawText(dr, TBFONT)
     sy = DrawText(dr, SIYUAN)
 
     default_color = (5, 51, 101, 255)
 
+    cover = await maiApi.download_music_pictrue(music.id)
     if music.basic_info.is_new:
         im.alpha_composite(Image.open(maimaidir / 'UI_CMN_TabTitle_NewSong.png'), (1400, 200))
-    im.alpha_composite(Image.open(await maiApi.download_music_pictrue(music.id)), (205, 325))
+    im.alpha_composite(Image.open(cover), (205, 325))
     im.alpha_composite(Image.open(maimaidir / f'{music.basic_info.version}.png').resize((250, 120)), (1340, 610))
     im.alpha_composite(Image.open(maimaidir / f'{music.type}.png'), ((1150, 663)))
 
@@ -87,62 +98,124 @@ async def draw_music_info(music: Music, qqid: Optional[int] = None, user: Option
             if coloumWidth(charter) > 19:
                 charter = changeColumnWidth(charter, 18) + '...'
             sy.draw(535, 1597 + 75 * (num - 2), 26, charter, default_color, 'mm')
-            ra = sorted([computeRa(music.ds[num], r) for r in achievementList[-6:]], reverse=True)
-            for _n, value in enumerate(ra):
-                size = 35
-                if not calc:
-                    rating = value
-                elif not isfull:
-                    size = 30
-                    rating = f'{value}(+{value})'
-                elif value > bestlist[-1].ra:
-                    new = newbestscore(music.id, num, value, bestlist)
-                    if new == 0:
-                        rating = value
-                    else:
-                        size = 30
-                        rating = f'{value}(+{new})'
-                else:
-                    rating = value
-                tb.draw(770 + 155 * _n, 1597 + 75 * (num - 2), size, rating, default_color, 'mm')
-    hy.draw(900, 1900, 30, f'Designed by Yuri-YuzuChaN | Generated by {maiconfig.botName} BOT', anchor='mm')
-    return MessageSegment.image(image_to_base64(im))
+    return im, not (isinstance(cover, Path) and cover.name == '11000.png' and music.id != '11000')
+
+
+async def song_card(music: Music) -> Image.Image:
+    """
+    按 `(曲目, 数据版本)` 缓存的谱面信息，返回缓存中的对象，调用方不能修改
+
+    - `music`: 曲目
+    """
+    key = (music.id, mai.data_version, maiconfig.botName)
+    if (im := songCardCache.get(key)) is None:
+        start = time.perf_counter()
+        im, cacheable = await draw_song_card(music)
+        if cacheable:
+            songCardCache.put(key, im, time.perf_counter() - start)
+    return im
+
+
+def rating_rows(music: Music, bestlist: Optional[BestList] = None) -> Tuple[RatingRow, ...]:
+    """
+    `Master` 及以上难度各评价对应的底分，传入 `bestlist` 时标注底分合计的增加量
+
+    - `music`: 曲目
+    - `bestlist`: 曲目所属的最佳成绩列表
+    """
+    rows: List[RatingRow] = []
+    for num in range(2, len(music.level)):
+        ra = sorted([computeRa(music.ds[num], r) for r in achievementList[-6:]], reverse=True)
+        row = []
+        for value in ra:
+            if bestlist and (new := bestlist.gain(music.id, num, value)):
+                row.append((30, f'{value}(+{new})'))
+            else:
+                row.append((35, value))
+        rows.append(tuple(row))
+    return tuple(rows)
 
 
-async def music_play_data(qqid: int, songs: str) -> Union[str, MessageSegment]:
-    """谱面游玩"""
-    try:
-        diff: List[Union[PlayInfoDev, PlayInfoDefault, None]]
-        if maiconfig.maimaidxtoken:
-            data: Dict[str, List[Dict[str, Union[float, str, int]]]] = await maiApi.query_user_dev2(qqid=qqid, music_id=songs)
-            if not data:
-                return '您未游玩该曲目'
-
-            music = mai.total_list.by_id(songs)
-            diff = [None for _ in music.ds]
-            for _d in data[songs]:
-                diff[_d['level_index']] = PlayInfoDev(**_d)
-            dev = True
-        else:
-            version = list(set(_v for _v in plate_to_version.values()))
-            data = await maiApi.query_user('plate', qqid=qqid, version=version)
+def draw_rating_rows(im: Image.Image, rows: Tuple[RatingRow, ...]) -> None:
+    """
+    在谱面信息上绘制底分
+
+    - `im`: `song_card` 的副本
+    - `rows`: `rating_rows` 的返回值
+    """
+    tb = DrawText(ImageDraw.Draw(im), TBFONT)
+    for num, row in enumerate(rows):
+        for _n, (size, rating) in enumerate(row):
+            tb.draw(770 + 155 * _n, 1597 + 75 * num, size, rating, (5, 51, 101, 255), 'mm')
+
 
-            music = mai.total_list.by_id(songs)
-            _temp = [None for _ in music.ds]
-            diff = copy.deepcopy(_temp)
+async def draw_music_info(music: Music, qqid: Optional[int] = None, user: Optional[UserInfo] = None) -> MessageSegment:
+    """查看谱面"""
+    bestlist = None
+    try:
+        if qqid:
+            if user == None:
+                best = await player_best(qqid)
+            else:
+                best = LocalBest.from_user(user)
+            bestlist = best.table(music)
+    except UserNotFoundError:
+        pass
+    except UserDisabledQueryError:
+        pass
+    except Exception:
+        pass
+
+    rows = rating_rows(music, bestlist)
+    personal = bestlist is not None and rows != rating_rows(music)
+    key = (music.id, mai.data_version, maiconfig.botName)
+    if not personal and (pic := songInfoCache.get(key)) is not None:
+        return MessageSegment.image(pic)
+
+    start = time.perf_counter()
+    im = (await song_card(music)).copy()
+    draw_rating_rows(im, rows)
+    pic = image_to_base64(im)
+    if not personal and key in songCardCache:
+        songInfoCache.put(key, pic, time.perf_counter() - start)
+    return MessageSegment.image(pic)
+
+
+async def song_card_prewarm(count: int = 16) -> None:
+    """
+    清空谱面信息缓存，并预先绘制游玩次数最多的曲目，在获取曲目数据后调用
+
+    - `count`: 预先绘制的曲目数量
+    """
+    songCardCache.clear()
+    songInfoCache.clear()
+    start = time.perf_counter()
+    for music in mai.popular(count):
+        try:
+            await draw_music_info(music)
+        except Exception:
+            log.error(traceback.format_exc())
+        await asyncio.sleep(0)
+    log.info(f'已预先绘制{len(songCardCache)}首热门曲目的谱面信息，耗时{time.perf_counter() - start:.2f}秒')
 
-            for _d in data['verlist']:
-                if _d['id'] == int(songs):
-                    diff[_d['level_index']] = PlayInfoDefault(**_d)
-            if diff == _temp:
-                return '您未游玩该曲目'
-            dev = False
 
-        im = Image.open(maimaidir / 'info_bg.png').convert('RGBA')
+async def music_play_data(qqid: int, songs: str) -> Union[str, MessageSegment]:
+    """谱面游玩"""
+    try:
+        diff: List[Optional[PlayRecord]]
+        music = mai.total_list.by_id(songs)
+        diff = [None for _ in music.ds]
+        for _d in await playerRecord.song_records(qqid, songs):
+            if _d.level_index < len(diff):
+                diff[_d.level_index] = _d
+        if not any(diff):
+            return '您未游玩该曲目'
+        dev = bool(maiApi.token)
+
+        im = layers.info_base()
 
         dr = ImageDraw.Draw(im)
         tb = DrawText(dr, TBFONT)
-        hy = DrawText(dr, HANYI)
         sy = DrawText(dr, SIYUAN)
 
         cover = Image.open(await maiApi.download_music_pictrue(songs))
@@ -172,7 +245,7 @@ async def music_play_data(qqid: int, songs: str) -> Union[str, MessageSegment]:
             if info:
                 if dev:
                     dxscore = info.dxScore
-                    _dxscore = sum(music.charts[num].notes) * 3
+                    _dxscore = music.charts[num].max_dx_score
                     dxnum = dxScore(dxscore / _dxscore * 100)
                     rating, rate = info.ra, score_Rank_l[info.rate]
                     im.alpha_composite(Image.open(maimaidir / 'ra-dx.png'), (1350, 396 + y * num))
@@ -200,7 +273,6 @@ async def music_play_data(qqid: int, songs: str) -> Union[str, MessageSegment]:
         if len(diff) == 4:
             sy.draw(1225, 445 + y * 4, 45, '没有该难度', color, 'mm')
 
-        hy.draw(900, 1265, 30, f'Designed by Yuri-YuzuChaN & BlueDeer233 | Generated by {maiconfig.botName} Bot', color, 'mm')
         msg = MessageSegment.image(image_to_base64(im))
     except UserNotFoundError as e:
         msg = str(e)
@@ -212,6 +284,37 @@ async def music_play_data(qqid: int, songs: str) -> Union[str, MessageSegment]:
     return msg
 
 
+def score_line_data(music: Music, lines: List[float], level_index: Optional[int] = None) -> str:
+    """
+    分数线容错，单个难度和单个分数线时返回原有的描述，否则返回每个难度、每个分数线的容错表
+
+    - `music`: 曲目
+    - `lines`: 分数线
+    - `level_index`: 难度，为 `None` 时计算所有难度
+    """
+    for line in lines:
+        if not 0 < 101 - line < 101:
+            raise ValueError
+    if level_index is not None and len(lines) == 1:
+        level_labels2 = ['Basic', 'Advanced', 'Expert', 'Master', 'Re:MASTER']
+        chart = music.charts[level_index]
+        reduce = 101 - lines[0]
+        break_50_reduce = chart.total_score * chart.break_bonus / 4
+        return dedent(f'''\
+            {music.title} {level_labels2[level_index]}
+            分数线 {lines[0]}% 允许的最多 TAP GREAT 数量为 {(chart.total_score * reduce / 10000):.2f}(每个-{chart.loss['tap'][0]:.4f}%),
+            BREAK 50落(一共{chart.notes.brk}个)等价于 {(break_50_reduce / 100):.3f} 个 TAP GREAT(-{break_50_reduce / chart.total_score * 100:.4f}%)''')
+
+    msg = f'{music.id}. {music.title}\n'
+    for num in (range(len(music.charts)) if level_index is None else [level_index]):
+        chart = music.charts[num]
+        great, break_50 = chart.loss['tap'][0], chart.break_loss['50落']
+        msg += f'\n{diffs[num]} {music.level[num]}({music.ds[num]}) 每个 TAP GREAT -{great:.4f}%，BREAK 50落(一共{chart.notes.brk}个) -{break_50:.4f}%\n'
+        for line in lines:
+            msg += f'  {line}%：TAP GREAT 最多 {(chart.total_score * (101 - line) / 10000):.2f} 个\n'
+    return msg.strip()
+
+
 def calc_achievements_fc(scorelist: Union[List[float], List[str]], lvlist_num: int, isfc: bool = False) -> int:
     r = -1
     obj = range(4) if isfc else achievementList[-6:]
@@ -226,72 +329,46 @@ def calc_achievements_fc(scorelist: Union[List[float], List[str]], lvlist_num: i
 async def draw_rating_table(qqid: int, rating: str, isfc: bool = False) -> Union[str, MessageSegment]:
     """绘制定数表"""
     try:
-        version = list(set(_v for _v in plate_to_version.values()))
-        data = await maiApi.query_user('plate', qqid=qqid, version=version)
-        
+        user = await playerRecord.sync(qqid)
+
         if rating in levelList[-3:]:
-            bg = ratingdir / '14.png'
             ralist = list(reversed(levelList[-3:]))
             merge = True
         else:
-            bg = ratingdir / f'{rating}.png'
             ralist = [rating]
             merge = False
         
-        fromid = {}
-        for _data in data['verlist']:
-            if _data['level'] in ralist:
-                if (id := str(_data['id'])) not in fromid:
-                    fromid[id] = {}
-                fromid[id][str(_data['level_index'])] = {
-                    'achievements': _data['achievements'],
-                    'fc': _data['fc'],
-                    'level': _data['level']
-                }
-
-        musiclist = mai.total_list.lvList(rating=True)
+        index = playerRecord.index(user)
+        layout = tableLayouts.rating(rating)
+
         achievements_fc_list: List[Union[float, List[float]]] = []
         if merge:
-            lvlist = {}
             for lv in ralist:
-                lvlist.update(musiclist[lv])
                 achievements_fc_list.append([])
-        else:
-            lvlist = musiclist[ralist[0]]
         
-        im = Image.open(bg).convert('RGBA')
+        im = layers.image(rating_image(rating))
         draw = ImageDraw.Draw(im)
         tb = DrawText(draw, TBFONT)
         b2 = Image.new('RGBA', (75, 75), (0, 0, 0, 64))
-        y = 168
-        for ra in lvlist:
-            x = 198
-            y += 20
-            for num, music in enumerate(lvlist[ra]):
-                if num % 14 == 0:
-                    x = 198
-                    y += 85
+        for cell in layout.cells.values():
+            x, y = cell.x, cell.y
+            if (record := index.get(cell.song_id, cell.level_index)) and record.level in ralist:
+                if isfc:
+                    if _fc := record.fc:
+                        achievements_fc_list[ralist.index(cell.level)].append(combo_rank.index(_fc)) if merge else achievements_fc_list.append(combo_rank.index(_fc))
+                        im.alpha_composite(b2, (x, y))
+                        fc = Image.open(maimaidir / f'UI_MSS_MBase_Icon_{fcl[_fc]}.png').resize((50, 50))
+                        im.alpha_composite(fc, (x + 13, y + 12))
                 else:
-                    x += 85
-                if music.id in fromid and music.lv in fromid[music.id]:
-                    if isfc:
-                        if _fc := fromid[music.id][music.lv]['fc']:
-                            achievements_fc_list[ralist.index(music.lvp)].append(combo_rank.index(_fc)) if merge else achievements_fc_list.append(combo_rank.index(_fc))
-                            im.alpha_composite(b2, (x + 2, y - 18))
-                            fc = Image.open(maimaidir / f'UI_MSS_MBase_Icon_{fcl[_fc]}.png').resize((50, 50))
-                            im.alpha_composite(fc, (x + 15, y - 6))
-                    else:
-                        score = fromid[music.id][music.lv]['achievements']
-                        achievements_fc_list[ralist.index(music.lvp)].append(score) if merge else achievements_fc_list.append(score)
-                        rate = computeRa(music.ds, score, onlyrate=True)
-                        im.alpha_composite(b2, (x + 2, y - 18))
-                        rank = Image.open(maimaidir / f'UI_TTR_Rank_{rate}.png').resize((78, 36))
-                        im.alpha_composite(rank, (x, y))
+                    score = record.achievements
+                    achievements_fc_list[ralist.index(cell.level)].append(score) if merge else achievements_fc_list.append(score)
+                    rate = computeRa(cell.ds, score, onlyrate=True)
+                    im.alpha_composite(b2, (x, y))
+                    rank = Image.open(maimaidir / f'UI_TTR_Rank_{rate}.png').resize((78, 36))
+                    im.alpha_composite(rank, (x - 2, y + 18))
         if merge:
-            lvkey = list(lvlist.keys())
-            lvnum = [lvkey[:1], lvkey[1:4], lvkey[4:]]
-            for num, i in enumerate(lvnum):
-                lvlistlen = len([ _ for x in i for _ in lvlist[x] ])
+            for num, lv in enumerate(ralist):
+                lvlistlen = sum(1 for _c in layout.cells.values() if _c.level == lv)
                 if len(achievements_fc_list[num]) == lvlistlen:
                     r = calc_achievements_fc(achievements_fc_list[num], lvlistlen, isfc)
                     if r != -1:
@@ -300,7 +377,7 @@ async def draw_rating_table(qqid: int, rating: str, isfc: bool = False) -> Union
                         pic = fcl[combo_rank[r]] if isfc else score_Rank_l[score_Rank[-6:][r]]
                         im.alpha_composite(Image.open(maimaidir / f'UI_MSS_Allclear_Icon_{pic}.png'), (700 + 250 * num, 120))
         else:
-            lvlistlen = sum([len(lvlist[_]) for _ in lvlist])
+            lvlistlen = len(layout.cells)
             if len(achievements_fc_list) == lvlistlen:
                 r = calc_achievements_fc(achievements_fc_list, lvlistlen, isfc)
                 if r != -1:
@@ -320,45 +397,15 @@ async def draw_rating_table(qqid: int, rating: str, isfc: bool = False) -> Union
 async def draw_plate_table(qqid: int, version: str, plan: str) -> Union[str, MessageSegment]:
     """绘制完成表"""
     try:
-        if version == '真':
-            ver = list(set(_v for _v in list(plate_to_version.values())[0:2]))
-        elif version in ['华', '華']:
-            ver = [plate_to_version['熊']]
-        elif version == '煌':
-            ver = [plate_to_version['爽']]
-        elif version == '星':
-            ver = [plate_to_version['宙']]
-        elif version == '祝':
-            ver = [plate_to_version['祭']]
-        else:
-            ver = [plate_to_version[version]]
-        music = mai.total_list.by_version(ver)
-        plate_num = len(music)
-        obj = await maiApi.query_user('plate', qqid=qqid, version=ver)
-        playerdata: List[PlayInfoDefault] = list(filter(lambda x: str(x.song_id) not in ignore_music, [PlayInfoDefault(**v, ds=mai.total_list.by_id(str(v['id'])).ds[v['level_index']]) for v in obj['verlist']]))
-        newdata = sorted(list(filter(lambda x: x.level_index == 3, playerdata)), key=lambda x: x.level_index,reverse=True)
-        ra: Dict[str, Dict[str, Optional[PlayInfoDefault]]] = {}
-        """
-        {
-            "14+": {
-                "365": PlayInfoDefault,
-                "xxx": {}
-            },
-            "14": {
-                "xxx": PlayInfoDefault
-            }
-        }
-        """
-        music.sort(key=lambda x: x.ds[3], reverse=True)
-        for _m in music:
-            if _m.level[3] not in ra:
-                ra[_m.level[3]] = {}
-            ra[_m.level[3]][_m.id] = None
-
-        for _d in newdata:
-            ra[_d.level][str(_d.song_id)] = _d
-
-        im = Image.open(platedir / f'{version}.png')
+        plate = mai.versions.plate(version)
+        user = await playerRecord.sync(qqid)
+        playerdata = [v for v in playerRecord.index(user).version(plate.versions) if str(v.song_id) not in ignore_music]
+        lv: List[int] = [len(_r) for _r in plate_progress(plate, playerdata, plan).remaining] if plan in plate_predicate else []
+        newdata = [_d for _d in playerdata if _d.level_index == 3]
+        records: Dict[str, PlayRecord] = {str(_d.song_id): _d for _d in newdata}
+        layout = tableLayouts.plate(version)
+
+        im = layers.image(platedir / f'{version}.png')
         draw = ImageDraw.Draw(im)
         tr = DrawText(draw, TBFONT)
         hy = DrawText(draw, HANYI)
@@ -367,87 +414,30 @@ async def draw_plate_table(qqid: int, version: str, plan: str) -> Union[str, Mes
             im.alpha_composite(plate.crop((360, 0, 720, 116)), (790, 335))
         im.alpha_composite(Image.open(maimaidir / f'{plate_to_version[version]}.png'), (361, 300))
         b2 = Image.new('RGBA', (100, 100), (0, 0, 0, 64))
-        lv: List[int] = []
-        y = 375
-        # if plan == '者':
-        #     lv = [sum([1 for _ in data if _['level_index'] == n and _['achievements']] >= 80) for n in range(5)]
-        #     for _ in ra:
-        #         y += 15
-        #         num = 0
-        #         for _ms in ra[_r]:
-        #             for _m in ra[_r][_ms]:
-        #                 if num % 10 == 0:
-        #                     x = 225
-        #                     y += 115
-        #                 else:
-        #                     x += 115
-        #                 num += 1
-        #                 if 'achievements' not in _m or not _m['achievements'] >= 80: continue
-        #                 fc = Image.open(root / 'maimaidx' / 'maimai' / f'UI_MSS_MBase_Icon_{fcl[_m["fc"]]}.png')
-        #                 im.alpha_composite(fc, (x, y))
-        if plan == '极' or plan == '極':
-            lv = [plate_num - sum([1 for _ in playerdata if _.level_index == n and _.fc]) for n in range(4)]
-            for _r in ra:
-                x = 235
-                y += 15
-                for num, _ms in enumerate(ra[_r]):
-                    if num % 10 == 0:
-                        x = 235
-                        y += 115
-                    else:
-                        x += 115
-                    if (m := ra[_r][_ms]) and m.fc:
-                        im.alpha_composite(b2, (x - 25, y - 25))
-                        fc = Image.open(maimaidir / f'UI_CHR_PlayBonus_{fcl[m.fc]}.png').resize((75, 75))
-                        im.alpha_composite(fc, (x - 12, y - 12))
-        if plan == '将':
-            lv = [plate_num - sum([1 for _ in playerdata if _.level_index == n and _.achievements >= 100]) for n in range(4)]
-            for _r in ra:
-                x = 235
-                y += 15
-                for num, _ms in enumerate(ra[_r]):
-                    if num % 10 == 0:
-                        x = 235
-                        y += 115
-                    else:
-                        x += 115
-                    if m := ra[_r][_ms]:
-                        im.alpha_composite(b2, (x - 25, y - 25))
-                        rate = computeRa(m.ds, m.achievements, onlyrate=True)
-                        rank = Image.open(maimaidir / f'UI_TTR_Rank_{rate}.png').resize((102, 48))
-                        im.alpha_composite(rank, (x - 25, y))
-        if plan == '神':
-            _fc = ['ap', 'app']
-            lv = [plate_num - sum([1 for _ in playerdata if _.level_index == n and _.fc in _fc]) for n in range(4)]
-            for _r in ra:
-                x = 235
-                y += 15
-                for num, _ms in enumerate(ra[_r]):
-                    if num % 10 == 0:
-                        x = 235
-                        y += 115
-                    else:
-                        x += 115
-                    if (m := ra[_r][_ms]) and m.fc in _fc:
-                        im.alpha_composite(b2, (x - 25, y - 25))
-                        ap = Image.open(maimaidir / f'UI_CHR_PlayBonus_{fcl[m.fc]}.png').resize((75, 75))
-                        im.alpha_composite(ap, (x - 12, y - 12))
-        if plan == '舞舞':
-            fs = ['fsd', 'fdx', 'fsdp', 'fdxp']
-            lv = [plate_num - sum([1 for _ in playerdata if _.level_index == n and _.fs in fs]) for n in range(4)]
-            for _r in ra:
-                x = 235
-                y += 15
-                for num, _ms in enumerate(ra[_r]):
-                    if num % 10 == 0:
-                        x = 235
-                        y += 115
-                    else:
-                        x += 115
-                    if (m := ra[_r][_ms]) and m.fs in fs:
-                        im.alpha_composite(b2, (x - 25, y - 25))
-                        fsd = Image.open(maimaidir / f'UI_CHR_PlayBonus_{fsl[m.fs]}.png').resize((75, 75))
-                        im.alpha_composite(fsd, (x - 12, y - 12))
+        for cell in layout.cells.values():
+            if (m := records.get(cell.song_id)) is None:
+                continue
+            x, y = cell.x + 25, cell.y + 25
+            if plan == '极' or plan == '極':
+                if m.fc:
+                    im.alpha_composite(b2, (x - 25, y - 25))
+                    fc = Image.open(maimaidir / f'UI_CHR_PlayBonus_{fcl[m.fc]}.png').resize((75, 75))
+                    im.alpha_composite(fc, (x - 12, y - 12))
+            if plan == '将':
+                im.alpha_composite(b2, (x - 25, y - 25))
+                rate = computeRa(m.ds, m.achievements, onlyrate=True)
+                rank = Image.open(maimaidir / f'UI_TTR_Rank_{rate}.png').resize((102, 48))
+                im.alpha_composite(rank, (x - 25, y))
+            if plan == '神':
+                if m.fc in ['ap', 'app']:
+                    im.alpha_composite(b2, (x - 25, y - 25))
+                    ap = Image.open(maimaidir / f'UI_CHR_PlayBonus_{fcl[m.fc]}.png').resize((75, 75))
+                    im.alpha_composite(ap, (x - 12, y - 12))
+            if plan == '舞舞':
+                if m.fs in ['fsd', 'fdx', 'fsdp', 'fdxp']:
+                    im.alpha_composite(b2, (x - 25, y - 25))
+                    fsd = Image.open(maimaidir / f'UI_CHR_PlayBonus_{fsl[m.fs]}.png').resize((75, 75))
+                    im.alpha_composite(fsd, (x - 12, y - 12))
         for num, _v in enumerate(lv):
             if _v == 0:
                 hy.draw(420 + 220 * num, 225, 40, '完成', (5, 51, 101, 255), 'mm')
@@ -0,0 +1,79 @@
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from ..config import *
+from .maimaidx_model import Music, PlayRecord
+from .maimaidx_version import Chart, PlateVersion
+
+plate_predicate: Dict[str, Callable[[PlayRecord], bool]] = {
+    '将': lambda r: r.achievements >= 100,
+    '者': lambda r: r.achievements >= 80,
+    '極': lambda r: bool(r.fc),
+    '极': lambda r: bool(r.fc),
+    '神': lambda r: r.fc in ['ap', 'app'],
+    '舞舞': lambda r: r.fs in ['fsd', 'fdx', 'fsdp', 'fdxp'],
+}
+
+
+class PlateChart(NamedTuple):
+    music: Music
+    level_index: int
+    ds: float
+    record: Optional[PlayRecord]
+
+
+class PlateProgress(NamedTuple):
+    plan: str
+    total: List[int]
+    """每个难度的谱面数量"""
+    remaining: List[List[PlateChart]]
+    """每个难度未达成的谱面，按曲目id排序"""
+
+    @property
+    def remaining_charts(self) -> List[PlateChart]:
+        """所有未达成的谱面，按难度、曲目id排序"""
+        return [_c for _r in self.remaining for _c in _r]
+
+    @property
+    def completed(self) -> bool:
+        return not any(self.remaining)
+
+    def self_record(self, chart: PlateChart) -> str:
+        """该谱面与目标相关的成绩，用于文字描述"""
+        if not (r := chart.record):
+            return ''
+        if self.plan in ['将', '者']:
+            return str(r.achievements) + '%'
+        if self.plan in ['極', '极', '神']:
+            return comboRank[combo_rank.index(r.fc)].upper() if r.fc else ''
+        if self.plan == '舞舞':
+            return syncRank[sync_rank.index(r.fs)].upper() if r.fs in sync_rank else ''
+        return ''
+
+
+def plate_progress(plate: PlateVersion, records: Iterable[PlayRecord], plan: str, remaster: bool = False) -> PlateProgress:
+    """
+    计算牌子进度，达成目标的谱面集合与牌子要求的谱面集合相减即为剩余谱面
+
+    - `plate`: 牌子，`mai.versions.plate` 的返回值
+    - `records`: 玩家成绩，`playerRecord.rows` 的返回值
+    - `plan`: 目标，`将`、`者`、`极`、`神`、`舞舞`
+    - `remaster`: 是否包含 `Re:Master` 难度
+    """
+    predicate = plate_predicate[plan]
+    required = plate.required(remaster)
+    played: Dict[Chart, PlayRecord] = {}
+    for r in records:
+        if (key := (r.song_id, r.level_index)) in required:
+            played[key] = r
+    remain = required - {_k for _k, _r in played.items() if predicate(_r)}
+
+    count = 5 if remaster else 4
+    total = [0] * count
+    remaining: List[List[PlateChart]] = [[] for _ in range(count)]
+    for music in plate.songs:
+        song_id = int(music.id)
+        for level_index in range(min(count, len(music.ds))):
+            total[level_index] += 1
+            if (key := (song_id, level_index)) in remain:
+                remaining[level_index].append(PlateChart(music, level_index, music.ds[level_index], played.get(key)))
+    return PlateProgress(plan, total, remaining)
@@ -0,0 +1,324 @@
+import asyncio
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from ..config import *
+from .maimaidx_api_data import devRecordBatcher, maiApi
+from .maimaidx_best_50 import computeRaBatch
+from .maimaidx_model import PlayRecord
+from .maimaidx_score_index import ScoreIndex
+from .maimaidx_music import mai
+
+RecordValue = Union[str, float, int, None]
+RecordRow = Dict[str, RecordValue]
+
+_columns: Tuple[str, ...] = (
+    'user', 'song_id', 'level_index', 'title', 'type', 'level', 'level_label', 'version',
+    'ds', 'achievements', 'dxScore', 'fc', 'fs', 'ra', 'rate'
+)
+_update_columns: Tuple[str, ...] = _columns[3:]
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS record (
+    user TEXT NOT NULL,
+    song_id INTEGER NOT NULL,
+    level_index INTEGER NOT NULL,
+    title TEXT,
+    type TEXT,
+    level TEXT,
+    level_label TEXT,
+    version TEXT,
+    ds REAL,
+    achievements REAL,
+    dxScore INTEGER,
+    fc TEXT,
+    fs TEXT,
+    ra INTEGER,
+    rate TEXT,
+    PRIMARY KEY (user, song_id, level_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS record_level ON record (user, level);
+CREATE INDEX IF NOT EXISTS record_ds ON record (user, ds);
+CREATE INDEX IF NOT EXISTS record_version ON record (user, version);
+CREATE TABLE IF NOT EXISTS player (
+    user TEXT PRIMARY KEY,
+    username TEXT,
+    nickname TEXT,
+    plate TEXT,
+    rating INTEGER,
+    additional_rating INTEGER,
+    source TEXT,
+    synced_at REAL
+);
+'''
+
+
+class PlayerRecordStore:
+
+    def __init__(self, file: Path) -> None:
+        """
+        玩家成绩本地暂存，以 `(用户, 曲目id, 难度)` 为主键
+
+        成绩从 `dev/player/records` 或全版本 `query/plate` 获取，超过 `maimaidxrecordttl` 秒后重新同步，
+        同步时仅更新发生变化的成绩，最近使用的 `index_size` 个玩家保留内存中的成绩索引
+        """
+        self._file = file
+        self._conn: Optional[sqlite3.Connection] = None
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        """暂存键 -> `(锁, 持有及等待的数量)`，没有人使用时移除"""
+        self._index: OrderedDict[str, ScoreIndex] = OrderedDict()
+        self.index_size = 64
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._file, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(_schema)
+        return self._conn
+
+    @staticmethod
+    def user_key(qqid: Optional[int] = None, username: Optional[str] = None) -> str:
+        """查分器以用户名优先查询，暂存键与之保持一致"""
+        if username:
+            return f'username:{username.lower()}'
+        return f'qq:{qqid}'
+
+    def player(self, user: str) -> Optional[Dict[str, Any]]:
+        """获取玩家信息及同步时间"""
+        row = self.conn.execute('SELECT * FROM player WHERE user = ?', (user,)).fetchone()
+        return dict(row) if row else None
+
+    def synced_at(self, user: str) -> float:
+        row = self.conn.execute('SELECT synced_at FROM player WHERE user = ?', (user,)).fetchone()
+        return row['synced_at'] if row else 0
+
+    def is_fresh(self, user: str) -> bool:
+        return time.time() - self.synced_at(user) < maiconfig.maimaidxrecordttl
+
+    async def sync(self, qqid: Optional[int] = None, username: Optional[str] = None, *, force: bool = False) -> str:
+        """
+        同步玩家成绩，返回暂存键
+
+        - `qqid`: 用户QQ
+        - `username`: 查分器用户名
+        - `force`: 忽略有效期强制同步
+        """
+        user = self.user_key(qqid, username)
+        if not force and self.is_fresh(user):
+            return user
+        async with self._lock(user):
+            if not force and self.is_fresh(user):
+                return user
+            if maiApi.token:
+                obj = await maiApi.query_user_dev(qqid=qqid, username=username)
+                self.save(user, obj['records'], obj, 'dev')
+            else:
+                version = list(set(_v for _v in plate_to_version.values()))
+                obj = await maiApi.query_user('plate', qqid=qqid, username=username, version=version)
+                self.save(user, obj['verlist'], {'username': username}, 'plate')
+        return user
+
+    @asynccontextmanager
+    async def _lock(self, user: str) -> AsyncIterator[None]:
+        """同一玩家的同步串行执行，锁在最后一个使用者释放后移除，避免为每个同步过的玩家常驻一把锁"""
+        lock, count = self._locks.get(user, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[user] = (lock, count + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, count = self._locks[user]
+            if count == 1:
+                del self._locks[user]
+            else:
+                self._locks[user] = (lock, count - 1)
+
+    async def song_records(self, qqid: Optional[int], song_id: Union[int, str]) -> List[PlayRecord]:
+        """
+        获取玩家单曲成绩
+
+        暂存有效时直接查询；否则开发者模式合并为 `query_user_dev2` 多曲目请求，
+        普通模式只请求该曲目所在版本，结果写入暂存但不刷新同步时间
+
+        - `qqid`: 用户QQ
+        - `song_id`: 曲目id
+        """
+        user = self.user_key(qqid)
+        if not self.is_fresh(user):
+            if maiApi.token:
+                data = await devRecordBatcher.query(qqid=qqid, music_id=song_id)
+            else:
+                music = mai.total_list.by_id(song_id)
+                data = (await maiApi.query_user('plate', qqid=qqid, version=[music.basic_info.version]))['verlist']
+            self.update(user, data)
+        return self.index(user).song(song_id)
+
+    def index(self, user: str) -> ScoreIndex:
+        """
+        获取玩家的成绩索引，完整同步后重新建立，部分曲目更新时直接写入
+
+        - `user`: 暂存键
+        """
+        if (index := self._index.get(user)) is None:
+            index = self._index[user] = ScoreIndex(self.rows(user))
+            if len(self._index) > self.index_size:
+                self._index.popitem(last=False)
+        else:
+            self._index.move_to_end(user)
+        return index
+
+    def save(self, user: str, data: Iterable[Dict[str, Any]], profile: Dict[str, Any], source: str) -> int:
+        """
+        写入一次完整同步的数据，返回变化的成绩数量
+
+        - `user`: 暂存键
+        - `data`: `records` 或 `verlist`
+        - `profile`: 玩家信息
+        - `source`: 数据来源，`dev` 或 `plate`
+        """
+        rows = self._normalize(user, data)
+        conn = self.conn
+        with conn:
+            before = conn.total_changes
+            existing = {(r['song_id'], r['level_index']) for r in conn.execute('SELECT song_id, level_index FROM record WHERE user = ?', (user,))}
+            removed = existing - {(r[1], r[2]) for r in rows}
+            conn.executemany('DELETE FROM record WHERE user = ? AND song_id = ? AND level_index = ?', [(user, *_k) for _k in removed])
+            self._upsert(rows)
+            changed = conn.total_changes - before
+            conn.execute(
+                'INSERT OR REPLACE INTO player VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (user, profile.get('username'), profile.get('nickname'), profile.get('plate'),
+                 profile.get('rating'), profile.get('additional_rating'), source, time.time())
+            )
+        self._index.pop(user, None)
+        return changed
+
+    def update(self, user: str, data: Iterable[Dict[str, Any]]) -> int:
+        """写入部分曲目的成绩，不影响其余成绩以及同步时间，返回变化的成绩数量"""
+        rows = self._normalize(user, data)
+        conn = self.conn
+        with conn:
+            before = conn.total_changes
+            self._upsert(rows)
+            changed = conn.total_changes - before
+        if (index := self._index.get(user)) is not None:
+            index.update(PlayRecord._make(_r[1:]) for _r in rows)
+        return changed
+
+    def _upsert(self, rows: List[Tuple[RecordValue, ...]]) -> None:
+        changed = ' OR '.join(f'{c} IS NOT excluded.{c}' for c in _update_columns)
+        self.conn.executemany(
+            f'INSERT INTO record VALUES ({", ".join("?" * len(_columns))}) '
+            f'ON CONFLICT (user, song_id, level_index) DO UPDATE SET '
+            f'{", ".join(f"{c} = excluded.{c}" for c in _update_columns)} WHERE {changed}',
+            rows
+        )
+
+    @staticmethod
+    def _normalize(user: str, data: Iterable[Dict[str, Any]]) -> List[Tuple[RecordValue, ...]]:
+        """统一 `records` 和 `verlist` 的成绩格式，补全定数，缺少底分以及评价的成绩批量计算"""
+        rows: List[List[RecordValue]] = []
+        missing: List[int] = []
+        for _d in data:
+            song_id = int(_d['song_id'] if 'song_id' in _d else _d['id'])
+            level_index: int = _d['level_index']
+            music = mai.total_list.by_id(song_id)
+            ds: float = _d.get('ds') or (music.ds[level_index] if music and level_index < len(music.ds) else 0)
+            if not ('ra' in _d and _d.get('rate')):
+                missing.append(len(rows))
+            rows.append([
+                user, song_id, level_index, _d.get('title'), _d.get('type'), _d.get('level'),
+                _d.get('level_label') or diffs[level_index], music.basic_info.version if music else None,
+                ds, _d['achievements'], _d.get('dxScore', 0), _d.get('fc') or '', _d.get('fs') or '',
+                _d.get('ra'), _d.get('rate')
+            ])
+        ra, rank = computeRaBatch([rows[_i][8] for _i in missing], [rows[_i][9] for _i in missing])
+        for _i, _ra, _rank in zip(missing, ra, rank):
+            rows[_i][13], rows[_i][14] = _ra, score_Rank[_rank]
+        return [tuple(_r) for _r in rows]
+
+    def records(
+        self,
+        user: str,
+        *,
+        song_id: Optional[Union[int, str, List[Union[int, str]]]] = None,
+        level_index: Optional[int] = None,
+        level: Optional[Union[str, List[str]]] = None,
+        ds: Optional[float] = None,
+        version: Optional[Union[str, List[str]]] = None
+    ) -> List[RecordRow]:
+        """
+        按条件查询成绩，返回 `PlayInfoDev` 格式的字典列表
+
+        - `user`: 暂存键
+        - `song_id`: 曲目id，可以为单个ID或者列表
+        - `level_index`: 难度
+        - `level`: 等级，可以为单个等级或者列表
+        - `ds`: 定数
+        - `version`: 版本，可以为单个版本或者列表
+        """
+        where, params = self._where(user, song_id, level_index, level, ds, version)
+        cursor = self.conn.execute(f'SELECT * FROM record WHERE {where}', params)
+        return [dict(r) for r in cursor]
+
+    def rows(
+        self,
+        user: str,
+        *,
+        song_id: Optional[Union[int, str, List[Union[int, str]]]] = None,
+        level_index: Optional[int] = None,
+        level: Optional[Union[str, List[str]]] = None,
+        ds: Optional[float] = None,
+        version: Optional[Union[str, List[str]]] = None
+    ) -> List[PlayRecord]:
+        """
+        按条件查询成绩，返回 `PlayRecord` 列表，参数与 `records` 相同
+
+        大量成绩只用于筛选、排序和绘图时使用，避免逐条构造字典和模型
+        """
+        where, params = self._where(user, song_id, level_index, level, ds, version)
+        cursor = self.conn.execute(f'SELECT {", ".join(_columns[1:])} FROM record WHERE {where}', params)
+        cursor.row_factory = None
+        return list(map(PlayRecord._make, cursor))
+
+    @staticmethod
+    def _where(
+        user: str,
+        song_id: Optional[Union[int, str, List[Union[int, str]]]],
+        level_index: Optional[int],
+        level: Optional[Union[str, List[str]]],
+        ds: Optional[float],
+        version: Optional[Union[str, List[str]]]
+    ) -> Tuple[str, List[RecordValue]]:
+        where = ['user = ?']
+        params: List[RecordValue] = [user]
+        for column, value in (('song_id', song_id), ('level', level), ('version', version)):
+            if value is None:
+                continue
+            values = value if isinstance(value, list) else [value]
+            where.append(f'{column} IN ({", ".join("?" * len(values))})')
+            params.extend(int(v) if column == 'song_id' else v for v in values)
+        if level_index is not None:
+            where.append('level_index = ?')
+            params.append(level_index)
+        if ds is not None:
+            where.append('ds = ?')
+            params.append(ds)
+        return ' AND '.join(where), params
+
+    def record(self, user: str, song_id: Union[int, str], level_index: int) -> Optional[RecordRow]:
+        """查询单个谱面的成绩"""
+        row = self.conn.execute(
+            'SELECT * FROM record WHERE user = ? AND song_id = ? AND level_index = ?',
+            (user, int(song_id), level_index)
+        ).fetchone()
+        return dict(row) if row else None
+
+
+playerRecord = PlayerRecordStore(record_file)
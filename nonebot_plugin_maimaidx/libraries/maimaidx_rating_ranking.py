@@ -0,0 +1,134 @@
+import asyncio
+import math
+import time
+import traceback
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from loguru import logger as log
+
+from .maimaidx_api_data import maiApi
+
+
+class Ranker(NamedTuple):
+    rank: int
+    """名次，从 `1` 开始"""
+    username: str
+    ra: int
+
+
+class RatingRanking:
+
+    def __init__(self, page_size: int = 50) -> None:
+        """
+        查分器排行榜快照
+
+        快照按 `ra` 降序排列，同时建立 `用户名小写 -> 名次` 索引并预先切分页面，
+        超过 `ttl` 秒后查询仍返回旧快照，同时在后台重新获取，没有人查询时不会请求排行榜
+
+        - `page_size`: 每页人数
+        """
+        self.page_size = page_size
+        self.ttl = 600
+        self.rankers: List[Ranker] = []
+        self.pages: List[List[Ranker]] = []
+        self.updated_at: float = 0
+        self._index: Dict[str, int] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        """在首次刷新时创建，`Python 3.9` 及以下在导入时创建会绑定到其他事件循环"""
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.rankers)
+
+    @property
+    def age(self) -> float:
+        """快照距今秒数"""
+        return time.time() - self.updated_at
+
+    @property
+    def page_count(self) -> int:
+        return max(len(self.pages), 1)
+
+    def load(self, data: List[Dict[str, Any]]) -> None:
+        """
+        使用 `rating_ranking` 的返回值重建快照
+
+        - `data`: 排行榜数据，包含 `username`、`ra`
+        """
+        data = sorted(data, key=lambda r: r['ra'], reverse=True)
+        rankers = [Ranker(_n + 1, _r['username'], _r['ra']) for _n, _r in enumerate(data)]
+        index: Dict[str, int] = {}
+        for r in rankers:
+            index.setdefault(r.username.lower(), r.rank)
+        self.pages = [rankers[_n:_n + self.page_size] for _n in range(0, len(rankers), self.page_size)]
+        self.rankers = rankers
+        self._index = index
+        self.updated_at = time.time()
+
+    async def refresh(self, *, force: bool = True) -> None:
+        """
+        重新获取排行榜，同一时间只会请求一次
+
+        - `force`: 为 `False` 时快照未过期则跳过
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not force and self.rankers and self.age < self.ttl:
+                return
+            self.load(await maiApi.rating_ranking())
+            log.info(f'查分器排行榜已更新，共{len(self.rankers)}名玩家')
+
+    async def _refresh_background(self) -> None:
+        try:
+            await self.refresh(force=False)
+        except Exception:
+            log.error(traceback.format_exc())
+
+    async def snapshot(self) -> 'RatingRanking':
+        """
+        获取可用的快照，没有快照时等待获取，过期时在后台刷新并返回旧快照
+        """
+        if not self.rankers:
+            await self.refresh(force=False)
+        elif self.age >= self.ttl and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._refresh_background())
+        return self
+
+    def page(self, page: int) -> List[Ranker]:
+        """
+        获取指定页，超出范围时取最近的一页
+
+        - `page`: 页数，从 `1` 开始
+        """
+        if not self.pages:
+            return []
+        return self.pages[min(max(page, 1), len(self.pages)) - 1]
+
+    def rank(self, name: str) -> Optional[Ranker]:
+        """
+        按用户名查询名次，不区分大小写
+
+        - `name`: 查分器用户名
+        """
+        if (rank := self._index.get(name.lower())) is None:
+            return None
+        return self.rankers[rank - 1]
+
+    def percentile(self, percent: float) -> Optional[Ranker]:
+        """
+        排行前 `percent`% 的最后一名玩家
+
+        - `percent`: 百分比，`0` 到 `100`
+        """
+        if not self.rankers or not 0 < percent <= 100:
+            return None
+        rank = max(math.ceil(len(self.rankers) * percent / 100), 1)
+        return self.rankers[rank - 1]
+
+    def top_percent(self, ranker: Ranker) -> float:
+        """玩家名次位于前百分之多少"""
+        return ranker.rank / len(self.rankers) * 100
+
+
+ratingRanking = RatingRanking()
@@ -0,0 +1,145 @@
+import hashlib
+import math
+import struct
+import sys
+from array import array
+from typing import List, Optional
+
+from loguru import logger as log
+
+from ..config import *
+from .maimaidx_best_50 import computeRa
+
+_magic = b'MRTT'
+_version = 1
+_header = struct.Struct('<4sH8sII')
+_max_ds = 150
+
+
+def _digest() -> bytes:
+    """评价区间或底分系数变化后旧文件失效"""
+    return hashlib.sha1(repr((achievementList, BaseRaSpp)).encode()).digest()[:8]
+
+
+def achievement_thresholds(ds: float) -> List[float]:
+    """
+    直接求解每个评价区间内底分变化的达成率，结果与 `generateAchievementList` 一致
+
+    区间 `[achievementList[i], achievementList[i + 1])` 内底分为 `floor(ds * acc / 100 * BaseRaSpp[i + 1])`，
+    底分 `r` 的最低达成率（保留四位小数）为 `ceil(r / ds / BaseRaSpp[i + 1] * 100 * 10000) / 10000`
+
+    - `ds`: 定数
+    """
+    thresholds: List[float] = []
+    for index, acc in enumerate(achievementList[:-1]):
+        thresholds.append(acc)
+        base = BaseRaSpp[index + 1]
+        ra = computeRa(ds, acc) + 1
+        while (c_acc := math.ceil(ra / ds / base * 100 * 10000) / 10000) < achievementList[index + 1]:
+            thresholds.append(c_acc)
+            ra += 1
+    thresholds.append(100.5)
+    return thresholds
+
+
+class RatingThreshold:
+
+    def __init__(self, file: Path) -> None:
+        """
+        底分达成率阈值表
+
+        所有定数的阈值连续存放在 `values` 中，`offsets[ds * 10]` 至 `offsets[ds * 10 + 1]` 为该定数的阈值，
+        首次使用时读取 `file`，不存在或版本不符时重新计算并保存
+        """
+        self._file = file
+        self.offsets: Optional[array] = None
+        self.values: Optional[array] = None
+
+    def load(self) -> None:
+        if self.offsets is not None:
+            return
+        try:
+            if self._read():
+                return
+        except Exception as e:
+            log.warning(f'读取底分阈值表失败：{type(e)}，重新计算')
+        self.build()
+        try:
+            self._write()
+        except OSError as e:
+            log.warning(f'保存底分阈值表失败：{e}')
+
+    def build(self) -> None:
+        offsets, values = array('I', [0]), array('d')
+        for index in range(_max_ds + 1):
+            if index >= 10:
+                values.extend(achievement_thresholds(index / 10))
+            offsets.append(len(values))
+        self.offsets, self.values = offsets, values
+        if errors := self.verify():
+            log.error(f'底分阈值表与 computeRa 不一致：{errors[:5]}')
+
+    def _read(self) -> bool:
+        if not self._file.exists():
+            return False
+        with open(self._file, 'rb') as f:
+            magic, version, digest, count, size = _header.unpack(f.read(_header.size))
+            if magic != _magic or version != _version or digest != _digest() or count != _max_ds + 2:
+                return False
+            offsets, values = array('I'), array('d')
+            offsets.fromfile(f, count)
+            values.fromfile(f, size)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+            values.byteswap()
+        self.offsets, self.values = offsets, values
+        return True
+
+    def _write(self) -> None:
+        offsets, values = array('I', self.offsets), array('d', self.values)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+            values.byteswap()
+        with open(self._file, 'wb') as f:
+            f.write(_header.pack(_magic, _version, _digest(), len(offsets), len(values)))
+            offsets.tofile(f)
+            values.tofile(f)
+
+    def achievements(self, ds: float) -> List[float]:
+        """
+        获取定数对应的阈值，即每个评价区间起点以及区间内底分增加 `1` 的最低达成率
+
+        - `ds`: 定数，按一位小数查表
+        """
+        self.load()
+        index = int(round(ds * 10))
+        if not 10 <= index <= _max_ds:
+            return achievement_thresholds(float(f'{ds:.1f}'))
+        return self.values[self.offsets[index]:self.offsets[index + 1]].tolist()
+
+    def verify(self) -> List[str]:
+        """
+        使用 `computeRa` 校验阈值，返回不一致的项
+
+        评价区间内第 `k` 个阈值对应底分 `computeRa(区间起点) + k`，达成率按四位小数向上取整，
+        `computeRa` 的浮点误差可能使阈值处的底分少 `1`，因此允许 `0.0001` 的误差
+        """
+        errors = []
+        for index in range(10, _max_ds + 1):
+            ds = index / 10
+            thresholds = self.values[self.offsets[index]:self.offsets[index + 1]].tolist()
+            for band, acc in enumerate(achievementList[:-1]):
+                values = [_a for _a in thresholds if acc <= _a < achievementList[band + 1]]
+                if not values or values[0] != acc:
+                    errors.append(f'{ds} {acc}')
+                    continue
+                base = computeRa(ds, acc)
+                for ra, c_acc in enumerate(values[1:], base + 1):
+                    if computeRa(ds, c_acc + 0.0001) < ra or computeRa(ds, c_acc - 0.0002) >= ra:
+                        errors.append(f'{ds} {c_acc}')
+                if computeRa(ds, achievementList[band + 1] - 0.0002) > base + len(values) - 1:
+                    errors.append(f'{ds} {values[-1]}')
+        return errors
+
+
+ratingThreshold = RatingThreshold(rating_threshold_file)
@@ -0,0 +1,99 @@
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ..config import *
+from .maimaidx_best_50 import computeRa
+from .maimaidx_model import Music
+from .maimaidx_music import MusicList, mai
+from .maimaidx_rating_threshold import ratingThreshold
+
+RiseChart = Tuple[Music, int, float, bool]
+RiseResult = List[Union[Music, str, float, int]]
+
+
+class RiseScoreEngine:
+
+    def __init__(self) -> None:
+        """
+        上分推荐
+
+        每个定数预先计算 `底分: [(达成率, 评价)]`，谱面按等级建立索引，
+        查询时只需按玩家 `b50` 的底分直接查表
+        """
+        self._thresholds: Dict[float, Dict[int, List[Tuple[float, str]]]] = {}
+        self._source: Optional[MusicList] = None
+        self._charts: Dict[Optional[str], List[RiseChart]] = {}
+
+    def thresholds(self, ds: float) -> Dict[int, List[Tuple[float, str]]]:
+        """
+        定数对应的 `底分: [(达成率, 评价)]`，达成率为每个底分的最低要求
+
+        - `ds`: 定数
+        """
+        if ds not in self._thresholds:
+            table: Dict[int, List[Tuple[float, str]]] = {}
+            for achievement in ratingThreshold.achievements(ds):
+                if f'{achievement:.1f}' == '100.5':
+                    index_score = 12
+                else:
+                    index_score = bisect_right(achievementList, achievement) - 1
+                ra = computeRa(ds, achievement)
+                table.setdefault(ra, []).append((achievement, scoreRank[index_score + 1].upper()))
+            self._thresholds[ds] = table
+        return self._thresholds[ds]
+
+    def charts(self, level: Optional[str] = None) -> List[RiseChart]:
+        """
+        按等级获取谱面 `(曲目, 难度, 定数, 是否为新版本)`，曲目数据更新后重新建立索引
+
+        - `level`: 等级，为 `None` 时返回所有谱面
+        """
+        if self._source is not mai.total_list:
+            self._source = mai.total_list
+            self._charts = {None: []}
+            for music in mai.total_list:
+                for i, ds in enumerate(music.ds):
+                    chart = (music, i, ds, music.basic_info.is_new)
+                    self._charts[None].append(chart)
+                    self._charts.setdefault(music.level[i], []).append(chart)
+        return self._charts.get(level, [])
+
+    def recommend(
+        self,
+        charts: Dict[str, List[Dict[str, Any]]],
+        level: Optional[str],
+        score: int
+    ) -> Tuple[List[RiseResult], List[RiseResult]]:
+        """
+        查找游玩后底分恰好提升 `score` 的谱面，返回 `(标准乐曲, new乐曲)`，
+        每项为 `[曲目, 难度, 定数, 达成率, 评价, 底分]`，按曲目id排序
+
+        - `charts`: 玩家 `b50`，即 `query/player` 的 `charts`
+        - `level`: 等级
+        - `score`: 分数
+        """
+        best: Dict[bool, Dict[Tuple[int, int], int]] = {False: {}, True: {}}
+        for is_new, key in ((False, 'sd'), (True, 'dx')):
+            for chart in charts[key]:
+                best[is_new][(int(chart['song_id']), int(chart['level_index']))] = int(chart['ra'])
+        lowest = {_n: min(_b.values(), default=999) for _n, _b in best.items()}
+
+        result: Dict[bool, List[RiseResult]] = {False: [], True: []}
+        for music, i, ds, is_new in self.charts(level):
+            player_ra = best[is_new].get((int(music.id), i))
+            if player_ra is None:
+                target = lowest[is_new] + score
+            elif score:
+                target = player_ra + score
+            else:
+                continue
+            for achievement, rank in self.thresholds(ds).get(target, []):
+                result[is_new].append([music, diffs[i], ds, achievement, rank, target])
+
+        return (
+            sorted(result[False], key=lambda x: int(x[0].id)),
+            sorted(result[True], key=lambda x: int(x[0].id))
+        )
+
+
+riseScore = RiseScoreEngine()
@@ -0,0 +1,105 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from ..config import *
+from .maimaidx_model import PlayRecord
+
+Chart = Tuple[int, int]
+
+
+def _order(record: PlayRecord) -> Tuple[float, int, int]:
+    return -record.achievements, record.song_id, record.level_index
+
+
+def plan_predicate(plan: str) -> Callable[[PlayRecord], bool]:
+    """
+    评价、`FC`、`FS` 目标的完成条件，用于 `进度`
+
+    - `plan`: 目标，例如 `sss`、`ap`、`fdx`，无法识别时视为全部完成
+    """
+    plan = plan.lower()
+    if plan in scoreRank:
+        achievement = achievementList[scoreRank.index(plan) - 1]
+        return lambda r: r.achievements >= achievement
+    if plan in comboRank:
+        index = comboRank.index(plan)
+        return lambda r: bool(r.fc) and combo_rank.index(r.fc) >= index
+    if plan in syncRank2:
+        index = syncRank2.index(plan)
+        def predicate(r: PlayRecord) -> bool:
+            if r.fs in sync_rank2:
+                return sync_rank2.index(r.fs) >= index
+            return r.fs in sync_rank_p and sync_rank_p.index(r.fs) >= index
+        return predicate
+    return lambda r: True
+
+
+class ScoreIndex:
+
+    def __init__(self, records: Iterable[PlayRecord]) -> None:
+        """
+        玩家成绩索引，以 `(曲目id, 难度)` 为键
+
+        等级、定数、版本、曲目的二级索引在首次查询时建立，每个分组按达成率降序排列，
+        部分成绩更新后只需清空二级索引
+        """
+        self.charts: Dict[Chart, PlayRecord] = {(_r.song_id, _r.level_index): _r for _r in records}
+        self._ordered: Optional[List[PlayRecord]] = None
+        self._groups: Dict[str, Dict[Union[str, float, int], List[PlayRecord]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.charts)
+
+    def update(self, records: Iterable[PlayRecord]) -> None:
+        """写入部分曲目的成绩"""
+        for r in records:
+            self.charts[(r.song_id, r.level_index)] = r
+        self._ordered = None
+        self._groups.clear()
+
+    def get(self, song_id: Union[int, str], level_index: Union[int, str]) -> Optional[PlayRecord]:
+        """获取单个谱面的成绩"""
+        return self.charts.get((int(song_id), int(level_index)))
+
+    def ordered(self) -> List[PlayRecord]:
+        """所有成绩，按达成率降序、曲目id、难度排列"""
+        if self._ordered is None:
+            self._ordered = sorted(self.charts.values(), key=_order)
+        return self._ordered
+
+    def _group(self, field: str, values: Union[str, float, int, List[Union[str, float, int]]]) -> List[PlayRecord]:
+        if field not in self._groups:
+            group: Dict[Union[str, float, int], List[PlayRecord]] = {}
+            for r in self.ordered():
+                group.setdefault(getattr(r, field), []).append(r)
+            self._groups[field] = group
+        group = self._groups[field]
+        if not isinstance(values, list):
+            return group.get(values, [])
+        if len(values) == 1:
+            return group.get(values[0], [])
+        return sorted((_r for _v in set(values) for _r in group.get(_v, [])), key=_order)
+
+    def level(self, level: Union[str, List[str]]) -> List[PlayRecord]:
+        """按等级查询，可以为单个等级或者列表"""
+        return self._group('level', level)
+
+    def ds(self, ds: Union[float, List[float]]) -> List[PlayRecord]:
+        """按定数查询，可以为单个定数或者列表"""
+        return self._group('ds', ds)
+
+    def version(self, version: Union[str, List[str]]) -> List[PlayRecord]:
+        """按版本查询，可以为单个版本或者列表"""
+        return self._group('version', version)
+
+    def song(self, song_id: Union[int, str]) -> List[PlayRecord]:
+        """获取曲目所有难度的成绩"""
+        return self._group('song_id', int(song_id))
+
+    @staticmethod
+    def split(records: Iterable[PlayRecord], predicate: Callable[[PlayRecord], bool]) -> Tuple[List[PlayRecord], List[PlayRecord]]:
+        """按完成条件拆分成绩，返回 `(已完成, 未完成)`，保持原有顺序"""
+        completed: List[PlayRecord] = []
+        unfinished: List[PlayRecord] = []
+        for r in records:
+            (completed if predicate(r) else unfinished).append(r)
+        return completed, unfinished
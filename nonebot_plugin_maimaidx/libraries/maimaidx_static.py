@@ -0,0 +1,46 @@
+import base64
+from io import BytesIO
+from pathlib import Path
+from typing import Tuple, Union
+
+from .maimaidx_cache import LRUCache
+from .maimaidx_layer import AssetVersion, LayerCache
+
+
+class StaticImage:
+
+    def __init__(self) -> None:
+        """
+        原样发送的图片文件，例如定数表、帮助图片和曲绘
+
+        直接缓存文件内容的 base64，发送时不再解码和重新编码，
+        缓存时记录文件的修改时间和大小，文件被替换后自动重新读取
+        """
+        self._cache: LRUCache[Tuple[AssetVersion, str]] = LRUCache('static', 128 * 1024 * 1024, lambda x: len(x[1]))
+
+    def base64(self, file: Union[Path, BytesIO]) -> str:
+        """
+        获取图片的 base64，可直接用于 `MessageSegment.image`
+
+        - `file`: 图片文件，为 `BytesIO` 时直接编码，不缓存
+        """
+        if isinstance(file, BytesIO):
+            return 'base64://' + base64.b64encode(file.getvalue()).decode()
+        version = LayerCache.version(file)
+        if (entry := self._cache.get(file)) is not None and entry[0] == version:
+            return entry[1]
+        pic = 'base64://' + base64.b64encode(file.read_bytes()).decode()
+        self._cache.put(file, (version, pic))
+        return pic
+
+    def invalidate(self, *files: Path) -> None:
+        """
+        移除图片缓存，在重新生成图片文件后调用
+
+        - `files`: 图片文件
+        """
+        for file in files:
+            self._cache.pop(file)
+
+
+staticImage = StaticImage()
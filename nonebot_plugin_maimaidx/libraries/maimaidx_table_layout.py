@@ -0,0 +1,242 @@
+import json
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import aiofiles
+from loguru import logger as log
+
+from ..config import *
+from .maimaidx_cache import LRUCache
+from .maimaidx_layer import LayerCache
+from .maimaidx_model import Music, RaMusic
+from .maimaidx_music import mai
+
+Box = Tuple[int, int, int, int]
+
+
+class Cell(NamedTuple):
+    song_id: str
+    level_index: int
+    ds: float
+    level: str
+    x: int
+    """曲绘左上角横坐标"""
+    y: int
+    """曲绘左上角纵坐标"""
+
+
+class TableLayout(NamedTuple):
+    cells: Dict[Tuple[str, int], Cell]
+    """`(曲目id, 难度) -> 单元格`，按绘制顺序排列"""
+    groups: Dict[str, Box]
+    """分组名称 -> 包围盒 `(x0, y0, x1, y1)`，包含分组标签和所有单元格，定数表按定数分组，完成表按等级分组"""
+
+    def dumps(self, image_size: int, digest: Optional[str] = None) -> str:
+        """
+        序列化为清单文件内容
+
+        - `image_size`: 对应图片文件的字节数，读取时用于确认清单与图片一致
+        - `digest`: 生成图片时表格内容的摘要，用于判断是否需要重新生成
+        """
+        return json.dumps({
+            'image_size': image_size,
+            'digest': digest,
+            'cells': [list(_c) for _c in self.cells.values()],
+            'groups': self.groups,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def loads(cls, data: str, image_size: int) -> Optional['TableLayout']:
+        """
+        读取清单文件内容，与图片不一致时返回 `None`
+
+        - `data`: 清单文件内容
+        - `image_size`: 当前图片文件的字节数
+        """
+        manifest = json.loads(data)
+        if manifest['image_size'] != image_size:
+            return None
+        cells = [Cell(*_c) for _c in manifest['cells']]
+        return cls({(_c.song_id, _c.level_index): _c for _c in cells}, {k: tuple(v) for k, v in manifest['groups'].items()})
+
+
+def rating_image(rating: str) -> Path:
+    """定数表图片，`14`、`14+`、`15` 共用一张"""
+    return ratingdir / ('14.png' if rating in levelList[-3:] else f'{rating}.png')
+
+
+def rating_groups(musiclist: Dict[str, Dict[str, List[RaMusic]]], rating: str) -> Dict[str, List[RaMusic]]:
+    """
+    定数表中按定数分组的谱面
+
+    - `musiclist`: `lvList(rating=True)` 的返回值
+    - `rating`: 等级
+    """
+    if rating not in levelList[-3:]:
+        return musiclist[rating]
+    lvlist: Dict[str, List[RaMusic]] = {}
+    for lv in reversed(levelList[-3:]):
+        lvlist.update(musiclist[lv])
+    return lvlist
+
+
+def rating_layout(lvlist: Dict[str, List[RaMusic]]) -> TableLayout:
+    """
+    定数表布局，每行 `14` 个 `75x75` 的单元格
+
+    - `lvlist`: `rating_groups` 的返回值
+    """
+    cells: Dict[Tuple[str, int], Cell] = {}
+    groups: Dict[str, Box] = {}
+    y = 150
+    for lv, musics in lvlist.items():
+        x = 200
+        y += 20
+        top = y + 80
+        for num, music in enumerate(musics):
+            if num % 14 == 0:
+                x = 200
+                y += 85
+            else:
+                x += 85
+            cells[(music.id, int(music.lv))] = Cell(music.id, int(music.lv), music.ds, music.lvp, x, y)
+        if not musics:
+            y += 85
+        groups[lv] = (90, top, 200 + 85 * 13 + 75, y + 75)
+    return TableLayout(cells, groups)
+
+
+def plate_sort_ds(music: Music, version: str) -> float:
+    """
+    完成表中曲目排序使用的定数，`霸`、`舞` 为最高难度定数，其余为 `Master` 定数
+
+    - `music`: 曲目
+    - `version`: 版本
+    """
+    return music.ds[-1] if version in ['霸', '舞'] else music.ds[3]
+
+
+def plate_groups(version: str) -> Dict[str, List[Music]]:
+    """
+    完成表中按 `Master` 等级分组的曲目，`霸`、`舞` 按最高难度定数排序
+
+    - `version`: 版本
+    """
+    groups: Dict[str, List[Music]] = {_l: [] for _l in reversed(levelList)}
+    for music in mai.versions.plate(version).songs:
+        groups[music.level[3]].append(music)
+    for musics in groups.values():
+        musics.sort(key=lambda x: plate_sort_ds(x, version), reverse=True)
+    return groups
+
+
+def plate_layout(groups: Dict[str, List[Music]]) -> TableLayout:
+    """
+    完成表布局，每行 `10` 个 `100x100` 的单元格，没有曲目的等级不占位置
+
+    - `groups`: `plate_groups` 的返回值
+    """
+    cells: Dict[Tuple[str, int], Cell] = {}
+    boxes: Dict[str, Box] = {}
+    y = 350
+    for lv, musics in groups.items():
+        if not musics:
+            continue
+        y += 15
+        top = y + 115
+        x = 210
+        for num, music in enumerate(musics):
+            if num % 10 == 0:
+                x = 210
+                y += 115
+            else:
+                x += 115
+            cells[(music.id, 3)] = Cell(music.id, 3, music.ds[3], lv, x, y)
+        boxes[lv] = (80, top, 210 + 115 * 9 + 100, y + 100)
+    return TableLayout(cells, boxes)
+
+
+class TableLayouts:
+
+    def __init__(self) -> None:
+        """
+        定数表、完成表的布局
+
+        生成图片时在同目录写入同名 `.json` 清单，记录每个谱面的位置，绘制个人成绩时直接查询，
+        清单不存在或与图片不一致时（例如使用旧版本生成的图片）按当前曲目数据计算布局
+        """
+        self._cache: LRUCache[TableLayout] = LRUCache('layout', 64)
+
+    @staticmethod
+    def manifest(image: Path) -> Path:
+        return image.with_suffix('.json')
+
+    async def save(self, image: Path, data: bytes, layout: TableLayout, digest: Optional[str] = None) -> None:
+        """
+        写入图片及其清单
+
+        - `image`: 图片文件
+        - `data`: 图片内容
+        - `layout`: 图片使用的布局
+        - `digest`: 表格内容的摘要
+        """
+        async with aiofiles.open(image, 'wb') as f:
+            await f.write(data)
+        async with aiofiles.open(self.manifest(image), 'w', encoding='utf-8') as f:
+            await f.write(layout.dumps(len(data), digest))
+
+    def digest(self, image: Path) -> Optional[str]:
+        """
+        清单中记录的表格内容摘要，图片或清单不存在、两者不一致时返回 `None`
+
+        - `image`: 图片文件
+        """
+        try:
+            manifest = json.loads(self.manifest(image).read_text(encoding='utf-8'))
+            if manifest['image_size'] != image.stat().st_size:
+                return None
+            return manifest.get('digest')
+        except Exception:
+            return None
+
+    def load(self, image: Path, build: Callable[[], TableLayout]) -> TableLayout:
+        """
+        获取图片的布局，结果按图片、清单的版本和曲目数据版本缓存
+
+        - `image`: 图片文件
+        - `build`: 没有可用的清单时按当前曲目数据计算布局
+        """
+        manifest = self.manifest(image)
+        key = (image, LayerCache.version(image, manifest), mai.data_version)
+        if (layout := self._cache.get(key)) is None:
+            try:
+                layout = TableLayout.loads(manifest.read_text(encoding='utf-8'), image.stat().st_size)
+            except FileNotFoundError:
+                layout = None
+            except Exception:
+                log.error(f'读取布局清单 {manifest.name} 失败\n{traceback.format_exc()}')
+                layout = None
+            if layout is None:
+                layout = build()
+            self._cache.put(key, layout)
+        return layout
+
+    def rating(self, rating: str) -> TableLayout:
+        """
+        定数表布局
+
+        - `rating`: 等级
+        """
+        return self.load(rating_image(rating), lambda: rating_layout(rating_groups(mai.total_list.lvList(rating=True), rating)))
+
+    def plate(self, version: str) -> TableLayout:
+        """
+        完成表布局
+
+        - `version`: 版本
+        """
+        return self.load(platedir / f'{version}.png', lambda: plate_layout(plate_groups(version)))
+
+
+tableLayouts = TableLayouts()
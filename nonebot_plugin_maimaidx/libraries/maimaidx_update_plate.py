@@ -1,10 +1,36 @@
-import copy
+import asyncio
+import hashlib
+import json
+import os
 import time
-
-import aiofiles
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple
 
 from .maimaidx_best_50 import *
-from .maimaidx_music import Music, RaMusic, mai
+from .maimaidx_model import Music, RaMusic
+from .maimaidx_music import mai
+from .maimaidx_static import staticImage
+from .maimaidx_table_layout import *
+
+Cover = Union[Path, bytes]
+Progress = Callable[[str], Awaitable[Any]]
+
+table_version = 1
+"""表格绘制方式的版本，修改绘制代码后加一，使所有表格重新生成"""
+
+
+class TableJob(NamedTuple):
+    name: str
+    image: Path
+    layout: TableLayout
+    digest: str
+    """表格内容的摘要，与清单中记录的摘要相同时跳过"""
+    render: Callable[[Dict[str, Cover]], bytes]
+    """传入曲绘，返回 `PNG` 图片内容，在线程池中执行"""
+
+
+_executor = ThreadPoolExecutor(min(4, os.cpu_count() or 1), 'maimaidx_table')
 
 
 def image_scale(height: int) -> Tuple[Image.Image, int, int]:
@@ -33,186 +59,241 @@ def image_scale(height: int) -> Tuple[Image.Image, int, int]:
     return newbg, bg_x, bg_y
 
 
-async def update_rating_table() -> str:
-    """更新定数表"""
-    try:
-        bg_color = [(111, 212, 61, 255), (248, 183, 9, 255), (255, 129, 141, 255), (159, 81, 220, 255), (219, 170, 255, 255)]
-        dx = Image.open(maimaidir / 'DX.png').convert('RGBA').resize((44, 16))
-        diff = [Image.new('RGBA', (75, 75), color) for color in bg_color]
-        atime = 0
-        musiclist = mai.total_list.lvList(rating=True)
-        for ra in levelList[5:]:
-            _otime = time.time()
+def table_digest(*parts: Any) -> str:
+    """
+    表格内容的摘要，包含绘制方式的版本和 Bot 名称
 
-            if ra in levelList[-3:]:
-                bg = ratingdir / '14.png'
-                ralist = levelList[-3:]
-            else:
-                bg = ratingdir / f'{ra}.png'
-                ralist = [ra]
+    - `parts`: 决定表格内容的数据，例如谱面及其定数
+    """
+    data = json.dumps([table_version, maiconfig.botName, *parts], ensure_ascii=False)
+    return hashlib.sha1(data.encode()).hexdigest()
 
-            lvlist: Dict[str, List[RaMusic]] = {}
-            if len(ralist) != 1:
-                for lv in list(reversed(ralist)):
-                    lvlist.update(musiclist[lv])
-            else:
-                lvlist = musiclist[ralist[0]]
 
-            if ra in ['14', '14+', '15']:
-                lvtext = 'Level.14 - 15   定数表'
-            else:
-                lvtext = f'Level.{ra}   定数表'
-
-            lines = 0
-            for _ in lvlist:
-                musicnum = len(lvlist[_])
-                if musicnum == 0:
-                    r = 1
-                else:
-                    remainder = musicnum % 14
-                    r = (musicnum // 14) + (1 if remainder else 0)
-                lines += r
-
-            if '+' in ra:
-                f = 3
-            elif ra in ['6', '14', '14+', '15']:
-                f = 10
+async def fetch_covers(song_ids: Iterable[str]) -> Dict[str, Cover]:
+    """
+    并发获取曲绘，本地文件返回路径，下载的曲绘返回内容
+
+    - `song_ids`: 曲目id
+    """
+    semaphore = asyncio.Semaphore(16)
+    async def fetch(song_id: str) -> Tuple[str, Cover]:
+        async with semaphore:
+            cover = await maiApi.download_music_pictrue(song_id)
+        return song_id, cover.getvalue() if isinstance(cover, BytesIO) else cover
+    return dict(await asyncio.gather(*[fetch(_i) for _i in set(song_ids)]))
+
+
+def open_cover(cover: Cover) -> Image.Image:
+    return Image.open(BytesIO(cover) if isinstance(cover, bytes) else cover)
+
+
+def draw_rating_table_image(ra: str, lvlist: Dict[str, List[RaMusic]], layout: TableLayout, covers: Dict[str, Cover]) -> bytes:
+    """
+    绘制定数表，不访问网络和事件循环，可以在线程中执行
+
+    - `ra`: 等级
+    - `lvlist`: `rating_groups` 的返回值
+    - `layout`: `rating_layout` 的返回值
+    - `covers`: 曲绘
+    """
+    bg_color = [(111, 212, 61, 255), (248, 183, 9, 255), (255, 129, 141, 255), (159, 81, 220, 255), (219, 170, 255, 255)]
+    dx = Image.open(maimaidir / 'DX.png').convert('RGBA').resize((44, 16))
+    diff = [Image.new('RGBA', (75, 75), color) for color in bg_color]
+
+    if ra in ['14', '14+', '15']:
+        lvtext = 'Level.14 - 15   定数表'
+    else:
+        lvtext = f'Level.{ra}   定数表'
+
+    lines = 0
+    for _ in lvlist:
+        musicnum = len(lvlist[_])
+        if musicnum == 0:
+            r = 1
+        else:
+            remainder = musicnum % 14
+            r = (musicnum // 14) + (1 if remainder else 0)
+        lines += r
+
+    if '+' in ra:
+        f = 3
+    elif ra in ['6', '14', '14+', '15']:
+        f = 10
+    else:
+        f = 7
+
+    linesheight = 85 * lines
+    width, height = 1500, 400 + (85 + f * 20) + linesheight
+    newbg, bg_x, bg_y = image_scale(height)
+
+    im = Image.new('RGBA', (width, height))
+    im.alpha_composite(newbg, (bg_x, bg_y))
+    dr = ImageDraw.Draw(im)
+    hy = DrawText(dr, HANYI)
+    ts = DrawText(dr, TBFONT)
+    hy.draw(750, 100, 65, lvtext, (5, 51, 101, 255), 'mm')
+    im.alpha_composite(Image.new('RGBA', (1400, 85 + f * 20 + linesheight), (247, 246, 238, 234)), (50, 200))
+    dr.rounded_rectangle((50, 200, 1450, 280 + f * 20 + linesheight), 10, outline=(255, 186, 66, 255), width=5)
+    dr.rounded_rectangle((50 - 5, 200 - 5, 1450 + 5, 280 + f * 20 + linesheight + 5), 15, outline=(255, 255, 255, 255), width=5)
+    dr.rounded_rectangle((50 - 10, 200 - 10, 1450 + 10, 280 + f * 20 + linesheight + 10), 20, outline=(255, 255, 255, 255), width=5)
+    im.alpha_composite(Image.open(maimaidir / 'design.png'), (200, height - 165))
+    hy.draw(750, height - 115, 28, f'Designed by Yuri-YuzuChaN | Generated by {maiconfig.botName} BOT', (5, 51, 101, 255), 'mm')
+    for lv, (_, y, _, _) in layout.groups.items():
+        im.alpha_composite(Image.open(maimaidir / 'UI_Chara_Level_S #4824.png').resize((80, 80)), (90, y))
+        ts.draw(128, y + 40, 35, lv, anchor='mm')
+        for music in lvlist[lv]:
+            _, _, _, _, x, y = layout.cells[(music.id, int(music.lv))]
+            cover = open_cover(covers[music.id])
+            if int(music.lv) != 3:
+                cover_bg = diff[int(music.lv)]
+                cover_bg.alpha_composite(cover.convert('RGBA').resize((65, 65)), (5, 5))
             else:
-                f = 7
-
-            linesheight = 85 * lines
-            width, height = 1500, 400 + (85 + f * 20) + linesheight
-            newbg, bg_x, bg_y = image_scale(height)
-
-            im = Image.new('RGBA', (width, height))
-            im.alpha_composite(newbg, (bg_x, bg_y))
-            dr = ImageDraw.Draw(im)
-            hy = DrawText(dr, HANYI)
-            ts = DrawText(dr, TBFONT)
-            hy.draw(750, 100, 65, lvtext, (5, 51, 101, 255), 'mm')
-            im.alpha_composite(Image.new('RGBA', (1400, 85 + f * 20 + linesheight), (247, 246, 238, 234)), (50, 200))
-            dr.rounded_rectangle((50, 200, 1450, 280 + f * 20 + linesheight), 10, outline=(255, 186, 66, 255), width=5)
-            dr.rounded_rectangle((50 - 5, 200 - 5, 1450 + 5, 280 + f * 20 + linesheight + 5), 15, outline=(255, 255, 255, 255), width=5)
-            dr.rounded_rectangle((50 - 10, 200 - 10, 1450 + 10, 280 + f * 20 + linesheight + 10), 20, outline=(255, 255, 255, 255), width=5)
-            im.alpha_composite(Image.open(maimaidir / 'design.png'), (200, height - 165))
-            hy.draw(750, height - 115, 28, f'Designed by Yuri-YuzuChaN | Generated by {maiconfig.botName} BOT', (5, 51, 101, 255), 'mm')
-            y = 150
-            for lv in lvlist:
-                x = 200
-                y += 20
-                im.alpha_composite(Image.open(maimaidir / 'UI_Chara_Level_S #4824.png').resize((80, 80)), (90, y + 80))
-                ts.draw(128, y + 120, 35, lv, anchor='mm')
-                for num, music in enumerate(lvlist[lv]):
-                    if num % 14 == 0:
-                        x = 200
-                        y += 85
-                    else:
-                        x += 85
-                    cover = await maiApi.download_music_pictrue(music.id)
-                    if int(music.lv) != 3:
-                        cover_bg = diff[int(music.lv)]
-                        cover_bg.alpha_composite(Image.open(cover).convert('RGBA').resize((65, 65)), (5, 5))
-                    else:
-                        cover_bg = Image.open(cover).convert('RGBA').resize((75, 75))
-                    im.alpha_composite(cover_bg, (x, y))
-                    if music.type == 'DX':
-                        im.alpha_composite(dx, (x + 31, y))
-                if not lvlist[lv]:
-                    y += 85
-
-            by = BytesIO()
-            im.save(by, 'PNG')
-            async with aiofiles.open(bg, 'wb') as f:
-                await f.write(by.getbuffer())
-            _ntime = int(time.time() - _otime)
-            atime += _ntime
-            log.info(f'lv.{ra} 定数表更新完成，耗时：{_ntime}s')
-        log.info(f'定数表更新完成，共耗时{atime}s')
-        return f'定数表更新完成，共耗时{atime}s'
+                cover_bg = cover.convert('RGBA').resize((75, 75))
+            im.alpha_composite(cover_bg, (x, y))
+            if music.type == 'DX':
+                im.alpha_composite(dx, (x + 31, y))
+
+    by = BytesIO()
+    im.save(by, 'PNG')
+    return by.getvalue()
+
+
+def draw_plate_table_image(ralv: Dict[str, List[Music]], layout: TableLayout, covers: Dict[str, Cover]) -> bytes:
+    """
+    绘制完成表，不访问网络和事件循环，可以在线程中执行
+
+    - `ralv`: `plate_groups` 的返回值
+    - `layout`: `plate_layout` 的返回值
+    - `covers`: 曲绘
+    """
+    _w = 1500
+    _n = 10
+
+    lines = 0
+    for _ in ralv:
+        musicnum = len(ralv[_])
+        if musicnum == 0:
+            continue
+        else:
+            remainder = musicnum % _n
+            lines += (musicnum // _n) + (1 if remainder else 0)
+    linesheight = 115 * lines
+    width, height = _w, 850 + linesheight
+
+    newbg, bg_x, bg_y = image_scale(height)
+
+    im = Image.new('RGBA', (width, height))
+    im.alpha_composite(newbg, (bg_x, bg_y))
+    dr = ImageDraw.Draw(im)
+    ts = DrawText(dr, TBFONT)
+    im.alpha_composite(Image.new('RGBA', (1400, 230 + linesheight), (247, 246, 238, 234)), (50, 400))
+    im.alpha_composite(Image.open(maimaidir / 'progress.png'), (299, 91))
+    dr.rounded_rectangle((50, 400, 1450, 630 + linesheight), 10, outline=(255, 186, 66, 255), width=5)
+    dr.rounded_rectangle((50 - 5, 400 - 5, 1450 + 5, 630 + linesheight + 5), 15, outline=(255, 255, 255, 255), width=5)
+    dr.rounded_rectangle((50 - 10, 400 - 10, 1450 + 10, 630 + linesheight + 10), 20, outline=(255, 255, 255, 255), width=5)
+    im.alpha_composite(Image.open(maimaidir / 'design.png'), (200, height - 165))
+    for r, (_, y, _, _) in layout.groups.items():
+        im.alpha_composite(Image.open(maimaidir / 'UI_Chara_Level_S #4824.png'), (80, y))
+        ts.draw(128, y + 49, 35, r, anchor='mm')
+        for music in ralv[r]:
+            _, _, _, _, x, y = layout.cells[(music.id, 3)]
+            im.alpha_composite(open_cover(covers[music.id]).convert('RGBA').resize((100, 100)), (x, y))
+
+    by = BytesIO()
+    im.save(by, 'PNG')
+    return by.getvalue()
+
+
+async def run_table_jobs(title: str, jobs: List[TableJob], force: bool = False, progress: Optional[Progress] = None) -> str:
+    """
+    在线程池中并行绘制表格，内容未变化的表格跳过
+
+    - `title`: 任务名称
+    - `jobs`: 需要绘制的表格
+    - `force`: 是否重新绘制所有表格
+    - `progress`: 进度回调，开始绘制和每张表格完成时调用
+    """
+    start = time.perf_counter()
+    pending = [_j for _j in jobs if force or tableLayouts.digest(_j.image) != _j.digest]
+    skipped = len(jobs) - len(pending)
+    if progress:
+        await progress(f'开始更新{title}，需要更新{len(pending)}张，{skipped}张未变化')
+    covers = await fetch_covers(_c.song_id for _j in pending for _c in _j.layout.cells.values())
+    loop = asyncio.get_running_loop()
+    done = 0
+
+    def render(job: TableJob) -> Tuple[bytes, float]:
+        _start = time.perf_counter()
+        return job.render(covers), time.perf_counter() - _start
+
+    async def run(job: TableJob) -> str:
+        nonlocal done
+        try:
+            data, elapsed = await loop.run_in_executor(_executor, render, job)
+            await tableLayouts.save(job.image, data, job.layout, job.digest)
+            staticImage.invalidate(job.image)
+            result = f'{job.name}：{elapsed:.2f}s'
+            log.info(f'{job.name}更新完成，耗时{elapsed:.2f}s')
+        except Exception as e:
+            log.error(traceback.format_exc())
+            result = f'{job.name}：失败，Error: {e}'
+        done += 1
+        if progress:
+            await progress(f'[{done}/{len(pending)}] {result}')
+        return result
+
+    results = await asyncio.gather(*[run(_j) for _j in pending])
+    total = time.perf_counter() - start
+    log.info(f'{title}更新完成，更新{len(pending)}张，跳过{skipped}张，共耗时{total:.2f}s')
+    return '\n'.join([f'{title}更新完成，更新{len(pending)}张，跳过{skipped}张，共耗时{total:.2f}s', *results])
+
+
+async def update_rating_table(force: bool = False, progress: Optional[Progress] = None) -> str:
+    """
+    更新定数表
+
+    - `force`: 是否重新绘制所有表格，否则只绘制谱面或定数有变化的表格
+    - `progress`: 进度回调
+    """
+    try:
+        musiclist = mai.total_list.lvList(rating=True)
+        jobs: Dict[Path, TableJob] = {}
+        for ra in levelList[5:]:
+            if (bg := rating_image(ra)) in jobs:
+                continue
+            lvlist = rating_groups(musiclist, ra)
+            layout = rating_layout(lvlist)
+            digest = table_digest('rating', bg.stem, [
+                (lv, [(_m.id, _m.lv, _m.ds, _m.type) for _m in musics]) for lv, musics in lvlist.items()
+            ])
+            render = partial(draw_rating_table_image, ra, lvlist, layout)
+            name = 'lv.14 - 15 定数表' if ra in levelList[-3:] else f'lv.{ra} 定数表'
+            jobs[bg] = TableJob(name, bg, layout, digest, render)
+        return await run_table_jobs('定数表', list(jobs.values()), force, progress)
     except Exception as e:
         log.error(traceback.format_exc())
         return f'定数表更新失败，Error: {e}'
 
 
-async def update_plate_table() -> str:
-    """更新完成表"""
+async def update_plate_table(force: bool = False, progress: Optional[Progress] = None) -> str:
+    """
+    更新完成表
+
+    - `force`: 是否重新绘制所有表格，否则只绘制谱面或定数有变化的表格
+    - `progress`: 进度回调
+    """
     try:
         version = list(_ for _ in plate_to_version.keys())[-1]
-        rlv: Dict[str, List[Music]] = {}
-        for _ in list(reversed(levelList)):
-            rlv[_] = []
+        jobs: List[TableJob] = []
         for _v in version:
-            _w = 1500
-            _n = 10
-
-            if _v == '真':
-                ver = list(set(_v for _v in list(plate_to_version.values())[0:2]))
-            elif _v == '华' or _v == '華':
-                ver = [plate_to_version['熊']]
-            elif _v == '星':
-                ver = [plate_to_version['宙']]
-            elif _v == '祝':
-                ver = [plate_to_version['祭']]
-            elif _v == '煌':
-                ver = [plate_to_version['爽']]
-            else:
-                ver = [plate_to_version[_v]]
-
-            music = mai.total_list.by_version(ver)
-            ralv = copy.deepcopy(rlv)
-
-            for m in music:
-                ralv[m.level[3]].append(m)
-
-            lines = 0
-            for _ in ralv:
-                musicnum = len(ralv[_])
-                if musicnum == 0:
-                    continue
-                else:
-                    remainder = musicnum % _n
-                    lines += (musicnum // _n) + (1 if remainder else 0)
-            linesheight = 115 * lines
-            width, height = _w, 850 + linesheight
-
-            newbg, bg_x, bg_y = image_scale(height)
-
-            im = Image.new('RGBA', (width, height))
-            im.alpha_composite(newbg, (bg_x, bg_y))
-            dr = ImageDraw.Draw(im)
-            ts = DrawText(dr, TBFONT)
-            im.alpha_composite(Image.new('RGBA', (1400, 230 + linesheight), (247, 246, 238, 234)), (50, 400))
-            im.alpha_composite(Image.open(maimaidir / 'progress.png'), (299, 91))
-            dr.rounded_rectangle((50, 400, 1450, 630 + linesheight), 10, outline=(255, 186, 66, 255), width=5)
-            dr.rounded_rectangle((50 - 5, 400 - 5, 1450 + 5, 630 + linesheight + 5), 15, outline=(255, 255, 255, 255), width=5)
-            dr.rounded_rectangle((50 - 10, 400 - 10, 1450 + 10, 630 + linesheight + 10), 20, outline=(255, 255, 255, 255), width=5)
-            im.alpha_composite(Image.open(maimaidir / 'design.png'), (200, height - 165))
-            y = 350
-            for r in ralv:
-                if _v in ['霸', '舞']:
-                    ralv[r].sort(key=lambda x: x.ds[-1], reverse=True)
-                else:
-                    ralv[r].sort(key=lambda x: x.ds[3], reverse=True)
-                if ralv[r]:
-                    y += 15
-                    im.alpha_composite(Image.open(maimaidir / 'UI_Chara_Level_S #4824.png'), (80, y + 115))
-                    ts.draw(128, y + 164, 35, r, anchor='mm')
-                x = 210
-                for num, music in enumerate(ralv[r]):
-                    if num % _n == 0:
-                        x = 210
-                        y += 115
-                    else:
-                        x += 115
-                    cover = await maiApi.download_music_pictrue(music.id)
-                    im.alpha_composite(Image.open(cover).convert('RGBA').resize((100, 100)), (x, y))
-
-            by = BytesIO()
-            im.save(by, 'PNG')
-            async with aiofiles.open(platedir / f'{_v}.png', 'wb') as f:
-                await f.write(by.getbuffer())
-            log.info(f'{_v}代牌子更新完成')
-        return f'完成表更新完成'
+            ralv = plate_groups(_v)
+            layout = plate_layout(ralv)
+            digest = table_digest('plate', _v, [
+                (lv, [(_m.id, _m.ds[3], plate_sort_ds(_m, _v)) for _m in musics]) for lv, musics in ralv.items()
+            ])
+            render = partial(draw_plate_table_image, ralv, layout)
+            jobs.append(TableJob(f'{_v}代完成表', platedir / f'{_v}.png', layout, digest, render))
+        return await run_table_jobs('完成表', jobs, force, progress)
     except Exception as e:
         log.error(traceback.format_exc())
-        return f'完成表更新失败，Error: {e}'
\ No newline at end of file
+        return f'完成表更新失败，Error: {e}'
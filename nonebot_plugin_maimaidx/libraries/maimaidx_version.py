@@ -0,0 +1,94 @@
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Tuple
+
+from ..config import *
+from .maimaidx_model import Music
+
+Chart = Tuple[int, int]
+
+plate_alias: Dict[str, str] = {
+    '华': '熊',
+    '華': '熊',
+    '煌': '爽',
+    '星': '宙',
+    '祝': '祭',
+}
+"""国服合并的版本，牌子使用前一个版本的曲目"""
+
+plate_exclude: Dict[str, List[str]] = {
+    '真': ['ジングルベル'],
+}
+"""牌子不要求的曲目标题"""
+
+
+def plate_version(ver: str) -> List[str]:
+    """
+    获取牌子对应的查分器版本
+
+    - `ver`: 牌子的版本字，例如 `真`、`祭`、`舞`
+    """
+    versions = list(plate_to_version.values())
+    if ver == '真':
+        return versions[0:2]
+    if ver in ['舞', '霸']:
+        # 旧框全部版本，即 maimai 至 FiNALE
+        return list(dict.fromkeys(versions[:versions.index(plate_to_version['辉']) + 1]))
+    return [plate_to_version[plate_alias.get(ver, ver)]]
+
+
+class PlateVersion(NamedTuple):
+    name: str
+    versions: List[str]
+    songs: List[Music]
+    """牌子要求的曲目，已排除 `ignore_music` 和宴会场，按曲目id排序"""
+    charts: FrozenSet[Chart]
+    """`Basic` 至 `Master` 的 `(曲目id, 难度)`"""
+    remaster_charts: FrozenSet[Chart]
+    """`Re:Master` 的 `(曲目id, 难度)`"""
+
+    def required(self, remaster: bool = False) -> FrozenSet[Chart]:
+        """牌子要求的谱面"""
+        return self.charts | self.remaster_charts if remaster else self.charts
+
+
+class VersionRegistry:
+
+    def __init__(self, total_list: Iterable[Music]) -> None:
+        """
+        版本索引，曲目数据加载时建立
+
+        按版本分组曲目，并为每个牌子预先计算曲目和谱面集合
+        """
+        self.by_version: Dict[str, List[Music]] = {}
+        ignore = set(ignore_music)
+        for music in sorted(total_list, key=lambda m: int(m.id)):
+            if music.id in ignore or int(music.id) > 100000:
+                continue
+            self.by_version.setdefault(music.basic_info.version, []).append(music)
+        self._plates: Dict[str, PlateVersion] = {}
+        for ver in list(plate_to_version) + ['舞', '霸']:
+            self._plates[ver] = self._build(ver)
+
+    def _build(self, ver: str) -> PlateVersion:
+        versions = plate_version(ver)
+        exclude = plate_exclude.get(ver, [])
+        songs = sorted(
+            (_m for _v in versions for _m in self.by_version.get(_v, []) if _m.title not in exclude),
+            key=lambda m: int(m.id)
+        )
+        charts = frozenset((int(_m.id), _i) for _m in songs for _i in range(min(4, len(_m.ds))))
+        remaster_charts = frozenset((int(_m.id), 4) for _m in songs if len(_m.ds) == 5)
+        return PlateVersion(ver, versions, songs, charts, remaster_charts)
+
+    def plate(self, ver: str) -> PlateVersion:
+        """
+        获取牌子的版本、曲目以及谱面集合
+
+        - `ver`: 牌子的版本字
+        """
+        if ver not in self._plates:
+            self._plates[ver] = self._build(ver)
+        return self._plates[ver]
+
+    def songs(self, versions: Iterable[str]) -> List[Music]:
+        """获取版本列表包含的曲目，按曲目id排序"""
+        return sorted((_m for _v in set(versions) for _m in self.by_version.get(_v, [])), key=lambda m: int(m.id))
@@ -0,0 +1,30 @@
+import os
+import tempfile
+from pathlib import Path
+
+import nonebot
+import pytest
+
+
+@pytest.fixture(scope='session')
+def plugin() -> Path:
+    """
+    以回放模式加载插件，静态资源文件夹由环境变量 `MAIMAIDX_STATIC` 指定，未指定或不存在时测试失败
+    """
+    static = os.environ.get('MAIMAIDX_STATIC')
+    if not static or not Path(static).is_dir():
+        pytest.fail(
+            f'测试需要静态资源文件夹，请设置环境变量 MAIMAIDX_STATIC，当前为 {static!r}\n'
+            'MAIMAIDX_STATIC=/path/to/static python -m pytest tests',
+            pytrace=False
+        )
+    workdir = Path(tempfile.mkdtemp(prefix='maimaidx-test-'))
+    nonebot.init(
+        driver='~none',
+        log_level='WARNING',
+        maimaidxpath=static,
+        maimaidxapimode='replay',
+        maimaidxfixturepath=str(workdir / 'fixture'),
+    )
+    assert nonebot.load_plugin('nonebot_plugin_maimaidx') is not None
+    return Path(static)
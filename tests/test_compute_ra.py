@@ -0,0 +1,41 @@
+import random
+from typing import List, Tuple
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def samples(plugin) -> List[Tuple[float, float]]:
+    """所有定数 × (每 0.01 的达成率、评价边界附近 ±0.0001、随机四位小数达成率)"""
+    from nonebot_plugin_maimaidx.config import achievementList
+
+    rand = random.Random(0)
+    data = []
+    for index in range(10, 151):
+        ds = index / 10
+        accs = [i / 100 for i in range(0, 10101)]
+        for acc in achievementList:
+            accs.extend((acc - 0.0001, acc, acc + 0.0001))
+        accs.extend(round(rand.uniform(0, 101), 4) for _ in range(500))
+        data.extend((ds, acc) for acc in accs)
+    return data
+
+
+def test_compute_ra_boundaries(plugin):
+    from nonebot_plugin_maimaidx.libraries.maimaidx_best_50 import computeRa
+
+    assert computeRa(13.0, 100.5, israte=True) == (292, 'SSSp')
+    assert computeRa(13.0, 100.4999, israte=True) == (282, 'SSS')
+    assert computeRa(13.0, 101.0) == 292
+    assert computeRa(13.0, 97.0, onlyrate=True) == 'S'
+    assert computeRa(13.0, 96.9999, onlyrate=True) == 'AAA'
+    assert computeRa(13.0, 0) == 0
+
+
+def test_compute_ra_batch_matches_scalar(plugin, samples):
+    from nonebot_plugin_maimaidx.config import score_Rank, score_Rank_l
+    from nonebot_plugin_maimaidx.libraries.maimaidx_best_50 import computeRa, computeRaBatch
+
+    ra, rank = computeRaBatch([_d for _d, _ in samples], [_a for _, _a in samples])
+    for (ds, acc), _ra, _rank in zip(samples, ra, rank):
+        assert (_ra, score_Rank_l[score_Rank[_rank]]) == computeRa(ds, acc, israte=True), (ds, acc)
@@ -0,0 +1,35 @@
+import pytest
+
+
+@pytest.mark.parametrize('index', range(10, 151))
+def test_thresholds_match_compute_ra(plugin, index):
+    """
+    每个评价区间的第一个阈值为区间起点，区间内第 `k` 个阈值处底分为 `computeRa(区间起点) + k`，
+    阈值之下底分比其少 `1`，且区间内没有遗漏的阈值
+
+    `computeRa` 在阈值处的浮点误差可能使底分差 `1`，与 `RatingThreshold.verify` 相同，两侧各允许 `0.0001` 的误差
+    """
+    from nonebot_plugin_maimaidx.config import achievementList
+    from nonebot_plugin_maimaidx.libraries.maimaidx_best_50 import computeRa
+    from nonebot_plugin_maimaidx.libraries.maimaidx_rating_threshold import achievement_thresholds
+
+    ds = index / 10
+    thresholds = achievement_thresholds(ds)
+    assert thresholds[-1] == 100.5
+    for band, start in enumerate(achievementList[:-1]):
+        end = achievementList[band + 1]
+        values = [_a for _a in thresholds if start <= _a < end]
+        assert values and values[0] == start, (ds, start)
+        base = computeRa(ds, start)
+        for ra, acc in enumerate(values[1:], base + 1):
+            assert computeRa(ds, acc + 0.0001) >= ra, (ds, acc, ra)
+            assert computeRa(ds, acc - 0.0002) < ra, (ds, acc, ra)
+        assert computeRa(ds, end - 0.0002) <= base + len(values) - 1, (ds, start)
+
+
+def test_threshold_table_matches_thresholds(plugin):
+    """读取或生成的阈值表与直接计算的结果一致"""
+    from nonebot_plugin_maimaidx.libraries.maimaidx_rating_threshold import achievement_thresholds, ratingThreshold
+
+    for index in range(10, 151):
+        assert ratingThreshold.achievements(index / 10) == achievement_thresholds(index / 10), index / 10